@@ -1,38 +1,53 @@
-import os
 import json
-from huggingface_hub import InferenceClient
-from dotenv import load_dotenv
+import asyncio
 import time
+
+from event_loop import run_async
+from ai_agents.llm_cache import LLMResultCache, make_cache_key
+from ai_agents.llm_client import get_llm_client
+
 # ----------------------------------
-# Explicit ENV Loading (Robust)
+# Model Configuration
 # ----------------------------------
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ENV_PATH = os.path.join(BASE_DIR, ".env")
+MODEL_NAME = "meta-llama/Meta-Llama-3-8B-Instruct"
 
-load_dotenv(dotenv_path=ENV_PATH)
+# Bump whenever the extraction prompt changes (invalidates cached results)
+PROMPT_VERSION = "metadata-v1"
 
-HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
+metadata_cache = LLMResultCache(namespace="metadata")
 
-print("🔍 ENV PATH:", ENV_PATH)
-print("🔍 HUGGINGFACE_TOKEN Loaded:", "YES" if HF_TOKEN else "NO")
+METADATA_FIELDS = [
+    "page_title",
+    "meta_description",
+    "company_name",
+    "email",
+    "phone",
+    "domain",
+]
 
-if not HF_TOKEN:
-    raise ValueError("❌ HuggingFace token not found. Set HUGGINGFACE_TOKEN in .env file")
 
-# ----------------------------------
-# Model Configuration
-# ----------------------------------
+def normalize_metadata(data):
+    """
+    Model output → {field: str} with exactly METADATA_FIELDS,
+    or None when it is not a JSON object
+    """
 
-MODEL_NAME = "meta-llama/Meta-Llama-3-8B-Instruct"
+    if not isinstance(data, dict):
+        return None
+
+    normalized = {}
 
-print("🔌 Connecting to HuggingFace Inference API (LLaMA)...")
+    for key in METADATA_FIELDS:
+        value = data.get(key)
 
-client = InferenceClient(
-    token=HF_TOKEN
-)
+        # Numbers (e.g. phone) are kept as text; lists / objects are dropped
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
 
-print("✅ Connected to HuggingFace Cloud Inference")
+        normalized[key] = value.strip() if isinstance(value, str) else ""
+
+    return normalized
 
 # ----------------------------------
 # Cloud Extraction Function
@@ -40,6 +55,31 @@ print("✅ Connected to HuggingFace Cloud Inference")
 
 def extract_website_metadata(text: str):
 
+    return run_async(extract_website_metadata_async(text))
+
+
+async def extract_website_metadata_async(text: str):
+
+    cache_key = make_cache_key(MODEL_NAME, PROMPT_VERSION, text)
+    cached = await metadata_cache.aget(cache_key)
+
+    if cached is not None:
+        print("⚡ Cache hit → skipping cloud call")
+        return cached
+
+    parsed_data = await _extract_uncached(text)
+
+    if parsed_data is not None:
+        await metadata_cache.aset(cache_key, parsed_data)
+
+    return parsed_data
+
+
+async def _extract_uncached(text: str):
+    """
+    Single-document model call; the caller owns the cache lookup and store
+    """
+
     print("📡 Sending request to cloud model...")
 
     system_prompt = """
@@ -73,7 +113,7 @@ Text:
 """
 
     try:
-        response = client.chat.completions.create(
+        raw_output = await get_llm_client().chat(
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -83,8 +123,6 @@ Text:
             temperature=0.1
         )
 
-        raw_output = response.choices[0].message.content
-
         print("📥 Raw model output:")
         print(raw_output)
 
@@ -92,7 +130,11 @@ Text:
         # JSON Parsing
         # ----------------------------------
 
-        parsed_data = json.loads(raw_output.strip())
+        parsed_data = normalize_metadata(json.loads(raw_output.strip()))
+
+        if parsed_data is None:
+            print("❌ Model returned JSON that is not an object")
+            return None
 
         print("✅ Parsed JSON Output:")
         print(parsed_data)
@@ -109,6 +151,117 @@ Text:
         return None
 
 
+# ----------------------------------
+# Batched Cloud Extraction
+# ----------------------------------
+
+def extract_website_metadata_batch(texts: list, docs_per_prompt: int = 4):
+
+    return run_async(extract_website_metadata_batch_async(texts, docs_per_prompt))
+
+
+async def extract_website_metadata_batch_async(texts: list, docs_per_prompt: int = 4):
+    """
+    Extract metadata for many documents, several per model call,
+    with all calls in flight concurrently (bounded by the LLM client).
+    Returns one dict (or None) per input text, in order.
+    """
+
+    if not texts:
+        return []
+
+    # Serve cached documents, send only the misses to the model
+    keys = [make_cache_key(MODEL_NAME, PROMPT_VERSION, text) for text in texts]
+    results = await metadata_cache.aget_many(keys)
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if missing:
+        size = max(1, docs_per_prompt)
+        chunks = [missing[start:start + size] for start in range(0, len(missing), size)]
+
+        chunk_results = await asyncio.gather(*(
+            _extract_uncached_batch([texts[i] for i in chunk]) for chunk in chunks
+        ))
+
+        extracted = [metadata for chunk in chunk_results for metadata in chunk]
+
+        for i, metadata in zip(missing, extracted):
+            results[i] = metadata
+
+        await metadata_cache.aset_many({
+            keys[i]: metadata
+            for i, metadata in zip(missing, extracted)
+            if isinstance(metadata, dict)
+        })
+
+    return results
+
+
+async def _extract_uncached_batch(texts: list):
+    """
+    One prompt for several documents; falls back to per-document
+    calls if the batched answer is unusable
+    """
+
+    # Callers already missed the cache for these texts
+    if len(texts) == 1:
+        return [await _extract_uncached(texts[0])]
+
+    print(f"📡 Sending batch of {len(texts)} documents to cloud model...")
+
+    system_prompt = """
+You are an information extraction system.
+Return ONLY a valid JSON array.
+"""
+
+    documents = "\n\n".join(
+        f"### Document {i + 1}\n{text}" for i, text in enumerate(texts)
+    )
+
+    user_prompt = f"""
+For EACH document below, extract the following details if present:
+page_title, meta_description, company_name, email, phone, domain
+
+Return ONLY a JSON array with exactly {len(texts)} objects, in document order.
+Each object must have exactly these keys (use "" when missing):
+
+{{"page_title": "", "meta_description": "", "company_name": "", "email": "", "phone": "", "domain": ""}}
+
+{documents}
+"""
+
+    try:
+        raw_output = await get_llm_client().chat(
+            model=MODEL_NAME,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=300 * len(texts),
+            temperature=0.1
+        )
+
+        parsed_data = json.loads(raw_output.strip())
+
+        if isinstance(parsed_data, list) and len(parsed_data) == len(texts):
+            print("✅ Parsed batched JSON Output")
+
+            return [normalize_metadata(item) for item in parsed_data]
+
+        print("❌ Batched output shape mismatch → falling back to single calls")
+
+    except json.JSONDecodeError:
+        print("❌ Batched JSON Parsing Error → falling back to single calls")
+
+    except Exception as e:
+        print("❌ API Error:", e)
+        return [None] * len(texts)
+
+    return list(await asyncio.gather(
+        *(_extract_uncached(text) for text in texts)
+    ))
+
+
 # ----------------------------------
 # Local Testing
 # ----------------------------------
@@ -132,3 +285,4 @@ Contact us at support@spider.com.
     end = time.time()
 
     print("⏱ Cloud Execution Time:", round(end - start, 2), "seconds")
+    print("📊 Cache Stats:", metadata_cache.stats())
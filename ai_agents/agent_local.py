@@ -1,18 +1,47 @@
 import time
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+
+from metrics import EMBEDDING_SECONDS, EMBEDDED_TEXTS
 
 # ---------------------------
-# Load Local Embedding Model
+# Local Embedding Model (Lazy, Per Process)
 # ---------------------------
 
-print("🔌 Loading local transformer model...")
-
 MODEL_NAME = "all-MiniLM-L6-v2"
 
-model = SentenceTransformer(MODEL_NAME)
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Load the transformer on first use; importing this module stays cheap
+    """
+
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # sentence_transformers pulls in torch, so import it here too
+                from sentence_transformers import SentenceTransformer
+
+                print("🔌 Loading local transformer model...")
+
+                _model = SentenceTransformer(MODEL_NAME)
+
+                print("✅ Model loaded successfully")
+
+    return _model
 
-print("✅ Model loaded successfully")
+
+def warm_up():
+    """
+    Load the model and run one tiny encode so the first real call is fast
+    """
+
+    get_model().encode(["warm up"], show_progress_bar=False)
 
 # ---------------------------
 # Generate Embedding Function
@@ -25,7 +54,7 @@ def generate_embedding(text: str):
 
     print("\n📡 Generating embedding...")
 
-    embedding = model.encode(text, convert_to_tensor=True)
+    embedding = get_model().encode(text, convert_to_tensor=True)
 
     print("✅ Embedding generated")
     print("📏 Vector dimension:", embedding.shape)
@@ -33,6 +62,38 @@ def generate_embedding(text: str):
     return embedding
 
 
+# ---------------------------
+# Batched Embeddings
+# ---------------------------
+
+EMBEDDING_DIM = 384
+
+
+def generate_embeddings(texts: list, batch_size: int = 64) -> np.ndarray:
+    """
+    Encode many texts at once into a contiguous float32 matrix (n, dim).
+    Rows are L2-normalized, so a dot product is the cosine similarity.
+    """
+
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    model = get_model()
+
+    with EMBEDDING_SECONDS.time():
+        embeddings = model.encode(
+            list(texts),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
+    EMBEDDED_TEXTS.inc(len(texts))
+
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
 # ---------------------------
 # Similarity Calculation
 # ---------------------------
@@ -44,10 +105,10 @@ def calculate_similarity(text1: str, text2: str):
 
     print("\n📊 Calculating similarity...")
 
-    emb1 = generate_embedding(text1)
-    emb2 = generate_embedding(text2)
+    # One encode call for both inputs
+    emb1, emb2 = generate_embeddings([text1, text2])
 
-    similarity_score = util.cos_sim(emb1, emb2)[0][0].item()
+    similarity_score = float(np.dot(emb1, emb2))
 
     print("✅ Similarity Score:", similarity_score)
 
@@ -58,14 +119,11 @@ def calculate_similarity(text1: str, text2: str):
 # Integration With Part A Output
 # ---------------------------
 
-def embed_part_a_output(part_a_data: dict):
+def part_a_text(part_a_data: dict) -> str:
     """
-    Convert structured output from cloud agent (Part A)
-    into a single semantic embedding
+    Flatten cloud agent (Part A) fields into one text for embedding
     """
 
-    print("\n🔗 Integrating Part A output with Local Agent...")
-
     combined_text = f"""
     {part_a_data.get('page_title', '')}
     {part_a_data.get('meta_description', '')}
@@ -75,7 +133,18 @@ def embed_part_a_output(part_a_data: dict):
     {part_a_data.get('domain', '')}
     """
 
-    combined_text = combined_text.strip()
+    return combined_text.strip()
+
+
+def embed_part_a_output(part_a_data: dict):
+    """
+    Convert structured output from cloud agent (Part A)
+    into a single semantic embedding
+    """
+
+    print("\n🔗 Integrating Part A output with Local Agent...")
+
+    combined_text = part_a_text(part_a_data)
 
     print("📝 Combined Text For Embedding:")
     print(combined_text)
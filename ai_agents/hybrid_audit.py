@@ -1,19 +1,12 @@
 import os
+import json
 import time
-from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
 from pydantic import BaseModel, ValidationError
 
-# -------------------------------
-# Load Environment Variables
-# -------------------------------
-
-load_dotenv()
-
-HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
-
-if not HF_TOKEN:
-    raise ValueError("❌ HUGGINGFACE_TOKEN not found in environment")
+from event_loop import run_async
+from ai_agents.llm_client import get_llm_client
+from ai_agents.keyword_matcher import KeywordMatcher
+from ai_agents.semantic_gate import SEMANTIC_THRESHOLD, semantic_score
 
 # -------------------------------
 # HuggingFace Chat Model Setup
@@ -21,12 +14,6 @@ if not HF_TOKEN:
 
 MODEL_NAME = "meta-llama/Meta-Llama-3-8B-Instruct"
 
-client = InferenceClient(
-    token=HF_TOKEN
-)
-
-print("✅ Hybrid Pipeline Initialized")
-
 # -------------------------------
 # Step 3 — Pydantic Model
 # -------------------------------
@@ -39,17 +26,99 @@ class SummarySchema(BaseModel):
 # Step 1 — Local SEO Relevance Check
 # -------------------------------
 
-def is_seo_relevant(text: str) -> bool:
+# term → weight; a page passes once its weighted hits reach the threshold
+DEFAULT_SEO_KEYWORDS = {
+    "seo": 1.0,
+    "crawling": 1.0,
+    "crawler": 0.6,
+    "search engine": 0.6,
+    "search engine optimization": 1.0,
+    "indexing": 0.5,
+    "sitemap": 0.5,
+    "robots txt": 0.5,
+    "backlink": 0.5,
+    "meta description": 0.5,
+    "keyword research": 0.5,
+    "organic traffic": 0.5,
+    "page speed": 0.3,
+    "ranking": 0.3,
+}
+
+# Optional JSON file: {"term": weight, ...} or ["term", ...]
+SEO_KEYWORDS_FILE = os.getenv("SEO_KEYWORDS_FILE")
+SEO_RELEVANCE_THRESHOLD = float(os.getenv("SEO_RELEVANCE_THRESHOLD", "1.0"))
+
+# Keyword scores this high skip the embedding; everything else is judged
+# by similarity to the topic centroids (set SEO_SEMANTIC_GATE=0 to disable)
+SEO_STRONG_MATCH_SCORE = float(os.getenv("SEO_STRONG_MATCH_SCORE", "3.0"))
+SEO_SEMANTIC_GATE = os.getenv("SEO_SEMANTIC_GATE", "1") == "1"
+
+_seo_matcher = None
+
+
+def get_seo_matcher() -> KeywordMatcher:
+
+    global _seo_matcher
+
+    if _seo_matcher is None:
+        keywords = DEFAULT_SEO_KEYWORDS
+
+        if SEO_KEYWORDS_FILE:
+            with open(SEO_KEYWORDS_FILE, encoding="utf-8") as f:
+                keywords = json.load(f)
+
+            if isinstance(keywords, list):
+                keywords = {term: 1.0 for term in keywords}
+
+        _seo_matcher = KeywordMatcher(keywords)
 
-    keywords = ["seo", "crawling"]
+    return _seo_matcher
 
-    text_lower = text.lower()
 
-    for keyword in keywords:
-        if keyword in text_lower:
-            return True
+def seo_relevance_score(text) -> float:
+    """
+    text: a string or an iterable of chunks (scanned in one pass)
+    """
 
-    return False
+    return get_seo_matcher().score(text)
+
+
+def is_seo_relevant(text) -> bool:
+
+    return seo_relevance_score(text) >= SEO_RELEVANCE_THRESHOLD
+
+
+def relevance_gate(text: str) -> dict:
+    """
+    Keywords first (cheap), then the local embedding for anything unclear
+    """
+
+    keyword_score = seo_relevance_score(text)
+
+    gate = {
+        "relevant": keyword_score >= SEO_RELEVANCE_THRESHOLD,
+        "stage": "keyword",
+        "keyword_score": round(keyword_score, 2),
+        "semantic_score": None,
+    }
+
+    if not SEO_SEMANTIC_GATE or keyword_score >= SEO_STRONG_MATCH_SCORE:
+        return gate
+
+    try:
+        similarity = semantic_score(text)
+    except Exception as e:
+        # Without the local model the keyword verdict stands
+        print("❌ Semantic gate unavailable:", e)
+        return gate
+
+    gate.update(
+        relevant=similarity >= SEMANTIC_THRESHOLD,
+        stage="semantic",
+        semantic_score=round(similarity, 3)
+    )
+
+    return gate
 
 
 # -------------------------------
@@ -58,7 +127,12 @@ def is_seo_relevant(text: str) -> bool:
 
 def summarize_text_cloud(text: str) -> str:
 
-    response = client.chat.completions.create(
+    return run_async(summarize_text_cloud_async(text))
+
+
+async def summarize_text_cloud_async(text: str) -> str:
+
+    summary = await get_llm_client().chat(
         model=MODEL_NAME,
         messages=[
             {
@@ -74,7 +148,7 @@ def summarize_text_cloud(text: str) -> str:
         temperature=0.2
     )
 
-    return response.choices[0].message.content.strip()
+    return summary.strip()
 
 
 # -------------------------------
@@ -91,18 +165,21 @@ def run_hybrid_audit(input_text: str):
 
     print("🔍 Running local relevance check...")
 
-    if not is_seo_relevant(input_text):
-        print("❌ Text is NOT SEO relevant")
+    gate = relevance_gate(input_text)
+
+    if not gate["relevant"]:
+        print("❌ Text is NOT SEO relevant", gate)
 
         end_time = time.time()
 
         return {
             "status": "rejected",
             "reason": "Not SEO related",
+            "relevance": gate,
             "time_taken": round(end_time - start_time, 2)
         }
 
-    print("✅ Text is SEO relevant")
+    print("✅ Text is SEO relevant", gate)
 
     # -------- Step 2: Cloud Summary --------
 
@@ -127,6 +204,7 @@ def run_hybrid_audit(input_text: str):
         return {
             "status": "success",
             "summary": validated.summary,
+            "relevance": gate,
             "time_taken": round(end_time - start_time, 2)
         }
 
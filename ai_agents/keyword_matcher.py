@@ -0,0 +1,159 @@
+import re
+
+# ----------------------------------
+# Text Normalization
+# ----------------------------------
+
+# Every non-word character folds to a single space, so terms match whole
+# words and phrases only ("robots.txt" and "robots  txt" are the same term)
+_SPACE = " "
+
+# Alphanumeric without "_", i.e. what str.isalnum() accepts
+_WORD_CHAR = r"[^\W_]"
+_SEPARATOR = r"[\W_]+"
+_SEPARATOR_RE = re.compile(_SEPARATOR)
+
+
+def _normalize_char(char: str) -> str:
+    return char.lower() if char.isalnum() else _SPACE
+
+
+def normalize_term(term: str) -> str:
+    return _SPACE.join("".join(_normalize_char(c) for c in term).split())
+
+
+def _fold(text: str) -> str:
+    # Lowercasing up front is cheaper than a case-insensitive regex; folding
+    # separator runs keeps a match no longer than the term it spells
+    return _SEPARATOR_RE.sub(_SPACE, text.lower())
+
+# ----------------------------------
+# Trie-Shaped Regex
+# ----------------------------------
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Shared prefixes are factored out, so the engine never re-tries the same
+    characters across terms; the greedy optional end makes matches longest-first
+    """
+
+    ends = "" in node
+    branches = [
+        (_SEPARATOR if char == _SPACE else re.escape(char)) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+
+    if not branches:
+        return ""
+
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return f"(?:{body})?" if ends else body
+
+
+def _compile(patterns) -> re.Pattern:
+    root = {}
+
+    for pattern in patterns:
+        node = root
+
+        for char in pattern:
+            node = node.setdefault(char, {})
+
+        node[""] = True
+
+    # Zero-width lookahead at every word start: overlapping occurrences
+    # ("search engine" inside "meta search engine") are all found
+    return re.compile(
+        rf"(?<!{_WORD_CHAR})(?=({_trie_pattern(root)})(?!{_WORD_CHAR}))"
+    )
+
+# ----------------------------------
+# Keyword Matcher
+# ----------------------------------
+
+class KeywordMatcher:
+    """
+    Weighted multi-keyword matcher, compiled once into a single regex and
+    run in one pass over the text no matter how many terms it holds
+    """
+
+    def __init__(self, weights: dict, max_hits_per_term: int = 3):
+        self.max_hits_per_term = max_hits_per_term
+        self.weights = {}
+
+        # Terms that normalize to the same pattern count once (highest weight)
+        for term, weight in weights.items():
+            pattern = normalize_term(term)
+
+            if pattern:
+                self.weights[pattern] = max(float(weight), self.weights.get(pattern, float("-inf")))
+
+        # The regex reports the longest term at each position; shorter
+        # terms that are whole-word prefixes of it start there too
+        self._starts_with = {
+            pattern: [
+                other for other in self.weights
+                if other == pattern or pattern.startswith(other + _SPACE)
+            ]
+            for pattern in self.weights
+        }
+
+        self._regex = _compile(self.weights) if self.weights else None
+
+    def scan(self, text) -> "_Scan":
+        """
+        text: a string or an iterable of string chunks (streamed input)
+        """
+
+        chunks = (text,) if isinstance(text, str) else text
+        scan = _Scan()
+
+        if self._regex is None:
+            return scan
+
+        # Only the last `carry` folded characters of a chunk can begin a
+        # match that is not yet complete (or whose closing word boundary is
+        # not yet known); they are rescanned with the next chunk, while
+        # `start` skips the one character kept before them as lookbehind context
+        carry = max(map(len, self.weights))
+        buffer, start = "", 0
+
+        for chunk in chunks:
+            buffer = _fold(buffer + chunk)
+            end = len(buffer) - carry
+
+            if end > start:
+                self._count(scan, buffer, start, end)
+                buffer, start = buffer[end - 1:], 1
+
+        self._count(scan, buffer, start, len(buffer))
+
+        return scan
+
+    def _count(self, scan: "_Scan", text: str, start: int, end: int):
+        # Matches starting at or after `end` belong to the next window
+        for match in self._regex.finditer(text, start):
+            if match.start() >= end:
+                break
+
+            for term in self._starts_with.get(match.group(1), ()):
+                count = scan.hits.get(term, 0) + 1
+                scan.hits[term] = count
+
+                if count <= self.max_hits_per_term:
+                    scan.score += self.weights[term]
+
+    def score(self, text) -> float:
+        return self.scan(text).score
+
+
+class _Scan:
+    """
+    Scan result: hits per term and the capped weighted score
+    """
+
+    def __init__(self):
+        self.hits = {}
+        self.score = 0.0
@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ----------------------------------
+# Cache Configuration
+# ----------------------------------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+CACHE_REDIS_ENABLED = os.getenv("LLM_CACHE_REDIS", "1") == "1"
+
+_WHITESPACE = re.compile(r"\s+")
+
+# ----------------------------------
+# Cache Key
+# ----------------------------------
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def make_cache_key(model: str, prompt_version: str, text: str) -> str:
+    payload = f"{model}\n{prompt_version}\n{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ----------------------------------
+# Two-Tier Cache (Process LRU + Redis)
+# ----------------------------------
+
+class LLMResultCache:
+    """
+    In-process LRU with TTL in front of a shared Redis tier
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        redis_url: str | None = REDIS_URL if CACHE_REDIS_ENABLED else None
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._async_redis = None
+        self._async_pid = None
+
+        self.counters = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "redis_errors": 0,
+        }
+
+    # ---------- Redis Tier ----------
+
+    def _redis_client(self):
+        if self.redis_url is None:
+            return None
+
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+
+        return self._redis
+
+    def _async_redis_client(self):
+        """
+        redis.asyncio client for the async extraction paths (per process:
+        the persistent event loop of a forked worker is its own)
+        """
+
+        if self.redis_url is None:
+            return None
+
+        if self._async_pid != os.getpid():
+            import redis.asyncio as aioredis
+
+            self._async_redis = aioredis.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+            self._async_pid = os.getpid()
+
+        return self._async_redis
+
+    def _redis_key(self, key: str) -> str:
+        return f"llmcache:{self.namespace}:{key}"
+
+    # ---------- Local Tier ----------
+
+    def _local_get(self, key: str):
+        with self._lock:
+            entry = self._local.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key: str, value):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, value)
+            self._local.move_to_end(key)
+
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    # ---------- Public API ----------
+
+    def get(self, key: str):
+        value = self._local_get(key)
+
+        if value is not None:
+            self.counters["local_hits"] += 1
+            return value
+
+        client = self._redis_client()
+
+        if client is not None:
+            try:
+                raw = client.get(self._redis_key(key))
+            except Exception:
+                self.counters["redis_errors"] += 1
+                raw = None
+
+            if raw is not None:
+                value = json.loads(raw)
+                self._local_set(key, value)
+                self.counters["redis_hits"] += 1
+                return value
+
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value):
+        if value is None:
+            return
+
+        self._local_set(key, value)
+
+        client = self._redis_client()
+
+        if client is not None:
+            try:
+                client.setex(self._redis_key(key), self.ttl, json.dumps(value))
+            except Exception:
+                self.counters["redis_errors"] += 1
+
+    # ---------- Async API (Event Loop) ----------
+
+    async def aget(self, key: str):
+        return (await self.aget_many([key]))[0]
+
+    async def aget_many(self, keys: list) -> list:
+        """
+        One value (or None) per key; local hits first, one MGET for the rest
+        """
+
+        values = [self._local_get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+
+        self.counters["local_hits"] += len(keys) - len(missing)
+
+        client = self._async_redis_client()
+
+        if missing and client is not None:
+            try:
+                raws = await client.mget([self._redis_key(keys[i]) for i in missing])
+            except Exception:
+                self.counters["redis_errors"] += 1
+                raws = [None] * len(missing)
+
+            for i, raw in zip(missing, raws):
+                if raw is not None:
+                    values[i] = json.loads(raw)
+                    self._local_set(keys[i], values[i])
+                    self.counters["redis_hits"] += 1
+
+        self.counters["misses"] += sum(1 for value in values if value is None)
+        return values
+
+    async def aset(self, key: str, value):
+        await self.aset_many({key: value})
+
+    async def aset_many(self, items: dict):
+        """
+        key → value; None values are skipped, Redis writes go in one pipeline
+        """
+
+        items = {key: value for key, value in items.items() if value is not None}
+
+        if not items:
+            return
+
+        for key, value in items.items():
+            self._local_set(key, value)
+
+        client = self._async_redis_client()
+
+        if client is None:
+            return
+
+        try:
+            pipe = client.pipeline(transaction=False)
+
+            for key, value in items.items():
+                pipe.set(self._redis_key(key), json.dumps(value), ex=self.ttl)
+
+            await pipe.execute()
+        except Exception:
+            self.counters["redis_errors"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+
+        return {
+            **self.counters,
+            "entries": len(self._local),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
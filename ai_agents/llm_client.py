@@ -0,0 +1,211 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+from dotenv import load_dotenv
+
+from metrics import LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_RETRIES
+
+# ----------------------------------
+# Client Configuration
+# ----------------------------------
+
+# OpenAI-compatible chat endpoint (HF router by default, or a local stub)
+DEFAULT_BASE_URL = "https://router.huggingface.co/v1"
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20.0
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+# ----------------------------------
+# Token Bucket Rate Limiter
+# ----------------------------------
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# ----------------------------------
+# Async Chat Client
+# ----------------------------------
+
+def _retry_delay(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY, float(retry_after))
+        except ValueError:
+            pass
+
+    # Full jitter exponential backoff
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class AsyncLLMClient:
+    """
+    Pooled HTTP client for chat completions with a concurrency cap,
+    token-bucket rate limiting and jittered retries on 429/5xx
+    """
+
+    def __init__(
+        self,
+        token: str | None,
+        base_url: str = LLM_BASE_URL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_limit: float = LLM_RATE_LIMIT,
+        rate_burst: int = LLM_RATE_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT
+    ):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+        self.max_retries = max_retries
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            )
+        )
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._bucket = TokenBucket(rate_limit, rate_burst)
+
+    async def chat(
+        self,
+        model: str,
+        messages: list,
+        max_tokens: int = 300,
+        temperature: float = 0.1
+    ) -> str:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+        async with self._slots:
+            try:
+                with LLM_REQUEST_SECONDS.time(model=model):
+                    content = await self._post_with_retries(payload)
+            except Exception:
+                LLM_REQUESTS.inc(model=model, outcome="error")
+                raise
+
+        LLM_REQUESTS.inc(model=model, outcome="ok")
+        return content
+
+    async def _post_with_retries(self, payload: dict) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+
+            try:
+                response = await self._http.post("/chat/completions", json=payload)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise LLMRequestError(f"Transport error: {e}")
+
+                LLM_RETRIES.inc(reason="transport")
+                await asyncio.sleep(_retry_delay(attempt, None))
+                continue
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                LLM_RETRIES.inc(reason=str(response.status_code))
+                await asyncio.sleep(
+                    _retry_delay(attempt, response.headers.get("retry-after"))
+                )
+                continue
+
+            if response.status_code >= 400:
+                raise LLMRequestError(
+                    f"LLM request failed ({response.status_code}): {response.text[:200]}",
+                    status=response.status_code
+                )
+
+            return response.json()["choices"][0]["message"]["content"]
+
+    async def aclose(self):
+        await self._http.aclose()
+
+# ----------------------------------
+# Shared Client (Per Process)
+# ----------------------------------
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_PATH = os.path.join(BASE_DIR, ".env")
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _load_token() -> str | None:
+    # .env is read on first use, not at import
+    load_dotenv(dotenv_path=ENV_PATH)
+
+    token = os.getenv("HUGGINGFACE_TOKEN")
+
+    print("🔍 HUGGINGFACE_TOKEN Loaded:", "YES" if token else "NO")
+
+    # A local OpenAI-compatible stub does not need a token
+    if not token and LLM_BASE_URL == DEFAULT_BASE_URL:
+        raise ValueError("❌ HuggingFace token not found. Set HUGGINGFACE_TOKEN in .env file")
+
+    return token
+
+
+def get_llm_client() -> AsyncLLMClient:
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = AsyncLLMClient(token=_load_token())
+                _client_pid = os.getpid()
+
+    return _client
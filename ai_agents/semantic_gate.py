@@ -0,0 +1,108 @@
+import os
+import threading
+import numpy as np
+
+from ai_agents.agent_local import generate_embeddings
+
+# ----------------------------------
+# Gate Configuration
+# ----------------------------------
+
+SEMANTIC_THRESHOLD = float(os.getenv("SEO_SEMANTIC_THRESHOLD", "0.35"))
+
+# Optional .npy with precomputed (topics, dim) centroids, skips the seed encode
+CENTROIDS_FILE = os.getenv("SEO_TOPIC_CENTROIDS_FILE")
+
+# MiniLM only reads the first ~256 tokens anyway
+MAX_GATE_CHARS = 2000
+
+# A few seed sentences per topic; each topic is the mean of its seeds
+TOPIC_SEEDS = {
+    "seo": [
+        "Search engine optimization improves how a website ranks in Google.",
+        "Keyword research, backlinks and meta tags drive organic traffic.",
+        "On-page SEO covers titles, headings, descriptions and internal links.",
+    ],
+    "crawling": [
+        "Web crawlers discover and index pages by following links.",
+        "A spider fetches pages, reads robots.txt and submits sitemaps.",
+        "Search engines crawl and index web pages to serve search results.",
+    ],
+    "web_performance": [
+        "Page speed and Core Web Vitals affect search visibility.",
+        "Site audits find broken links, slow pages and duplicate content.",
+    ],
+}
+
+# ----------------------------------
+# Topic Centroids (Lazy, Per Process)
+# ----------------------------------
+
+_centroids = None
+_centroids_lock = threading.Lock()
+
+
+def build_centroids(topic_seeds: dict = TOPIC_SEEDS) -> np.ndarray:
+    """
+    (topics, dim) matrix of L2-normalized topic means
+    """
+
+    centroids = np.stack([
+        generate_embeddings(seeds).mean(axis=0)
+        for seeds in topic_seeds.values()
+    ])
+
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    return np.ascontiguousarray(centroids / np.maximum(norms, 1e-12), dtype=np.float32)
+
+
+def get_centroids() -> np.ndarray:
+
+    global _centroids
+
+    if _centroids is None:
+        with _centroids_lock:
+            if _centroids is None:
+                if CENTROIDS_FILE:
+                    _centroids = np.load(CENTROIDS_FILE).astype(np.float32)
+                else:
+                    _centroids = build_centroids()
+
+    return _centroids
+
+# ----------------------------------
+# Public API
+# ----------------------------------
+
+def semantic_scores(texts: list) -> np.ndarray:
+    """
+    Best cosine similarity to any topic centroid, one score per text
+    """
+
+    if not texts:
+        return np.empty(0, dtype=np.float32)
+
+    embeddings = generate_embeddings([text[:MAX_GATE_CHARS] for text in texts])
+    return (embeddings @ get_centroids().T).max(axis=1)
+
+
+def semantic_score(text: str) -> float:
+
+    return float(semantic_scores([text])[0])
+
+
+def is_semantically_relevant(text: str, threshold: float = SEMANTIC_THRESHOLD) -> bool:
+
+    return semantic_score(text) >= threshold
+
+
+if __name__ == "__main__":
+
+    # Precompute centroids once: python -m ai_agents.semantic_gate centroids.npy
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "topic_centroids.npy"
+
+    np.save(path, build_centroids())
+
+    print("✅ Topic centroids saved to", path)
@@ -0,0 +1,65 @@
+import os
+import time
+import logging
+import redis.asyncio as aioredis
+
+# ---------- AUDIT VERSION CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Bumped by every write that changes what GET /audits lists; the listing
+# ETag is derived from it instead of aggregating over crawl_results
+VERSION_KEY = "audits:version"
+
+# ---------- Client (Per Process) ----------
+
+_client = None
+_client_pid = None
+
+
+def _redis():
+    global _client, _client_pid
+
+    if _client_pid != os.getpid():
+        _client = aioredis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _client
+
+
+def _pipeline():
+    pipe = _redis().pipeline(transaction=False)
+
+    # Start from the clock, so a reset Redis never hands out an old version again
+    pipe.set(VERSION_KEY, int(time.time() * 1000), nx=True)
+    return pipe
+
+# ---------- Version ----------
+
+async def bump_audit_version():
+    """
+    Call after inserting, recrawling or deleting crawl rows
+    """
+
+    try:
+        pipe = _pipeline()
+        pipe.incr(VERSION_KEY)
+        await pipe.execute()
+    except Exception as e:
+        logging.warning(f"Audit version not bumped: {e}")
+
+
+async def audit_version() -> int | None:
+    """
+    Current version, or None when Redis is unavailable (no ETag then)
+    """
+
+    try:
+        pipe = _pipeline()
+        pipe.get(VERSION_KEY)
+        return int((await pipe.execute())[-1])
+    except Exception as e:
+        logging.warning(f"Audit version unavailable: {e}")
+        return None
@@ -0,0 +1,126 @@
+import os
+import random
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# ---------- Fixture Corpus ----------
+
+# Deterministic "realistic" pages: head metadata, nav, long article text,
+# tables, inline scripts/styles, images and links to sibling pages
+
+TOPICS = [
+    ("seo", "Technical SEO audit", "crawl budget, canonical tags, sitemaps and structured data"),
+    ("crawl", "How search engines crawl", "crawlers, robots.txt rules and index coverage"),
+    ("speed", "Page speed guide", "Core Web Vitals, render-blocking resources and caching"),
+    ("shop", "Outdoor gear store", "hiking boots, tents and seasonal discounts"),
+    ("bakery", "Neighbourhood bakery", "sourdough, pastries and weekend opening hours"),
+    ("law", "Family law practice", "consultations, mediation and client reviews"),
+]
+
+WORDS = (
+    "search engine index crawl ranking content page link site visitors audit "
+    "performance mobile desktop render image script style cache server request "
+    "customer product service contact team about pricing support blog article "
+    "quality update guide review local business market growth strategy data"
+).split()
+
+PIXEL = "data:image/gif;base64,R0lGODlhAQABAAAAACw="
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def render_page(index: int, pages: int, rng: random.Random) -> str:
+    slug, title, summary = TOPICS[index % len(TOPICS)]
+    size = rng.choice((4, 12, 40))  # small, medium and long pages
+
+    links = "".join(
+        f'<li><a href="/page-{rng.randrange(pages)}.html">Related {i}</a></li>'
+        for i in range(rng.randint(5, 25))
+    )
+    sections = "".join(
+        f"<section><h2>{title} part {i}</h2><p>{_paragraph(rng, 6)}</p>"
+        f'<img src="{PIXEL}" alt="figure {i}" width="640" height="360"></section>'
+        for i in range(size)
+    )
+    rows = "".join(
+        f"<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 999)}</td></tr>"
+        for _ in range(rng.randint(3, 15))
+    )
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title} #{index}</title>
+<meta name="description" content="{title}: {summary}.">
+<meta property="og:title" content="{title}">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>body{{font-family:sans-serif;max-width:960px;margin:auto}} .hero{{padding:2em}}</style>
+<script>window.dataLayer = window.dataLayer || []; dataLayer.push({{page: {index}}});</script>
+</head>
+<body>
+<header><nav><ul><li><a href="/">Home</a></li>{links}</ul></nav></header>
+<main>
+<div class="hero"><h1>{title}</h1><p>{summary}</p></div>
+{sections}
+<table>{rows}</table>
+</main>
+<footer><address>{slug.title()} Ltd, contact <a href="mailto:info@{slug}.example">info@{slug}.example</a>,
+phone <a href="tel:+441234567{index % 1000:03d}">+44 1234 567{index % 1000:03d}</a></address></footer>
+</body>
+</html>
+"""
+
+
+def generate_corpus(directory: str, pages: int = 200, seed: int = 7) -> list:
+    """
+    Write `pages` fixture pages (plus an index) and return their paths
+    """
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    for index in range(pages):
+        path = f"page-{index}.html"
+
+        with open(os.path.join(directory, path), "w", encoding="utf-8") as f:
+            f.write(render_page(index, pages, rng))
+
+        paths.append(path)
+
+    with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as f:
+        f.write("<html><body>" + "".join(f'<a href="/{p}">{p}</a>' for p in paths) + "</body></html>")
+
+    return paths
+
+# ---------- Static Server ----------
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: str):
+    """
+    Serve `directory` on 127.0.0.1 (random port); yields the base URL
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
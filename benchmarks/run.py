@@ -0,0 +1,384 @@
+"""
+Offline benchmark suite: python -m benchmarks.run [--suites ...] [--output FILE]
+
+Everything runs against local fixtures (static HTTP server, stub LLM),
+so numbers are comparable between releases
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+# Must be set before the app modules read their config
+os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("LLM_CACHE_REDIS", "0")
+
+from benchmarks.corpus import generate_corpus, serve_directory
+from benchmarks.stub_llm import stub_llm_server
+
+# ---------- BENCHMARK CONFIG ----------
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+
+SUITES = ["html", "embed", "crawl", "db", "hybrid"]
+DEFAULT_SUITES = ["html", "embed", "crawl", "hybrid"]  # db needs DATABASE_URL
+
+CRAWL_CONCURRENCY = [1, 2, 4, 8]
+EMBED_BATCH_SIZES = [1, 8, 32, 64, 128]
+DB_BATCH_SIZES = [1, 10, 50, 200]
+LLM_DOCS_PER_PROMPT = [1, 4, 8]
+
+DB_URL_PREFIX = "http://benchmark.invalid/"
+
+# ---------- Statistics ----------
+
+def percentile(samples: list, q: float) -> float:
+    """
+    Nearest-rank percentile (no interpolation, always an observed value)
+    """
+
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples: list, items: int | None = None, elapsed: float | None = None) -> dict:
+    """
+    Latency percentiles in ms, plus throughput when a wall time is given
+    """
+
+    ms = [s * 1000 for s in samples]
+
+    summary = {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+        **{f"p{q}_ms": round(percentile(ms, q), 3) for q in (50, 90, 95, 99)},
+    }
+
+    if items is not None and elapsed:
+        summary["items"] = items
+        summary["wall_s"] = round(elapsed, 3)
+        summary["items_per_s"] = round(items / elapsed, 2)
+
+    return summary
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+# ---------- Suites ----------
+
+def bench_html(ctx: dict) -> dict:
+    """
+    HTML → text: per-page latency, then batch throughput
+    """
+
+    from html_text import extract_page_text, extract_page_texts
+
+    htmls = ctx["htmls"]
+    samples = [timed(extract_page_text, html) for html in htmls]
+
+    start = time.perf_counter()
+    extract_page_texts(htmls)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "extract_page_text": summarize(samples, len(htmls), sum(samples)),
+        "extract_page_texts": summarize([elapsed], len(htmls), elapsed),
+        "html_bytes_mean": sum(map(len, htmls)) // len(htmls),
+    }
+
+
+def bench_embed(ctx: dict) -> dict:
+    """
+    Local embedding throughput by batch size
+    """
+
+    from html_text import extract_page_text
+    from ai_agents.agent_local import warm_up, generate_embeddings
+
+    warm_up()
+
+    texts = [extract_page_text(html) for html in ctx["htmls"]]
+    results = {}
+
+    for batch_size in EMBED_BATCH_SIZES:
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        samples = [timed(generate_embeddings, batch, batch_size) for batch in batches]
+
+        results[f"batch_{batch_size}"] = summarize(samples, len(texts), sum(samples))
+
+    return results
+
+
+def bench_crawl(ctx: dict) -> dict:
+    """
+    Playwright pages/sec through the BrowserPool at several concurrency levels
+    (navigate + DOM content, no screenshot or DB write)
+    """
+
+    import asyncio
+    from browser_pool import BrowserPool
+    from event_loop import run_async
+
+    urls = [f"{ctx['base_url']}/{path}" for path in ctx["paths"]]
+
+    async def crawl_all(concurrency: int) -> tuple[list, float]:
+        pool = BrowserPool(browsers=1, contexts_per_browser=concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        samples = []
+
+        async def fetch(url: str):
+            async with semaphore:
+                start = time.perf_counter()
+
+                async with pool.page() as page:
+                    await page.goto(url, wait_until="domcontentloaded")
+                    await page.content()
+
+                samples.append(time.perf_counter() - start)
+
+        try:
+            # Warm the browser so launch time is not counted
+            await fetch(urls[0])
+            samples.clear()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(fetch(url) for url in urls))
+            return samples, time.perf_counter() - start
+
+        finally:
+            await pool.close()
+
+    results = {}
+
+    for concurrency in CRAWL_CONCURRENCY:
+        samples, elapsed = run_async(crawl_all(concurrency))
+        results[f"concurrency_{concurrency}"] = summarize(samples, len(urls), elapsed)
+
+    return results
+
+
+def bench_db(ctx: dict) -> dict:
+    """
+    write_crawl_results throughput by batch size (rows are deleted afterwards)
+    """
+
+    from sqlalchemy import delete
+    from database import AsyncSessionLocal, CrawlResult, init_db
+    from html_store import compress_html
+    from result_writer import write_crawl_results
+    from event_loop import run_async
+
+    run_async(init_db())
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "url": f"{DB_URL_PREFIX}{uuid.uuid4().hex}",
+            "title": f"Benchmark page {i}",
+            "html_zstd": compress_html(html),
+            "html_dict_id": None,
+            "html_size": len(html),
+            "html_content": None,
+            "text_content": None,
+            "text_version": None,
+            "embedding": None,
+            "embedding_model": None,
+            "etag": None,
+            "last_modified": None,
+            "content_hash": None,
+            "created_at": now,
+            "last_checked_at": now,
+        }
+        for i, html in enumerate(ctx["htmls"])
+    ]
+
+    async def cleanup():
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(CrawlResult).where(CrawlResult.url.startswith(DB_URL_PREFIX))
+            )
+            await session.commit()
+
+    results = {}
+
+    try:
+        for batch_size in DB_BATCH_SIZES:
+            batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            samples = [timed(run_async, write_crawl_results(batch)) for batch in batches]
+
+            results[f"batch_{batch_size}"] = summarize(samples, len(rows), sum(samples))
+
+            # Next round measures inserts again, not updates
+            run_async(cleanup())
+
+    finally:
+        run_async(cleanup())
+
+    return results
+
+
+def bench_hybrid(ctx: dict) -> dict:
+    """
+    Pipeline latency against the stub LLM: hybrid audit per document,
+    and batched metadata extraction by documents per prompt
+    """
+
+    from html_text import extract_page_text
+    from ai_agents.hybrid_audit import run_hybrid_audit
+    from ai_agents.agent_cloud import extract_website_metadata_batch
+
+    # A run id in every text keeps the in-memory LLM cache out of the numbers
+    run_id = uuid.uuid4().hex
+    texts = [f"{extract_page_text(html)}\n[{run_id}-{i}]" for i, html in enumerate(ctx["htmls"])]
+
+    audits = texts[:ctx["hybrid_docs"]]
+    samples = [timed(run_hybrid_audit, text) for text in audits]
+
+    results = {
+        "llm_latency_ms": ctx["llm_latency"] * 1000,
+        "run_hybrid_audit": summarize(samples, len(audits), sum(samples)),
+    }
+
+    for docs_per_prompt in LLM_DOCS_PER_PROMPT:
+        batch = [f"{text}/{docs_per_prompt}" for text in audits]
+        elapsed = timed(extract_website_metadata_batch, batch, docs_per_prompt)
+
+        results[f"metadata_batch_{docs_per_prompt}"] = summarize([elapsed], len(batch), elapsed)
+
+    return results
+
+
+BENCHMARKS = {
+    "html": bench_html,
+    "embed": bench_embed,
+    "crawl": bench_crawl,
+    "db": bench_db,
+    "hybrid": bench_hybrid,
+}
+
+# ---------- Report ----------
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(old_path: str, new_path: str):
+    """
+    Print p50 and throughput changes between two result files
+    """
+
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    for suite, cases in new.items():
+        for case, summary in cases.items():
+            before = old.get(suite, {}).get(case)
+
+            if not isinstance(summary, dict) or not isinstance(before, dict):
+                continue
+
+            for key in ("p50_ms", "items_per_s"):
+                if key in summary and before.get(key):
+                    change = (summary[key] - before[key]) / before[key] * 100
+                    print(f"{suite}.{case}.{key}: {before[key]} → {summary[key]} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline crawler / pipeline benchmarks")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=DEFAULT_SUITES)
+    parser.add_argument("--pages", type=int, default=200, help="fixture pages to generate")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--hybrid-docs", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM delay (s)")
+    parser.add_argument("--output", help="JSON file (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    started = datetime.now(timezone.utc)
+    results, errors = {}, {}
+
+    with tempfile.TemporaryDirectory() as corpus_dir, \
+            serve_directory(corpus_dir) as base_url, \
+            stub_llm_server(args.llm_latency) as llm_url:
+
+        paths = generate_corpus(corpus_dir, args.pages, args.seed)
+
+        htmls = []
+        for path in paths:
+            with open(os.path.join(corpus_dir, path), encoding="utf-8") as f:
+                htmls.append(f.read())
+
+        # App modules are imported inside the suites, i.e. after this
+        os.environ["LLM_BASE_URL"] = llm_url
+
+        ctx = {
+            "paths": paths,
+            "htmls": htmls,
+            "base_url": base_url,
+            "hybrid_docs": min(args.hybrid_docs, len(htmls)),
+            "llm_latency": args.llm_latency,
+        }
+
+        for suite in args.suites:
+            print(f"⏱  Running {suite} benchmark...")
+
+            try:
+                results[suite] = BENCHMARKS[suite](ctx)
+            except Exception as e:
+                # One missing dependency (no browser, no DB) shouldn't lose the rest
+                print(f"❌ {suite} benchmark failed: {e}")
+                errors[suite] = repr(e)
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+        "errors": errors,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print("✅ Results written to", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ---------- Stub OpenAI-Compatible Chat Server ----------
+
+# Answers /chat/completions like the hosted model would, after a fixed delay,
+# so pipeline latency can be measured without the network or a token
+
+BATCH_RE = re.compile(r"JSON array with exactly (\d+) objects")
+
+METADATA = {
+    "page_title": "Technical SEO audit",
+    "meta_description": "Crawl budget, canonical tags and sitemaps.",
+    "company_name": "Seo Ltd",
+    "email": "info@seo.example",
+    "phone": "+44 1234 567000",
+    "domain": "seo.example",
+}
+
+
+def _answer(prompt: str) -> str:
+    batch = BATCH_RE.search(prompt)
+
+    if batch:
+        return json.dumps([METADATA] * int(batch.group(1)))
+
+    if prompt.startswith("Summarize"):
+        return "The page explains how crawlers index a site and how to fix common SEO issues."
+
+    return json.dumps(METADATA)
+
+
+def _handler(latency: float):
+
+    class StubHandler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+
+            time.sleep(latency)
+
+            body = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": _answer(prompt)}}]
+            }).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StubHandler
+
+
+@contextmanager
+def stub_llm_server(latency: float = 0.2):
+    """
+    Yields the base URL to use as LLM_BASE_URL
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(latency))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
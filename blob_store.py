@@ -0,0 +1,174 @@
+import io
+import os
+import hashlib
+import logging
+from sqlalchemy import select, func, delete, exists
+
+from database import AsyncSessionLocal, ScreenshotBlob, CrawlResult
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# ---------- SCREENSHOT CONFIG ----------
+
+# png | jpeg | webp (webp needs Pillow)
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "png").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+THUMBNAIL_WIDTH = int(os.getenv("SCREENSHOT_THUMBNAIL_WIDTH", "320"))
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+# ---------- Encoding ----------
+
+def screenshot_options() -> dict:
+    """
+    Playwright screenshot() kwargs for the configured format
+    """
+
+    if SCREENSHOT_FORMAT == "jpeg":
+        return {"type": "jpeg", "quality": SCREENSHOT_QUALITY}
+
+    return {"type": "png"}
+
+
+def encode_screenshot(raw: bytes):
+    """
+    Convert a Playwright capture into (data, content_type, thumbnail)
+    """
+
+    if SCREENSHOT_FORMAT == "jpeg":
+        data, content_type = raw, CONTENT_TYPES["jpeg"]
+    else:
+        data, content_type = raw, CONTENT_TYPES["png"]
+
+    if Image is None:
+        if SCREENSHOT_FORMAT == "webp":
+            logging.warning("Pillow not installed → storing PNG screenshot")
+
+        return data, content_type, None
+
+    image = Image.open(io.BytesIO(raw))
+
+    if SCREENSHOT_FORMAT == "webp":
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=SCREENSHOT_QUALITY)
+        data, content_type = buffer.getvalue(), CONTENT_TYPES["webp"]
+
+    thumbnail = None
+
+    if THUMBNAIL_WIDTH > 0:
+        thumb = image.convert("RGB")
+        height = max(1, round(thumb.height * THUMBNAIL_WIDTH / thumb.width))
+        # Full-page captures are very tall; keep the top of the page
+        thumb = thumb.resize((THUMBNAIL_WIDTH, height))
+        thumb = thumb.crop((0, 0, THUMBNAIL_WIDTH, min(height, THUMBNAIL_WIDTH * 2)))
+
+        buffer = io.BytesIO()
+        thumb.save(buffer, format="JPEG", quality=70)
+        thumbnail = (buffer.getvalue(), CONTENT_TYPES["jpeg"])
+
+    return data, content_type, thumbnail
+
+# ---------- Content Addressing ----------
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+# ---------- Garbage Collection ----------
+
+def orphan_blob_delete_statement(digests=None, older_than=None):
+    """
+    DELETE blobs no crawl row points at, optionally only `digests`
+    and only blobs created before `older_than`
+    """
+
+    stmt = delete(ScreenshotBlob).where(
+        ~exists().where(CrawlResult.screenshot_sha256 == ScreenshotBlob.sha256),
+        ~exists().where(CrawlResult.thumbnail_sha256 == ScreenshotBlob.sha256),
+    )
+
+    if digests is not None:
+        stmt = stmt.where(ScreenshotBlob.sha256.in_(digests))
+
+    if older_than is not None:
+        stmt = stmt.where(ScreenshotBlob.created_at < older_than)
+
+    return stmt
+
+# ---------- Read Path (API) ----------
+
+async def get_blob_info(db, digest: str):
+    result = await db.execute(
+        select(
+            ScreenshotBlob.sha256,
+            ScreenshotBlob.content_type,
+            ScreenshotBlob.size
+        ).where(ScreenshotBlob.sha256 == digest)
+    )
+
+    return result.first()
+
+
+async def stream_blob(digest: str, start: int, end: int):
+    """
+    Yield bytes [start, end] in chunks without loading the whole blob
+    """
+
+    async with AsyncSessionLocal() as session:
+        offset = start
+
+        while offset <= end:
+            length = min(STREAM_CHUNK_SIZE, end - offset + 1)
+
+            result = await session.execute(
+                select(
+                    func.substring(ScreenshotBlob.data, offset + 1, length)
+                ).where(ScreenshotBlob.sha256 == digest)
+            )
+
+            chunk = result.scalar_one_or_none()
+
+            if not chunk:
+                return
+
+            yield bytes(chunk)
+            offset += len(chunk)
+
+
+def parse_range(header: str | None, size: int):
+    """
+    Parse a single 'bytes=' range into inclusive (start, end)
+    Returns None for no/ignored range, raises ValueError if unsatisfiable
+    """
+
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    first, _, last = header[len("bytes="):].strip().partition("-")
+
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError("Empty suffix range")
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        raise ValueError(f"Invalid range: {header}")
+
+    end = min(end, size - 1)
+
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+
+    return start, end
@@ -0,0 +1,251 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+from event_loop import run_async, loop_started
+
+# ---------- POOL CONFIG (PER WORKER PROCESS) ----------
+
+POOL_BROWSERS = int(os.getenv("CRAWLER_POOL_BROWSERS", "1"))
+POOL_CONTEXTS_PER_BROWSER = int(os.getenv("CRAWLER_POOL_CONTEXTS", "4"))
+BROWSER_MAX_PAGES = int(os.getenv("CRAWLER_BROWSER_MAX_PAGES", "200"))
+
+DEFAULT_DEVICE = "iPhone 13"
+
+# ---------- BROWSER SLOT ----------
+
+class _BrowserSlot:
+    """
+    One long-lived Chromium process plus its idle contexts (per device)
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.idle_contexts = {}
+        self.leases = 0
+        self.pages_served = 0
+        self.crashed = False
+        self.lock = asyncio.Lock()
+        # Set while no page is leased, so an over-budget slot can drain
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+    def needs_recycle(self) -> bool:
+        if self.browser is None or self.crashed:
+            return True
+
+        if not self.browser.is_connected():
+            return True
+
+        return self.over_budget() and self.leases == 0
+
+    def over_budget(self) -> bool:
+        return self.pages_served >= BROWSER_MAX_PAGES
+
+    def idle_count(self) -> int:
+        return sum(len(contexts) for contexts in self.idle_contexts.values())
+
+# ---------- BROWSER POOL ----------
+
+class BrowserPool:
+    """
+    Keeps Chromium warm across crawl tasks and hands out pages
+    from a bounded set of reusable browser contexts
+    """
+
+    def __init__(
+        self,
+        browsers: int = POOL_BROWSERS,
+        contexts_per_browser: int = POOL_CONTEXTS_PER_BROWSER
+    ):
+        self.browsers = max(1, browsers)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self._playwright = None
+        self._slots = [_BrowserSlot(i) for i in range(self.browsers)]
+        self._capacity = asyncio.Semaphore(
+            self.browsers * self.contexts_per_browser
+        )
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._start_lock:
+            if self._playwright is None:
+                logging.info(
+                    f"Starting browser pool: {self.browsers} browser(s) x "
+                    f"{self.contexts_per_browser} context(s)"
+                )
+                self._playwright = await async_playwright().start()
+
+    async def close(self):
+        for slot in self._slots:
+            await self._close_slot(slot)
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+        logging.info("Browser pool closed")
+
+    # ---------- Browser Lifecycle ----------
+
+    async def _launch(self, slot: _BrowserSlot):
+        logging.info(f"Launching browser #{slot.index}...")
+
+        browser = await self._playwright.chromium.launch(headless=True)
+
+        def on_disconnected(_):
+            slot.crashed = True
+            logging.warning(f"Browser #{slot.index} disconnected")
+
+        browser.on("disconnected", on_disconnected)
+
+        slot.browser = browser
+        slot.idle_contexts = {}
+        slot.pages_served = 0
+        slot.crashed = False
+
+    async def _close_slot(self, slot: _BrowserSlot):
+        for contexts in slot.idle_contexts.values():
+            for context in contexts:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+        slot.idle_contexts = {}
+
+        if slot.browser is not None:
+            try:
+                await slot.browser.close()
+            except Exception:
+                pass
+
+            slot.browser = None
+
+    async def _ensure_browser(self, slot: _BrowserSlot):
+        async with slot.lock:
+            if slot.needs_recycle():
+                if slot.browser is not None:
+                    logging.info(
+                        f"Recycling browser #{slot.index} after "
+                        f"{slot.pages_served} page(s)"
+                    )
+
+                await self._close_slot(slot)
+                await self._launch(slot)
+
+    def _pick_slot(self) -> _BrowserSlot:
+        return min(
+            self._slots,
+            key=lambda s: (s.crashed, s.over_budget() and s.leases > 0, s.leases)
+        )
+
+    # ---------- Context Leasing ----------
+
+    async def _acquire_context(self, slot: _BrowserSlot, device: str):
+        idle = slot.idle_contexts.get(device)
+
+        if idle:
+            return idle.pop()
+
+        descriptor = self._playwright.devices[device]
+        return await slot.browser.new_context(**descriptor)
+
+    async def _release_context(self, slot: _BrowserSlot, context, browser, device: str):
+        reusable = (
+            browser is slot.browser
+            and not slot.crashed
+            and slot.pages_served < BROWSER_MAX_PAGES
+            and slot.idle_count() < self.contexts_per_browser
+        )
+
+        if reusable:
+            try:
+                await context.clear_cookies()
+                slot.idle_contexts.setdefault(device, []).append(context)
+                return
+            except Exception:
+                pass
+
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self, device: str = DEFAULT_DEVICE):
+        """
+        Lease a fresh page on a warm browser context emulating `device`
+        (a Playwright device name); contexts are reused per device
+        """
+
+        await self.start()
+
+        async with self._capacity:
+            slot = self._pick_slot()
+
+            # An over-budget slot takes no new leases until its pages finish,
+            # otherwise under steady load it would never reach 0 and recycle
+            while slot.over_budget() and slot.leases > 0:
+                await slot.drained.wait()
+                slot = self._pick_slot()
+
+            await self._ensure_browser(slot)
+
+            browser = slot.browser
+            slot.leases += 1
+            slot.drained.clear()
+
+            try:
+                context = await self._acquire_context(slot, device)
+                page = await context.new_page()
+
+                try:
+                    yield page
+                finally:
+                    slot.pages_served += 1
+
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+
+                    await self._release_context(slot, context, browser, device)
+
+            finally:
+                slot.leases -= 1
+
+                if slot.leases == 0:
+                    slot.drained.set()
+
+                if slot.needs_recycle() and slot.browser is browser:
+                    await self._ensure_browser(slot)
+
+# ---------- PROCESS-WIDE POOL ----------
+
+_pool = None
+_pool_pid = None
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool, _pool_pid
+
+    # A forked child must never reuse the parent's browsers
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = BrowserPool()
+        _pool_pid = os.getpid()
+
+    return _pool
+
+
+def shutdown_browser_pool():
+    global _pool
+
+    if _pool is None or _pool_pid != os.getpid() or not loop_started():
+        return
+
+    run_async(_pool.close())
+    _pool = None
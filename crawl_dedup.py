@@ -0,0 +1,138 @@
+import os
+import uuid
+import hashlib
+import logging
+from urllib.parse import urlsplit, urlunsplit
+import redis
+import redis.asyncio as aioredis
+
+# ---------- DEDUP CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Upper bound on one crawl attempt; a crashed worker's marker expires after
+# this. Deferred / retried crawls extend it by their countdown (refresh_crawl)
+INFLIGHT_TTL = int(os.getenv("CRAWL_INFLIGHT_TTL", "300"))
+
+# Default freshness window for POST /audit (0 = always crawl)
+FRESHNESS_SECONDS = int(os.getenv("CRAWL_FRESHNESS_SECONDS", "0"))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Delete the marker only if it still belongs to this task
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend the marker of a deferred / retried crawl; re-take it if it lapsed,
+# but never from a newer crawl that claimed the URL meanwhile
+_REFRESH_SCRIPT = """
+local holder = redis.call('get', KEYS[1])
+if holder == false or holder == ARGV[1] then
+    redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# ---------- URL Normalization ----------
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used both as the dedup key and as the stored URL:
+    lower-case scheme/host, no default port, no fragment, "/" for empty paths
+    """
+
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    if parts.username:
+        auth = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{auth}@{host}"
+
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def _inflight_key(url: str, variant: str = "", force: bool = False) -> str:
+    # variant: crawls of one URL with different profiles are not interchangeable;
+    # a forced crawl must not be answered by a running conditional one either
+    payload = f"{url}\n{variant}\n{int(force)}".encode("utf-8")
+    return "crawl-inflight:" + hashlib.sha1(payload).hexdigest()
+
+# ---------- Clients (Per Process) ----------
+
+_sync_client = None
+_async_client = None
+_client_pid = None
+
+
+def _clients():
+    global _sync_client, _async_client, _client_pid
+
+    if _client_pid != os.getpid():
+        _sync_client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _async_client = aioredis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _sync_client, _async_client
+
+# ---------- Coalescing ----------
+
+async def claim_crawl(url: str, variant: str = "", force: bool = False) -> tuple[str, bool]:
+    """
+    (task id, claimed): a fresh id we now own, or the id of the
+    crawl of this URL that is already in flight
+    """
+
+    task_id = str(uuid.uuid4())
+    key = _inflight_key(url, variant, force)
+    client = _clients()[1]
+
+    try:
+        # Two tries: the holder may finish between SET NX and GET
+        for _ in range(2):
+            if await client.set(key, task_id, nx=True, ex=INFLIGHT_TTL):
+                return task_id, True
+
+            existing = await client.get(key)
+
+            if existing is not None:
+                return existing.decode(), False
+
+    except Exception as e:
+        # Without Redis every request simply gets its own crawl
+        logging.warning(f"Crawl dedup unavailable: {e}")
+
+    return task_id, True
+
+
+def refresh_crawl(url: str, task_id: str, countdown: float, variant: str = "", force: bool = False):
+    """
+    Keep coalescing onto a crawl that is about to wait `countdown` seconds
+    """
+
+    ttl = INFLIGHT_TTL + int(countdown) + 1
+
+    try:
+        _clients()[0].eval(_REFRESH_SCRIPT, 1, _inflight_key(url, variant, force), task_id, ttl)
+    except Exception as e:
+        logging.warning(f"Could not refresh in-flight marker for {url}: {e}")
+
+
+def release_crawl(url: str, task_id: str, variant: str = "", force: bool = False):
+    try:
+        _clients()[0].eval(_RELEASE_SCRIPT, 1, _inflight_key(url, variant, force), task_id)
+    except Exception as e:
+        logging.warning(f"Could not release in-flight marker for {url}: {e}")
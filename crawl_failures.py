@@ -0,0 +1,243 @@
+import os
+import random
+import asyncio
+import logging
+import redis
+import redis.asyncio as aioredis
+
+from politeness import domain_of
+
+# ---------- FAILURE HANDLING CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Celery re-deliveries of a transiently failed crawl (0 = never retry)
+CRAWL_MAX_RETRIES = int(os.getenv("CRAWL_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("CRAWL_RETRY_BASE_DELAY", "5"))
+RETRY_MAX_DELAY = float(os.getenv("CRAWL_RETRY_MAX_DELAY", "300"))
+
+# Host-level failures within the window that open a host's circuit, and for how long
+BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "120"))
+BREAKER_COOLDOWN = int(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "300"))
+
+DNS = "dns"
+TLS = "tls"
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+HTTP_4XX = "http_4xx"
+HTTP_5XX = "http_5xx"
+BROWSER_CRASH = "browser_crash"
+CIRCUIT_OPEN = "circuit_open"
+OTHER = "other"
+
+# Chromium net:: error codes (in Playwright error messages) per class
+NET_ERRORS = {
+    DNS: ("ERR_NAME_NOT_RESOLVED", "ERR_NAME_RESOLUTION_FAILED"),
+    TLS: ("ERR_CERT_", "ERR_SSL_", "ERR_BAD_SSL_"),
+    TIMEOUT: ("ERR_TIMED_OUT", "ERR_CONNECTION_TIMED_OUT"),
+    CONNECTION: (
+        "ERR_CONNECTION_REFUSED", "ERR_CONNECTION_RESET", "ERR_CONNECTION_CLOSED",
+        "ERR_CONNECTION_FAILED", "ERR_EMPTY_RESPONSE", "ERR_ADDRESS_UNREACHABLE",
+        "ERR_INTERNET_DISCONNECTED", "ERR_NETWORK_CHANGED",
+    ),
+}
+
+BROWSER_CRASH_MESSAGES = (
+    "target closed", "has been closed", "page crashed", "browser closed",
+    "connection closed",
+)
+
+# Same host, same answer next time: not worth a retry
+PERMANENT = {DNS, TLS, HTTP_4XX, CIRCUIT_OPEN}
+
+# 4xx statuses that do go away on their own
+RETRYABLE_4XX = {408, 425, 429}
+
+# Say something about the host (not the page or our browser): counted by the breaker
+HOST_FAILURES = {DNS, TLS, TIMEOUT, CONNECTION, HTTP_5XX}
+
+# ---------- Classification ----------
+
+class HTTPStatusError(Exception):
+    """
+    Navigation finished with a 4xx/5xx main document
+    """
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+
+
+class CrawlFailed(Exception):
+    """
+    Raised by the Celery task once a crawl has finally failed, so the task
+    ends in FAILURE instead of a "successful" failed result
+    """
+
+
+def classify_failure(error: BaseException) -> str:
+    if isinstance(error, HTTPStatusError):
+        return HTTP_5XX if error.status >= 500 else HTTP_4XX
+
+    message = str(error)
+
+    for failure, codes in NET_ERRORS.items():
+        if any(code in message for code in codes):
+            return failure
+
+    # playwright TimeoutError subclasses its Error, not the builtin
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) \
+            or type(error).__name__ == "TimeoutError":
+        return TIMEOUT
+
+    lowered = message.lower()
+
+    if any(text in lowered for text in BROWSER_CRASH_MESSAGES):
+        return BROWSER_CRASH
+
+    return OTHER
+
+
+def is_retryable(failure: str, status: int | None = None) -> bool:
+    if failure == HTTP_4XX:
+        return status in RETRYABLE_4XX
+
+    return failure not in PERMANENT
+
+
+def failed_result(url: str, error: BaseException) -> dict:
+    """
+    The {"status": "failed"} crawl result, with its failure class
+    """
+
+    failure = classify_failure(error)
+    status = getattr(error, "status", None)
+
+    result = {
+        "status": "failed",
+        "url": url,
+        "error": str(error),
+        "failure": failure,
+        "retryable": is_retryable(failure, status),
+    }
+
+    if status is not None:
+        result["http_status"] = status
+
+    return result
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full jitter exponential backoff for retry number `attempt` (0-based)
+    """
+
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+# ---------- Circuit Breaker (Per Host, Redis) ----------
+
+# Count a failure; at the threshold open the circuit and leave the counter one
+# short of it, so the first failure after the cooldown (half-open) reopens it.
+# Returns the open time in ms, or 0 while the circuit stays closed.
+_FAILURE_SCRIPT = """
+local failures, open = KEYS[1], KEYS[2]
+local threshold, window, cooldown = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+
+local count = redis.call('incr', failures)
+redis.call('pexpire', failures, window)
+
+if count < threshold then
+    return 0
+end
+
+redis.call('set', open, 1, 'px', cooldown)
+redis.call('set', failures, threshold - 1, 'px', cooldown + window)
+return cooldown
+"""
+
+_sync_client = None
+_async_client = None
+_client_pid = None
+
+
+def _clients():
+    global _sync_client, _async_client, _client_pid
+
+    if _client_pid != os.getpid():
+        _sync_client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _async_client = aioredis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _sync_client, _async_client
+
+
+def _keys(url: str) -> list:
+    domain = domain_of(url)
+    return [f"breaker:failures:{domain}", f"breaker:open:{domain}"]
+
+
+def _seconds(pttl) -> float:
+    return pttl / 1000 if pttl and pttl > 0 else 0.0
+
+
+def circuit_open(url: str) -> float:
+    """
+    Seconds until the host's circuit closes again (0 = go ahead)
+    """
+
+    try:
+        return _seconds(_clients()[0].pttl(_keys(url)[1]))
+    except Exception as e:
+        # Fail open, like the politeness leases
+        logging.warning(f"Circuit breaker unavailable: {e}")
+        return 0.0
+
+
+async def circuit_open_async(url: str) -> float:
+    try:
+        return _seconds(await _clients()[1].pttl(_keys(url)[1]))
+    except Exception as e:
+        logging.warning(f"Circuit breaker unavailable: {e}")
+        return 0.0
+
+
+async def record_failure_async(url: str, failure: str):
+    if failure not in HOST_FAILURES:
+        return
+
+    try:
+        opened_ms = await _clients()[1].eval(
+            _FAILURE_SCRIPT, 2, *_keys(url),
+            BREAKER_THRESHOLD, BREAKER_WINDOW * 1000, BREAKER_COOLDOWN * 1000
+        )
+    except Exception as e:
+        logging.warning(f"Could not record host failure: {e}")
+        return
+
+    if opened_ms:
+        logging.warning(
+            f"Circuit opened for {domain_of(url)} ({failure}) "
+            f"for {opened_ms / 1000:.0f}s"
+        )
+
+
+async def record_success_async(url: str):
+    try:
+        await _clients()[1].delete(*_keys(url))
+    except Exception as e:
+        logging.warning(f"Could not reset host failures: {e}")
+
+
+def circuit_open_result(url: str, open_for: float) -> dict:
+    return {
+        "status": "failed",
+        "url": url,
+        "error": f"Circuit open for {domain_of(url)}, retry in {open_for:.0f}s",
+        "failure": CIRCUIT_OPEN,
+        "retryable": False,
+    }
@@ -0,0 +1,149 @@
+import os
+import json
+from urllib.parse import urlsplit
+
+# ---------- PROFILE CONFIG ----------
+
+DEFAULT_PROFILE = os.getenv("CRAWLER_DEFAULT_PROFILE", "full")
+
+# Logical device → Playwright device descriptor
+DEVICES = {
+    "mobile": "iPhone 13",
+    "desktop": "Desktop Chrome",
+}
+
+WAIT_EVENTS = {"load", "domcontentloaded", "networkidle"}
+SCREENSHOT_MODES = {"full", "viewport", "none"}
+BLOCKABLE_RESOURCES = {"image", "media", "font", "stylesheet"}
+
+# Third-party analytics/ad hosts dropped when block_trackers is on
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "ads.linkedin.com",
+    "adservice.google.com",
+)
+
+# ---------- Profiles ----------
+
+PROFILES = {
+    # What every crawl did before profiles existed
+    "full": {
+        "device": "mobile",
+        "wait_until": "load",
+        "screenshot": "full",
+        "block_resources": [],
+        "block_trackers": False,
+    },
+    # DOM only: no heavy assets, no screenshot
+    "text": {
+        "device": "desktop",
+        "wait_until": "domcontentloaded",
+        "screenshot": "none",
+        "block_resources": ["image", "media", "font"],
+        "block_trackers": True,
+    },
+    # Above-the-fold preview
+    "preview": {
+        "device": "mobile",
+        "wait_until": "domcontentloaded",
+        "screenshot": "viewport",
+        "block_resources": ["media"],
+        "block_trackers": True,
+    },
+    "desktop": {
+        "device": "desktop",
+        "wait_until": "load",
+        "screenshot": "full",
+        "block_resources": [],
+        "block_trackers": False,
+    },
+    # Late-loading SPAs
+    "spa": {
+        "device": "desktop",
+        "wait_until": "networkidle",
+        "screenshot": "full",
+        "block_resources": ["media"],
+        "block_trackers": True,
+    },
+}
+
+
+def resolve_profile(name: str | None = None, **overrides) -> dict:
+    """
+    Named profile plus per-request overrides (None values are ignored)
+    Raises ValueError on unknown names or values
+    """
+
+    name = name or DEFAULT_PROFILE
+
+    if name not in PROFILES:
+        raise ValueError(f"Unknown crawl profile: {name}")
+
+    profile = {"name": name, **PROFILES[name]}
+    profile.update({k: v for k, v in overrides.items() if v is not None})
+
+    if profile["device"] not in DEVICES:
+        raise ValueError(f"Unknown device: {profile['device']}")
+
+    if profile["wait_until"] not in WAIT_EVENTS:
+        raise ValueError(f"Unknown wait_until: {profile['wait_until']}")
+
+    if profile["screenshot"] not in SCREENSHOT_MODES:
+        raise ValueError(f"Unknown screenshot mode: {profile['screenshot']}")
+
+    unknown = set(profile["block_resources"]) - BLOCKABLE_RESOURCES
+
+    if unknown:
+        raise ValueError(f"Cannot block resource type(s): {', '.join(sorted(unknown))}")
+
+    profile["block_resources"] = sorted(set(profile["block_resources"]))
+
+    return profile
+
+
+def profile_key(profile: dict | None) -> str:
+    """
+    Stable string for a resolved profile (crawl dedup keys)
+    """
+
+    return json.dumps(profile, sort_keys=True) if profile else ""
+
+# ---------- Request Interception ----------
+
+def _is_tracker(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+
+async def apply_blocking(page, profile: dict):
+    """
+    Abort blocked resource types / tracker hosts on this page only,
+    so the pooled context stays clean for the next lease
+    """
+
+    blocked_types = set(profile["block_resources"])
+    block_trackers = profile["block_trackers"]
+
+    if not blocked_types and not block_trackers:
+        return
+
+    async def handle(route):
+        request = route.request
+
+        if request.resource_type in blocked_types or (block_trackers and _is_tracker(request.url)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle)
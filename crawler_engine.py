@@ -1,16 +1,35 @@
+import os
+import random
 import asyncio
+import hashlib
 import logging
-import base64
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright
-from sqlalchemy import select
-
-from database import SyncSessionLocal, CrawlResult
+from sqlalchemy import select, update
+
+from database import AsyncSessionLocal, CrawlResult
+from browser_pool import get_browser_pool
+from blob_store import screenshot_options, encode_screenshot, blob_digest
+from html_store import dictionary_for_url, compress_html
+from result_writer import CrawlResultWriter, write_crawl_results
+from crawl_profiles import DEVICES, resolve_profile, apply_blocking
+from politeness import try_acquire_async, release_async
+from metrics import CRAWL_STAGE_SECONDS, CRAWL_PAGES
+from audit_version import bump_audit_version
+from crawl_failures import (
+    CRAWL_MAX_RETRIES, HTTPStatusError, backoff_delay, classify_failure, is_retryable,
+    failed_result, circuit_open_async, circuit_open_result,
+    record_failure_async, record_success_async
+)
 
 # Load environment
 load_dotenv()
 
+BATCH_CONCURRENCY = int(os.getenv("CRAWLER_BATCH_CONCURRENCY", "4"))
+
+# In-process navigation attempts; later retries go through Celery (crawl_failures)
+NAVIGATION_ATTEMPTS = int(os.getenv("CRAWLER_NAVIGATION_ATTEMPTS", "1"))
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,103 +38,436 @@ logging.basicConfig(
 
 # ---------- Retry Helper ----------
 
-async def retry_goto(page, url, retries=3, delay=2):
+async def retry_goto(page, url, retries=NAVIGATION_ATTEMPTS, delay=1, wait_until="load"):
+    """
+    Navigate, raising HTTPStatusError for a 4xx/5xx document
+    Only transient failures are retried (exponential backoff with jitter)
+    """
+
     for attempt in range(1, retries + 1):
         try:
             logging.info(f"Attempt {attempt}: navigating to {url}")
-            await page.goto(url, timeout=20000)
-            return
+            response = await page.goto(url, timeout=20000, wait_until=wait_until)
+
+            if response is not None and response.status >= 400:
+                raise HTTPStatusError(response.status, url)
+
+            return response
+
         except Exception as e:
-            logging.error(f"Navigation failed: {e}")
+            failure = classify_failure(e)
+            logging.error(f"Navigation failed ({failure}): {e}")
 
-            if attempt == retries:
+            if attempt == retries or not is_retryable(failure, getattr(e, "status", None)):
                 raise
 
-            await asyncio.sleep(delay)
+            await asyncio.sleep(random.uniform(0, delay * 2 ** (attempt - 1)))
+
+# ---------- Incremental Recrawl ----------
+
+async def load_validators(url: str):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                CrawlResult.etag,
+                CrawlResult.last_modified,
+                CrawlResult.content_hash
+            ).where(CrawlResult.url == url)
+        )
+
+        return result.first()
+
+
+def response_validators(headers: dict, body: bytes) -> dict:
+    return {
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "content_hash": hashlib.sha256(body).hexdigest() if body is not None else None,
+    }
+
+
+async def check_unchanged(page, url: str, stored) -> dict | None:
+    """
+    Cheap conditional GET (no rendering)
+    Returns fresh validators when the page is unchanged, else None
+    """
+
+    headers = {}
+
+    if stored.etag:
+        headers["If-None-Match"] = stored.etag
+    if stored.last_modified:
+        headers["If-Modified-Since"] = stored.last_modified
+
+    response = await page.request.get(url, headers=headers, timeout=20000)
+
+    try:
+        if response.status == 304:
+            logging.info("Not modified (304) → skipping render")
+            return {"etag": stored.etag, "last_modified": stored.last_modified}
+
+        if not response.ok or not stored.content_hash:
+            return None
+
+        validators = response_validators(response.headers, await response.body())
+
+        if validators["content_hash"] == stored.content_hash:
+            logging.info("Content hash unchanged → skipping render")
+            return validators
+
+        return None
+
+    finally:
+        await response.dispose()
+
+
+async def navigation_validators(response) -> dict:
+    if response is None:
+        return response_validators({}, None)
+
+    try:
+        body = await response.body()
+    except Exception:
+        body = None
+
+    return response_validators(await response.all_headers(), body)
+
+
+async def mark_checked(url: str, validators: dict):
+    values = {k: v for k, v in validators.items() if v is not None}
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(CrawlResult)
+            .where(CrawlResult.url == url)
+            .values(last_checked_at=datetime.now(timezone.utc), **values)
+        )
+        await session.commit()
+
+    await bump_audit_version()
 
 # ---------- MAIN CRAWLER ----------
 
-async def run_crawler_task(url: str):
+async def run_crawler_task(
+    url: str,
+    force: bool = False,
+    writer: CrawlResultWriter | None = None,
+    progress=None,
+    profile: dict | None = None,
+    discover_links: bool = False
+):
+    """
+    progress: optional async callable(stage, **data) for live stage events
+    profile: resolved crawl profile (see crawl_profiles), default if None
+    discover_links: also return the page's resolved <a href> URLs (site crawls)
+    """
 
-    async with async_playwright() as p:
+    profile = profile or resolve_profile()
 
-        logging.info("Launching browser...")
+    async def report(stage, **data):
+        if progress is not None:
+            await progress(stage, url=url, **data)
 
-        browser = await p.chromium.launch(headless=True)
+    pool = get_browser_pool()
+    watch = CRAWL_STAGE_SECONDS.stopwatch()
 
-        iphone_13 = p.devices["iPhone 13"]
-        context = await browser.new_context(**iphone_13)
-        page = await context.new_page()
+    async with pool.page(DEVICES[profile["device"]]) as page:
+
+        watch.lap("browser_lease")
 
         try:
+            # Links only exist in the rendered page, so a site crawl never
+            # short-circuits on an unchanged page (it would stop expanding)
+            stored = None if force or discover_links else await load_validators(url)
+
+            if stored is not None and (stored.etag or stored.last_modified or stored.content_hash):
+                try:
+                    unchanged = await check_unchanged(page, url, stored)
+                except Exception as e:
+                    logging.warning(f"Conditional check failed, rendering: {e}")
+                    unchanged = None
+
+                watch.lap("conditional_check")
+
+                if unchanged is not None:
+                    await mark_checked(url, unchanged)
+                    await record_success_async(url)
+                    await report("not_modified")
+
+                    watch.total()
+                    CRAWL_PAGES.inc(status="not_modified")
+
+                    return {
+                        "status": "not_modified",
+                        "url": url
+                    }
+
             logging.info(f"Navigating to {url}")
+            await report("navigating")
+
+            # Skip heavy assets / trackers the profile does not need
+            await apply_blocking(page, profile)
 
             # Visit page
-            await retry_goto(page, url)
+            response = await retry_goto(page, url, wait_until=profile["wait_until"])
+
+            validators = await navigation_validators(response)
+
+            watch.lap("navigate")
 
             # Extract data
             page_title = await page.title()
             html_content = await page.content()
 
             logging.info(f"Page title: {page_title}")
+            await report("rendered", title=page_title)
 
-            # Screenshot
-            screenshot_bytes = await page.screenshot(full_page=True)
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode()
+            # The browser resolves relative hrefs against <base> and the final URL
+            links = await page.eval_on_selector_all(
+                "a[href]", "els => els.map(e => e.href)"
+            ) if discover_links else None
 
-            logging.info("Screenshot captured")
+            watch.lap("render")
 
-            # ---------- SYNC DB WRITE (CELERY SAFE) ----------
+            # Screenshot (full page, viewport only, or skipped)
+            blobs = {}
+            screenshot_columns = {}
 
-            with SyncSessionLocal() as session:
+            if profile["screenshot"] != "none":
+                screenshot_bytes = await page.screenshot(
+                    full_page=profile["screenshot"] == "full",
+                    **screenshot_options()
+                )
 
-                result = session.execute(
-                    select(CrawlResult).where(CrawlResult.url == url)
+                # Optional WebP conversion / thumbnail run off the event loop
+                screenshot_data, screenshot_type, thumbnail = await asyncio.to_thread(
+                    encode_screenshot, screenshot_bytes
                 )
 
-                row = result.scalar_one_or_none()
+                blobs[blob_digest(screenshot_data)] = (screenshot_data, screenshot_type)
+
+                if thumbnail:
+                    blobs[blob_digest(thumbnail[0])] = thumbnail
 
-                if row:
-                    logging.info("Existing URL found → updating record")
+                # Omitted entirely without a screenshot, so the upsert keeps the old one
+                screenshot_columns = {
+                    "screenshot_sha256": blob_digest(screenshot_data),
+                    "thumbnail_sha256": blob_digest(thumbnail[0]) if thumbnail else None,
+                }
 
-                    row.title = page_title
-                    row.screenshot_b64 = screenshot_b64
-                    row.html_content = html_content
-                    row.created_at = datetime.now(timezone.utc)
+                logging.info("Screenshot captured")
+                await report("screenshotted")
 
-                else:
-                    logging.info("New URL → inserting record")
+                watch.lap("screenshot")
 
-                    new_entry = CrawlResult(
-                        url=url,
-                        title=page_title,
-                        screenshot_b64=screenshot_b64,
-                        html_content=html_content,
-                        created_at=datetime.now(timezone.utc)
-                    )
+            # ---------- Build Row ----------
 
-                    session.add(new_entry)
+            # Cached per domain; only touches the DB on a cache miss
+            html_dict_id, dictionary = await dictionary_for_url(url)
 
-                session.commit()
+            # zstd releases the GIL, so other pages keep rendering meanwhile
+            html_zstd = await asyncio.to_thread(
+                compress_html, html_content, dictionary
+            )
 
-            logging.info("Database commit successful")
+            watch.lap("compress")
 
-            return {
+            now = datetime.now(timezone.utc)
+
+            row = {
+                "url": url,
+                "title": page_title,
+                **screenshot_columns,
+                "html_zstd": html_zstd,
+                "html_dict_id": html_dict_id,
+                "html_size": len(html_content),
+                "html_content": None,
+                "text_content": None,
+                "text_version": None,
+                "embedding": None,
+                "embedding_model": None,
+                # Lets the similarity index see the vector was cleared
+                "embedding_updated_at": now,
+                "etag": validators["etag"],
+                "last_modified": validators["last_modified"],
+                "content_hash": validators["content_hash"],
+                "created_at": now,
+                "last_checked_at": now,
+            }
+
+            result = {
                 "status": "completed",
                 "url": url,
                 "title": page_title
             }
 
+            if links is not None:
+                result["links"] = links
+
+            # ---------- ASYNC DB WRITE (UPSERT) ----------
+
+            await record_success_async(url)
+
+            if writer is not None:
+                # Batch crawls flush many pages per round trip
+                await writer.add(row, blobs)
+
+                watch.total()
+                CRAWL_PAGES.inc(status="completed")
+                return result
+
+            outcome = (await write_crawl_results([row], blobs))[0]
+
+            if outcome["action"] == "failed":
+                raise RuntimeError(f"Database write failed: {outcome['error']}")
+
+            logging.info(f"Database upsert successful ({outcome['action']})")
+            await report("stored", crawl_id=outcome["id"], action=outcome["action"])
+
+            result["crawl_id"] = outcome["id"]
+            result["action"] = outcome["action"]
+
+            watch.total()
+            CRAWL_PAGES.inc(status="completed")
+            return result
+
         except Exception as e:
-            logging.error(f"Crawler failed: {e}")
+            result = failed_result(url, e)
 
-            return {
-                "status": "failed",
-                "url": url,
-                "error": str(e)
-            }
+            logging.error(f"Crawler failed ({result['failure']}): {e}")
+            CRAWL_PAGES.inc(status="failed")
+
+            # Dead / refusing hosts trip the per-host circuit breaker
+            await record_failure_async(url, result["failure"])
+
+            return result
+
+# ---------- BATCH CRAWLER ----------
+
+async def wait_for_domain_lease(url: str, progress=None) -> str:
+    """
+    Sleep until the host's politeness limits allow another page,
+    then return the lease token
+    """
+
+    while True:
+        token, wait = await try_acquire_async(url)
+
+        if token is not None:
+            return token
+
+        if progress is not None:
+            await progress("deferred", url=url, retry_in=round(wait, 2))
+
+        await asyncio.sleep(wait + random.uniform(0, 0.25))
+
+
+async def run_batch_crawl(
+    urls: list,
+    concurrency: int | None = None,
+    force: bool = False,
+    progress=None,
+    profile: dict | None = None,
+    discover_links: bool = False
+):
+    """
+    Crawl many URLs concurrently as pages on the worker's warm browser pool
+    """
+
+    limit = asyncio.Semaphore(max(1, concurrency or BATCH_CONCURRENCY))
+    write_outcomes = {}
+
+    def on_flush(outcomes):
+        for outcome in outcomes:
+            write_outcomes[outcome["url"]] = outcome
+
+    writer = CrawlResultWriter(on_flush=on_flush)
+
+    async def crawl_once(url):
+        token = None
+
+        try:
+            async with limit:
+                # Leased only once a slot is ours, so the host's politeness
+                # window covers the requests themselves, not the queueing
+                token = await wait_for_domain_lease(url, progress)
+
+                result = await run_crawler_task(
+                    url, force, writer, progress, profile, discover_links
+                )
+
+                return result
+
+        except Exception as e:
+            logging.error(f"Batch crawl failed for {url}: {e}")
+            return failed_result(url, e)
 
         finally:
-            await context.close()
-            await browser.close()
-            logging.info("Browser closed")
+            if token is not None:
+                await release_async(url, token)
+
+    async def crawl_one(url):
+        for attempt in range(CRAWL_MAX_RETRIES + 1):
+            # Hosts that keep failing are skipped instead of timing out page by page
+            open_for = await circuit_open_async(url)
+
+            if open_for:
+                CRAWL_PAGES.inc(status="circuit_open")
+                return circuit_open_result(url, open_for)
+
+            result = await crawl_once(url)
+
+            if result["status"] != "failed" or not result["retryable"] or attempt == CRAWL_MAX_RETRIES:
+                return result
+
+            # Back off without a slot or lease, so other URLs keep crawling
+            delay = backoff_delay(attempt)
+
+            if progress is not None:
+                await progress(
+                    "retrying", url=url, failure=result["failure"],
+                    attempt=attempt + 1, retry_in=round(delay, 2)
+                )
+
+            await asyncio.sleep(delay)
+
+    logging.info(f"Starting batch crawl of {len(urls)} URL(s)")
+
+    results = await asyncio.gather(*(crawl_one(url) for url in urls))
+
+    await writer.close()
+
+    # Attach per-row write outcomes to the crawl results
+    for result in results:
+        outcome = write_outcomes.get(result["url"])
+
+        if outcome is None:
+            continue
+
+        if outcome["action"] == "failed":
+            result["status"] = "failed"
+            result["error"] = f"Database write failed: {outcome['error']}"
+        else:
+            result["crawl_id"] = outcome["id"]
+            result["action"] = outcome["action"]
+
+            if progress is not None:
+                await progress("stored", url=result["url"], crawl_id=outcome["id"], action=outcome["action"])
+
+    completed = sum(1 for r in results if r["status"] == "completed")
+    not_modified = sum(1 for r in results if r["status"] == "not_modified")
+    failed = len(urls) - completed - not_modified
+
+    logging.info(
+        f"Batch crawl finished: {completed} completed, "
+        f"{not_modified} not modified, {failed} failed"
+    )
+
+    return {
+        "status": "completed",
+        "total": len(urls),
+        "completed": completed,
+        "not_modified": not_modified,
+        "failed": failed,
+        "results": results
+    }
@@ -2,9 +2,9 @@ import os
 import asyncio
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP
-from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, declarative_base, deferred
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, LargeBinary, ForeignKey
+from sqlalchemy import create_engine, text
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -46,12 +46,144 @@ class CrawlResult(Base):
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, index=True, unique=True)
     title = Column(String)
-    screenshot_b64 = Column(Text)
-    html_content = Column(Text)
+    screenshot_sha256 = Column(String(64), index=True)
+    thumbnail_sha256 = Column(String(64), index=True)
+    # Heavy columns load only when explicitly requested
+    html_zstd = deferred(Column(LargeBinary))
+    html_dict_id = Column(Integer)
+    html_size = Column(Integer)
+    # Legacy uncompressed HTML (rows crawled before compression)
+    html_content = deferred(Column(Text))
+    # Cached LLM-ready text (cleared whenever the page is re-crawled)
+    text_content = deferred(Column(Text))
+    text_version = Column(Integer)
+    # Page embedding (float32 bytes) and the model that produced it
+    embedding = deferred(Column(LargeBinary))
+    embedding_model = Column(String)
+    embedding_updated_at = Column(TIMESTAMP(timezone=True), index=True)
+    # Recrawl validators
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String(64))
     created_at = Column(
         TIMESTAMP(timezone=True),
         default=lambda: datetime.now(timezone.utc)
     )
+    last_checked_at = Column(TIMESTAMP(timezone=True))
+
+
+class ScreenshotBlob(Base):
+    __tablename__ = "screenshot_blobs"
+
+    # Content addressed: identical screenshots are stored once
+    sha256 = Column(String(64), primary_key=True)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+class HtmlDictionary(Base):
+    __tablename__ = "html_dictionaries"
+
+    # Trained zstd dictionary; domain NULL means shared by all sites
+    id = Column(Integer, primary_key=True)
+    domain = Column(String, index=True)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer)
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+class WebsiteMetadata(Base):
+    __tablename__ = "website_metadata"
+
+    id = Column(Integer, primary_key=True, index=True)
+    crawl_id = Column(
+        Integer,
+        ForeignKey("crawl_results.id", ondelete="SET NULL"),
+        index=True
+    )
+    page_title = Column(String)
+    meta_description = Column(Text)
+    company_name = Column(String)
+    email = Column(String)
+    phone = Column(String)
+    domain = Column(String, index=True)
+    # all-MiniLM-L6-v2 vector stored as raw float32 bytes
+    embedding = deferred(Column(LargeBinary))
+    embedding_model = Column(String)
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+# ---------- SCHEMA UPGRADES ----------
+
+# create_all() never alters existing tables, so columns added after a
+# table was first created are applied here (idempotent, run on startup)
+
+SCHEMA_UPGRADES = [
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS screenshot_sha256 VARCHAR(64)",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS thumbnail_sha256 VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_crawl_results_screenshot_sha256 ON crawl_results (screenshot_sha256)",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS html_zstd BYTEA",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS html_dict_id INTEGER",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS html_size INTEGER",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS etag VARCHAR",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS last_modified VARCHAR",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMPTZ",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS text_content TEXT",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS text_version INTEGER",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS embedding BYTEA",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE website_metadata ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS embedding_updated_at TIMESTAMPTZ",
+    "CREATE INDEX IF NOT EXISTS ix_crawl_results_embedding_updated_at ON crawl_results (embedding_updated_at)",
+    # Blob reference checks (delete / garbage collection) look up both digests
+    "CREATE INDEX IF NOT EXISTS ix_crawl_results_thumbnail_sha256 ON crawl_results (thumbnail_sha256)",
+    # Images are already compressed; skip TOAST compression so substring() range reads stay cheap
+    "ALTER TABLE screenshot_blobs ALTER COLUMN data SET STORAGE EXTERNAL",
+    "ALTER TABLE crawl_results ALTER COLUMN html_zstd SET STORAGE EXTERNAL",
+]
+
+# Legacy base64 screenshots → screenshot_blobs, then drop the old column
+LEGACY_SCREENSHOT_MIGRATION = [
+    """
+    INSERT INTO screenshot_blobs (sha256, content_type, size, data, created_at)
+    SELECT encode(sha256(raw), 'hex'), 'image/png', length(raw), raw, now()
+    FROM (
+        SELECT decode(screenshot_b64, 'base64') AS raw
+        FROM crawl_results
+        WHERE screenshot_b64 IS NOT NULL
+    ) legacy
+    ON CONFLICT (sha256) DO NOTHING
+    """,
+    """
+    UPDATE crawl_results
+    SET screenshot_sha256 = encode(sha256(decode(screenshot_b64, 'base64')), 'hex')
+    WHERE screenshot_b64 IS NOT NULL AND screenshot_sha256 IS NULL
+    """,
+    "ALTER TABLE crawl_results DROP COLUMN screenshot_b64",
+]
+
+
+def upgrade_schema(conn):
+    for statement in SCHEMA_UPGRADES:
+        conn.execute(text(statement))
+
+    legacy = conn.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'crawl_results' AND column_name = 'screenshot_b64'"
+    )).first()
+
+    if legacy:
+        for statement in LEGACY_SCREENSHOT_MIGRATION:
+            conn.execute(text(statement))
 
 # ---------- DB INIT ----------
 
@@ -61,6 +193,7 @@ async def init_db(retries: int = 10, delay: float = 1.0):
         try:
             async with async_engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(upgrade_schema)
 
             print("Database initialized successfully")
             return
@@ -0,0 +1,55 @@
+import os
+import asyncio
+import threading
+
+# ---------- PERSISTENT EVENT LOOP (PER PROCESS) ----------
+
+# Celery tasks are synchronous; instead of asyncio.run() per task (which
+# throws away browsers, HTTP connection pools and DB pools every time) all
+# async work in a process runs on one long-lived loop in a daemon thread.
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    global _loop, _loop_pid
+
+    with _loop_lock:
+        # Celery prefork children must not reuse the parent's loop
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+
+            thread = threading.Thread(
+                target=_loop.run_forever,
+                name="persistent-loop",
+                daemon=True
+            )
+            thread.start()
+
+        return _loop
+
+
+def loop_started() -> bool:
+    return _loop is not None and _loop_pid == os.getpid()
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the process's persistent loop and wait for it
+    """
+
+    loop = get_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_async() called from the persistent loop; await instead")
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -1,17 +1,17 @@
-// frontend/app/page.js (Simplified UI with Polling and Delete)
+// frontend/app/page.js (Simplified UI with Live Progress and Delete)
 'use client';
 
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 // Import the deleteAudit helper
-import { createAudit, fetchAudits, deleteAudit } from '../utils/api'; 
-
-const POLLING_INTERVAL = 5000; // Poll every 5 seconds
+import { createAudit, fetchAudits, deleteAudit, screenshotUrl, subscribeTask } from '../utils/api'; 
 
 export default function Dashboard() {
   const [url, setUrl] = useState('');
   const [audits, setAudits] = useState([]);
   const [isScanning, setIsScanning] = useState(false);
   const [validationError, setValidationError] = useState(null); // NEW: State for URL validation
+  const [stage, setStage] = useState(null); // Latest crawl stage pushed by the backend
+  const unsubscribeRef = useRef(null);
 
   const loadAudits = useCallback(async () => {
     try {
@@ -24,43 +24,16 @@ export default function Dashboard() {
     }
   }, []);
 
-  // --- POLLING LOGIC ---
+  // --- INITIAL LOAD (updates arrive as task events, no polling) ---
   useEffect(() => {
     loadAudits();
-    
-    let intervalId;
-
-    if (isScanning && url) { 
-        setValidationError(null); // Clear error when starting scan
-        
-        try {
-            const submittedUrlBase = new URL(url).origin + new URL(url).pathname;
-        
-            intervalId = setInterval(async () => {
-                const latestAudits = await loadAudits();
-                
-                const isNewRecordFound = latestAudits.some(audit => 
-                    audit.url.startsWith(submittedUrlBase) && audit.title
-                );
-                
-                if (isNewRecordFound) {
-                    clearInterval(intervalId);
-                    setIsScanning(false);
-                }
-            }, POLLING_INTERVAL); 
-        } catch (e) {
-            // This catches the 'Invalid URL' error during polling cleanup
-            console.error("Polling stopped due to unexpected URL format:", e);
-            setIsScanning(false);
-        }
-    }
 
     return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
+      if (unsubscribeRef.current) {
+        unsubscribeRef.current();
       }
     };
-  }, [isScanning, url, loadAudits]); 
+  }, [loadAudits]);
 
   // --- DELETE HANDLER ---
   const handleDelete = async (id) => {
@@ -89,19 +62,32 @@ export default function Dashboard() {
         return;
     }
     
-    // 3. Start Scan and Polling
+    // 3. Start Scan and follow its progress
     setIsScanning(true); 
-    await createAudit(url);
+    setStage('queued');
 
-    // 🔹 Wait for background crawler then refresh UI
-    setTimeout(async () => {
-      const data = await fetchAudits();
-      setAudits(data);
+    const { task_id } = await createAudit(url);
+
+    // Fresh stored result (no crawl started)
+    if (!task_id) {
+      await loadAudits();
       setIsScanning(false);
-    }, 4000);
+      return;
+    }
+
+    // 🔹 Refresh the list once, when the crawler reports it is done
+    unsubscribeRef.current = subscribeTask(task_id, async (event) => {
+      setStage(event.stage);
+
+      if (event.stage === 'completed' || event.stage === 'failed') {
+        unsubscribeRef.current = null;
+        await loadAudits();
+        setIsScanning(false);
+      }
+    });
   };
   // --- Rendering ---
-  const statusText = isScanning ? "Scanning..." : "Start Scan";
+  const statusText = isScanning ? `Scanning... (${stage})` : "Start Scan";
 
   return (
     <div className="container mx-auto p-4 max-w-2xl">
@@ -163,21 +149,22 @@ export default function Dashboard() {
                 </div>
 
                 {/* Screenshot Renderer (The Cool Part) */}
-                {audit.screenshot_b64 ? (
+                {audit.screenshot_sha256 ? (
                     <div className="mt-3 w-full">
                         <p className="text-xs text-gray-700 mb-1">Page Title: {audit.title || 'N/A'}</p>
                         <p className="text-xs font-medium mb-1">Screenshot Evidence:</p>
                         
                         {/* Core Rendering Logic */}
                         <img
-                            src={`data:image/png;base64,${audit.screenshot_b64}`}
+                            src={screenshotUrl(audit.id)}
                             alt={`Screenshot of ${audit.url}`}
+                            loading="lazy"
                             // Tailwind classes for display control
                             className="border rounded shadow-md max-w-full h-auto"
                         />
                     </div>
                 ) : (
-                    // Show processing status if the Base64 string is null (crawl is ongoing/failed)
+                    // Show processing status if no screenshot is stored yet (crawl is ongoing/failed)
                     <div className="text-xs text-gray-500 italic mt-2">Title: {audit.title || 'Processing...'} (Screenshot pending)</div>
                 )}
             </li>
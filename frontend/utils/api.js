@@ -1,16 +1,66 @@
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+const AUDITS_PAGE_SIZE = 50;
+
+// Last /audits response, revalidated with If-None-Match while polling
+let auditsCache = { etag: null, data: [] };
+
 export async function fetchAudits() {
-  const res = await fetch(`${API_URL}/audits`, { cache: 'no-store' });
-  return res.json();
+  const headers = auditsCache.etag ? { 'If-None-Match': auditsCache.etag } : {};
+  const res = await fetch(`${API_URL}/audits?limit=${AUDITS_PAGE_SIZE}`, {
+    cache: 'no-store',
+    headers,
+  });
+
+  if (res.status === 304) {
+    return auditsCache.data;
+  }
+
+  const data = await res.json();
+  auditsCache = { etag: res.headers.get('ETag'), data };
+  return data;
+}
+
+export function screenshotUrl(id, { thumbnail = false } = {}) {
+  return `${API_URL}/audit/${id}/screenshot${thumbnail ? '?thumbnail=true' : ''}`;
 }
 
 export async function createAudit(url) {
-  await fetch(`${API_URL}/audit`, {
+  const res = await fetch(`${API_URL}/audit`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ url }),
   });
+  return res.json();
+}
+
+const TERMINAL_STAGES = ['completed', 'failed'];
+const TASK_STAGES = [
+  'deferred', 'retrying', 'started', 'not_modified', 'navigating', 'rendered',
+  'screenshotted', 'stored', ...TERMINAL_STAGES,
+];
+
+// Live stage events for a task (Server-Sent Events); returns an unsubscribe fn
+export function subscribeTask(taskId, onEvent) {
+  const source = new EventSource(`${API_URL}/tasks/${taskId}/events`);
+
+  const handle = (message) => {
+    const event = JSON.parse(message.data);
+    onEvent(event);
+
+    if (TERMINAL_STAGES.includes(event.stage)) {
+      source.close();
+    }
+  };
+
+  TASK_STAGES.forEach((stage) => source.addEventListener(stage, handle));
+
+  source.onerror = () => {
+    source.close();
+    onEvent({ stage: 'failed', error: 'Progress stream disconnected' });
+  };
+
+  return () => source.close();
 }
 
 export async function deleteAudit(id) {
@@ -0,0 +1,242 @@
+import os
+import time
+import logging
+from urllib.parse import urlparse
+import zstandard
+from sqlalchemy import select, func, or_
+
+from database import AsyncSessionLocal, CrawlResult, HtmlDictionary
+
+# ---------- COMPRESSION CONFIG ----------
+
+ZSTD_LEVEL = int(os.getenv("HTML_ZSTD_LEVEL", "9"))
+DICT_SIZE = int(os.getenv("HTML_DICT_SIZE", str(112 * 1024)))
+DICT_LOOKUP_TTL = 300
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# dictionary id → ZstdCompressionDict (dictionaries are immutable)
+_dictionaries = {}
+
+# domain → (dictionary id | None, looked up at)
+_latest_for_domain = {}
+
+
+def url_domain(url: str) -> str | None:
+    return urlparse(url).hostname
+
+
+def _as_dictionary(dict_id: int, data: bytes):
+    if dict_id not in _dictionaries:
+        _dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+
+    return _dictionaries[dict_id]
+
+# ---------- Compress / Decompress ----------
+
+def compress_html(html: str, dictionary=None) -> bytes:
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    return compressor.compress(html.encode("utf-8"))
+
+
+def decompress_html(data: bytes, dictionary=None) -> str:
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressor.decompress(data).decode("utf-8")
+
+# ---------- Dictionary Lookup ----------
+
+def _latest_dictionary_query(domain: str | None):
+    # Prefer a dictionary trained on this site, fall back to the global one
+    return select(HtmlDictionary.id).where(
+        or_(HtmlDictionary.domain == domain, HtmlDictionary.domain.is_(None))
+    ).order_by(
+        HtmlDictionary.domain.is_(None),
+        HtmlDictionary.id.desc()
+    ).limit(1)
+
+
+def get_dictionary(session, dict_id: int | None):
+    if dict_id is None:
+        return None
+
+    if dict_id not in _dictionaries:
+        data = session.execute(
+            select(HtmlDictionary.data).where(HtmlDictionary.id == dict_id)
+        ).scalar_one()
+
+        _as_dictionary(dict_id, data)
+
+    return _dictionaries[dict_id]
+
+def load_html_batch(session, crawl_ids: list) -> dict:
+    """
+    crawl id → decompressed HTML for many rows in one query
+    """
+
+    result = session.execute(
+        select(
+            CrawlResult.id,
+            CrawlResult.html_zstd,
+            CrawlResult.html_dict_id,
+            CrawlResult.html_content
+        ).where(CrawlResult.id.in_(crawl_ids))
+    )
+
+    pages = {}
+
+    for crawl_id, html_zstd, dict_id, html_content in result:
+        if html_zstd is not None:
+            pages[crawl_id] = decompress_html(html_zstd, get_dictionary(session, dict_id))
+        else:
+            pages[crawl_id] = html_content
+
+    return pages
+
+# ---------- Dictionary Training ----------
+
+def train_dictionary(session, domain: str | None = None, samples: int = 500):
+    """
+    Train a zstd dictionary from recent pages and store it
+    """
+
+    query = select(
+        CrawlResult.html_zstd,
+        CrawlResult.html_dict_id,
+        CrawlResult.html_content
+    ).order_by(CrawlResult.id.desc()).limit(samples)
+
+    if domain:
+        query = query.where(or_(
+            CrawlResult.url.like(f"%://{domain}/%"),
+            CrawlResult.url.like(f"%://{domain}")
+        ))
+
+    documents = []
+
+    for html_zstd, dict_id, html_content in session.execute(query):
+        if html_zstd is not None:
+            html = decompress_html(html_zstd, get_dictionary(session, dict_id))
+        else:
+            html = html_content
+
+        if html:
+            documents.append(html.encode("utf-8"))
+
+    if len(documents) < 8:
+        logging.info(f"Not enough pages to train dictionary ({len(documents)})")
+        return None
+
+    trained = zstandard.train_dictionary(DICT_SIZE, documents)
+
+    entry = HtmlDictionary(
+        domain=domain,
+        data=trained.as_bytes(),
+        sample_count=len(documents)
+    )
+
+    session.add(entry)
+    session.commit()
+
+    _latest_for_domain.pop(domain, None)
+
+    logging.info(
+        f"Trained HTML dictionary #{entry.id} for {domain or 'all sites'} "
+        f"from {len(documents)} page(s)"
+    )
+
+    return entry.id
+
+# ---------- Async Access (Crawler + API) ----------
+
+async def _async_dictionary(db, dict_id: int | None):
+    if dict_id is None:
+        return None
+
+    if dict_id not in _dictionaries:
+        result = await db.execute(
+            select(HtmlDictionary.data).where(HtmlDictionary.id == dict_id)
+        )
+
+        _as_dictionary(dict_id, result.scalar_one())
+
+    return _dictionaries[dict_id]
+
+
+async def dictionary_for_url(url: str):
+    """
+    Returns (dictionary id, dictionary) to compress pages of this URL's site
+    """
+
+    domain = url_domain(url)
+    cached = _latest_for_domain.get(domain)
+
+    if cached is None or time.monotonic() - cached[1] > DICT_LOOKUP_TTL:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(_latest_dictionary_query(domain))
+            dict_id = result.scalar_one_or_none()
+
+            cached = (dict_id, time.monotonic())
+            _latest_for_domain[domain] = cached
+
+            return dict_id, await _async_dictionary(session, dict_id)
+
+    dict_id = cached[0]
+    return dict_id, _dictionaries.get(dict_id)
+
+
+async def stream_html(crawl_id: int):
+    """
+    Yield UTF-8 HTML, decompressing the stored frame chunk by chunk
+    """
+
+    async with AsyncSessionLocal() as session:
+        # Every chunk comes from one snapshot: a recrawl committing mid-stream
+        # must not splice frames of two page versions together
+        await session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+
+        result = await session.execute(
+            select(
+                CrawlResult.html_dict_id,
+                CrawlResult.html_zstd.is_(None).label("legacy")
+            ).where(CrawlResult.id == crawl_id)
+        )
+
+        row = result.first()
+
+        if row is None:
+            return
+
+        column = CrawlResult.html_content if row.legacy else CrawlResult.html_zstd
+
+        if row.legacy:
+            decompressor = None
+        else:
+            dictionary = await _async_dictionary(session, row.html_dict_id)
+            decompressor = zstandard.ZstdDecompressor(
+                dict_data=dictionary
+            ).decompressobj()
+
+        offset = 0
+
+        while True:
+            result = await session.execute(
+                select(
+                    func.substring(column, offset + 1, STREAM_CHUNK_SIZE)
+                ).where(CrawlResult.id == crawl_id)
+            )
+
+            chunk = result.scalar_one_or_none()
+
+            if not chunk:
+                return
+
+            offset += len(chunk)
+
+            if decompressor is None:
+                yield chunk.encode("utf-8")
+            else:
+                data = decompressor.decompress(bytes(chunk))
+                if data:
+                    yield data
@@ -0,0 +1,269 @@
+import os
+import re
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+# ---------- EXTRACTOR CONFIG ----------
+
+# Bump when the output format changes so cached texts are rebuilt
+EXTRACTOR_VERSION = 1
+
+TOKEN_BUDGET = int(os.getenv("PIPELINE_TOKEN_BUDGET", "1500"))
+# Parser processes per process that parses (i.e. per Celery child: a worker
+# with -c N runs up to N × this many); 0 parses inline
+PROCESS_POOL_SIZE = min(
+    max(0, int(os.getenv("PIPELINE_PROCESS_POOL_SIZE", "2"))),
+    os.cpu_count() or 1
+)
+# Spawned, not forked: parsing processes start from workers that already
+# run threads (event loop, metrics flusher, model warm-up)
+PROCESS_POOL_START_METHOD = "spawn"
+PROCESS_POOL_MIN_DOCS = 4
+
+FEED_CHUNK_SIZE = 64 * 1024
+
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "canvas"}
+HEADING_TAGS = {"h1", "h2", "h3"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "li", "br", "tr", "td",
+    "header", "footer", "nav", "main", "aside", "address",
+}
+META_NAMES = {
+    "description", "keywords", "author",
+    "og:title", "og:description", "og:site_name", "og:url",
+    "twitter:title", "twitter:description",
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# ---------- Streaming Parser ----------
+
+class _PageTextParser(HTMLParser):
+    """
+    Single pass over the DOM collecting the parts the LLM needs
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = []
+        self.metas = {}
+        self.headings = []
+        self.body = []
+        self.contacts = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._heading = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+
+        if tag == "title":
+            self._in_title = True
+
+        elif tag in HEADING_TAGS:
+            self._heading = []
+
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("name") or attrs.get("property") or "").lower()
+            content = attrs.get("content")
+
+            if name in META_NAMES and content:
+                self.metas.setdefault(name, content.strip())
+
+        elif tag == "a":
+            href = dict(attrs).get("href") or ""
+
+            if href.startswith(("mailto:", "tel:")):
+                self.contacts.append(href.split(":", 1)[1].split("?")[0])
+
+        if tag in BLOCK_TAGS or tag in HEADING_TAGS:
+            self.body.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS or tag in HEADING_TAGS:
+            self.body.append("\n")
+
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+
+        elif tag == "title":
+            self._in_title = False
+
+        elif tag in HEADING_TAGS and self._heading is not None:
+            heading = WHITESPACE_RE.sub(" ", "".join(self._heading)).strip()
+
+            if heading:
+                self.headings.append(heading)
+
+            self._heading = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+
+        if self._in_title:
+            self.title.append(data)
+            return
+
+        if self._heading is not None:
+            self._heading.append(data)
+
+        self.body.append(data)
+
+# ---------- Token Budget ----------
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English web text
+    return (len(text) + 3) // 4
+
+
+def _take(parts: list, budget: int):
+    """
+    Append whole lines while they fit, cut the last one at the budget
+    """
+
+    kept = []
+
+    for part in parts:
+        cost = estimate_tokens(part) + 1
+
+        if cost <= budget:
+            kept.append(part)
+            budget -= cost
+        else:
+            if budget > 8:
+                kept.append(part[:budget * 4].rsplit(" ", 1)[0])
+            budget = 0
+            break
+
+    return kept, budget
+
+# ---------- Public API ----------
+
+def extract_page_text(html: str, token_budget: int = TOKEN_BUDGET) -> str:
+    """
+    HTML → compact text: title, meta tags, headings, contacts, visible text
+    """
+
+    if not html:
+        return ""
+
+    parser = _PageTextParser()
+
+    for start in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[start:start + FEED_CHUNK_SIZE])
+
+    parser.close()
+
+    body_lines = [
+        line for line in (
+            WHITESPACE_RE.sub(" ", chunk).strip()
+            for chunk in "".join(parser.body).split("\n")
+        )
+        if line
+    ]
+
+    body_text = " ".join(body_lines)
+
+    contacts = list(dict.fromkeys(
+        parser.contacts
+        + EMAIL_RE.findall(body_text)
+        + [phone.strip() for phone in PHONE_RE.findall(body_text)]
+    ))
+
+    header = []
+
+    title = WHITESPACE_RE.sub(" ", "".join(parser.title)).strip()
+    if title:
+        header.append(f"Title: {title}")
+
+    for name, content in parser.metas.items():
+        header.append(f"Meta {name}: {content}")
+
+    if parser.headings:
+        header.append("Headings: " + " | ".join(dict.fromkeys(parser.headings)))
+
+    if contacts:
+        header.append("Contacts: " + ", ".join(contacts[:20]))
+
+    # Structured parts first, visible text fills whatever budget is left
+    kept, budget = _take(header, token_budget)
+    body, _ = _take(body_lines, budget)
+
+    if body:
+        kept.append("Text: " + " ".join(body))
+
+    return "\n".join(kept)
+
+# ---------- Process Pool ----------
+
+_pool = None
+_pool_pid = None
+
+
+def _new_pool():
+    if not PROCESS_POOL_SIZE:
+        return None
+
+    if not multiprocessing.current_process().daemon:
+        return ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_SIZE,
+            mp_context=multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+        )
+
+    # Celery prefork children are daemonic, and the stdlib refuses to start
+    # processes there; billiard (Celery's multiprocessing fork) allows it.
+    # Threads would not help: HTMLParser is pure Python and holds the GIL
+    try:
+        import billiard
+    except ImportError:
+        return None
+
+    return billiard.get_context(PROCESS_POOL_START_METHOD).Pool(processes=PROCESS_POOL_SIZE)
+
+
+def _get_pool():
+    global _pool, _pool_pid
+
+    # A pool inherited through fork belongs to the parent
+    if _pool_pid != os.getpid():
+        _pool = _new_pool()
+        _pool_pid = os.getpid()
+
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        if isinstance(_pool, ProcessPoolExecutor):
+            _pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            _pool.terminate()
+
+    _pool = _pool_pid = None
+
+
+def extract_page_texts(htmls: list, token_budget: int = TOKEN_BUDGET) -> list:
+    """
+    Batch version of extract_page_text; parses in a process pool when it pays off
+    """
+
+    pool = _get_pool() if len(htmls) >= PROCESS_POOL_MIN_DOCS else None
+
+    if pool is None:
+        return [extract_page_text(html, token_budget) for html in htmls]
+
+    return list(pool.map(
+        partial(extract_page_text, token_budget=token_budget),
+        htmls,
+        chunksize=max(1, len(htmls) // 16)
+    ))
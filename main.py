@@ -1,10 +1,17 @@
-from datetime import datetime
-from fastapi import FastAPI, HTTPException, Depends
+import time
+import uuid
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from sqlalchemy.future import select
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel, HttpUrl
-from typing import List
+from pydantic import BaseModel, HttpUrl, Field
+from typing import List, Literal
 from fastapi.middleware.cors import CORSMiddleware
+from celery.result import AsyncResult
 
 # -----------------------------
 # Internal Imports
@@ -17,7 +24,24 @@ from database import (
     WebsiteMetadata
 )
 
-from tasks import execute_crawler, process_text_pipeline
+from blob_store import get_blob_info, stream_blob, parse_range, orphan_blob_delete_statement
+from html_store import stream_html
+from similarity_index import page_index, NEAR_DUPLICATE_SCORE
+from progress import task_events, stream_task_events
+from crawl_dedup import normalize_url, claim_crawl, release_crawl, FRESHNESS_SECONDS
+from crawl_profiles import resolve_profile, profile_key
+from site_crawl import MAX_SITE_PAGES
+from metrics import HTTP_REQUEST_SECONDS, render_metrics
+from audit_version import audit_version, bump_audit_version
+
+from tasks import (
+    celery_app,
+    schedule_crawl,
+    execute_batch_crawler,
+    execute_site_crawl,
+    process_text_pipeline,
+    embed_crawl_pages
+)
 
 # -----------------------------
 # CORS Config (Frontend Access)
@@ -30,14 +54,62 @@ origins = [
 
 app = FastAPI(title="Arcnetic Spider AI Platform")
 
+# URLs per batch task (one broker round trip per chunk)
+BATCH_CHUNK_SIZE = 500
+MAX_BATCH_URLS = 10000
+
+# Documents per AI pipeline task
+MAX_PIPELINE_DOCUMENTS = 500
+
+# /audits listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+AUDIT_LIST_FIELDS = {
+    "id": CrawlResult.id,
+    "url": CrawlResult.url,
+    "title": CrawlResult.title,
+    "created_at": CrawlResult.created_at,
+    "last_checked_at": CrawlResult.last_checked_at,
+    "screenshot_sha256": CrawlResult.screenshot_sha256,
+    "thumbnail_sha256": CrawlResult.thumbnail_sha256,
+}
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-After-Id"],
 )
 
+# -----------------------------
+# Request Timing (Prometheus)
+# -----------------------------
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+
+    start = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+
+    finally:
+        # Route template keeps label cardinality bounded (/audit/{id}, not /audit/42)
+        route = request.scope.get("route")
+
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
 # -----------------------------
 # Startup DB Initialization
 # -----------------------------
@@ -50,12 +122,60 @@ async def on_startup():
 # Request Models
 # -----------------------------
 
-class AuditRequest(BaseModel):
+class CrawlOptions(BaseModel):
+    # Named profile (full, text, preview, desktop, spa) plus optional overrides
+    profile: str | None = None
+    device: Literal["mobile", "desktop"] | None = None
+    wait_until: Literal["load", "domcontentloaded", "networkidle"] | None = None
+    screenshot: Literal["full", "viewport", "none"] | None = None
+    block_resources: List[Literal["image", "media", "font", "stylesheet"]] | None = None
+    block_trackers: bool | None = None
+
+    def crawl_profile(self) -> dict:
+        try:
+            return resolve_profile(
+                self.profile,
+                device=self.device,
+                wait_until=self.wait_until,
+                screenshot=self.screenshot,
+                block_resources=self.block_resources,
+                block_trackers=self.block_trackers
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+
+class AuditRequest(CrawlOptions):
     url: HttpUrl
+    force: bool = False
+    # Queue: interactive (dashboard) or bulk (scripted / background submissions)
+    priority: Literal["interactive", "bulk"] = "interactive"
+    # Seconds; a page checked this recently is returned without recrawling
+    max_age: int | None = Field(default=None, ge=0)
+
+
+class BatchAuditRequest(CrawlOptions):
+    urls: List[HttpUrl] = Field(min_length=1, max_length=MAX_BATCH_URLS)
+    concurrency: int | None = Field(default=None, ge=1, le=32)
+    force: bool = False
+
+
+class SiteAuditRequest(CrawlOptions):
+    url: HttpUrl
+    max_pages: int = Field(default=500, ge=1, le=MAX_SITE_PAGES)
+    max_depth: int = Field(default=3, ge=0, le=50)
+    use_sitemap: bool = True
+    concurrency: int | None = Field(default=None, ge=1, le=32)
+    force: bool = False
 
 
 class TextProcessRequest(BaseModel):
-    text: str
+    text: str | None = None
+    texts: List[str] | None = Field(default=None, max_length=MAX_PIPELINE_DOCUMENTS)
+
+
+class AuditAIBatchRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_PIPELINE_DOCUMENTS)
 
 
 class AuditSummary(BaseModel):
@@ -63,11 +183,31 @@ class AuditSummary(BaseModel):
     url: str
     title: str | None
     created_at: datetime
-    screenshot_b64: str | None
+    screenshot_sha256: str | None
+    thumbnail_sha256: str | None
+
+
+class AuditListItem(BaseModel):
+    id: int
+    url: str | None = None
+    title: str | None = None
+    created_at: datetime | None = None
+    last_checked_at: datetime | None = None
+    screenshot_sha256: str | None = None
+    thumbnail_sha256: str | None = None
+
+
+class SimilarAudit(BaseModel):
+    id: int
+    url: str
+    title: str | None
+    score: float
+    near_duplicate: bool
 
 
 class MetadataSummary(BaseModel):
     id: int
+    crawl_id: int | None
     page_title: str | None
     company_name: str | None
     email: str | None
@@ -81,6 +221,15 @@ class MetadataSummary(BaseModel):
 
 # ---------- Root Health ----------
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+
+    # Totals across the API and every Celery worker (aggregated in Redis)
+    body = await asyncio.to_thread(render_metrics)
+
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root():
     return {"status": "Arcnetic Spider AI Backend Running"}
@@ -88,32 +237,238 @@ def root():
 # ---------- Trigger Crawl (Celery) ----------
 
 @app.post("/audit")
-async def start_audit(request: AuditRequest):
+async def start_audit(request: AuditRequest, db: AsyncSession = Depends(get_db)):
+
+    url = normalize_url(str(request.url))
+    profile = request.crawl_profile()
+    max_age = FRESHNESS_SECONDS if request.max_age is None else request.max_age
+
+    if max_age and not request.force:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+        checked_at = func.coalesce(CrawlResult.last_checked_at, CrawlResult.created_at)
+
+        result = await db.execute(
+            select(CrawlResult.id, checked_at.label("checked_at"))
+            .where(CrawlResult.url == url, checked_at >= cutoff)
+        )
+        fresh = result.first()
+
+        if fresh is not None:
+            return {
+                "status": "fresh",
+                "message": "Stored result is within the freshness window",
+                "id": fresh.id,
+                "checked_at": fresh.checked_at,
+                "task_id": None
+            }
+
+    # Concurrent submissions of the same URL share one crawl
+    task_id, claimed = await claim_crawl(
+        url, variant=profile_key(profile), force=request.force
+    )
 
-    task = execute_crawler.delay(str(request.url))
+    if not claimed:
+        return {
+            "status": "accepted",
+            "message": "Crawl of this URL already in progress",
+            "task_id": task_id,
+            "coalesced": True
+        }
+
+    try:
+        schedule_crawl(
+            url,
+            request.force,
+            profile,
+            task_id=task_id,
+            interactive=request.priority == "interactive"
+        )
+    except Exception as e:
+        # Otherwise every submission coalesces onto a task that never runs
+        # until the in-flight marker expires
+        await asyncio.to_thread(
+            release_crawl, url, task_id, variant=profile_key(profile), force=request.force
+        )
+        raise HTTPException(status_code=503, detail=f"Could not queue crawl: {e}")
 
     return {
         "status": "accepted",
         "message": "Crawl task submitted successfully",
-        "task_id": task.id
+        "task_id": task_id,
+        "coalesced": False
     }
 
-# ---------- Get All Crawls ----------
+# ---------- Trigger Batch Crawl (Celery) ----------
 
-@app.get("/audits", response_model=List[AuditSummary])
-async def get_audits(db: AsyncSession = Depends(get_db)):
+@app.post("/audits/batch")
+async def start_batch_audit(request: BatchAuditRequest):
 
-    result = await db.execute(
-        select(
-            CrawlResult.id,
-            CrawlResult.url,
-            CrawlResult.title,
-            CrawlResult.created_at,
-            CrawlResult.screenshot_b64
-        ).order_by(CrawlResult.id.desc())
+    # Preserve submission order while dropping duplicate URLs
+    urls = list(dict.fromkeys(normalize_url(str(url)) for url in request.urls))
+    profile = request.crawl_profile()
+
+    task_ids = []
+
+    for start in range(0, len(urls), BATCH_CHUNK_SIZE):
+        chunk = urls[start:start + BATCH_CHUNK_SIZE]
+        task = execute_batch_crawler.delay(
+            chunk, request.concurrency, request.force, profile
+        )
+        task_ids.append(task.id)
+
+    return {
+        "status": "accepted",
+        "message": "Batch crawl submitted successfully",
+        "url_count": len(urls),
+        "task_ids": task_ids
+    }
+
+# ---------- Trigger Site Crawl (Celery) ----------
+
+@app.post("/audits/site")
+async def start_site_audit(request: SiteAuditRequest):
+
+    profile = request.crawl_profile()
+    job_id = str(uuid.uuid4())
+
+    # The job id is also the first task's id and the progress channel
+    execute_site_crawl.apply_async(
+        (job_id,),
+        {
+            "start_url": normalize_url(str(request.url)),
+            "max_pages": request.max_pages,
+            "max_depth": request.max_depth,
+            "use_sitemap": request.use_sitemap,
+            "force": request.force,
+            "profile": profile,
+            "concurrency": request.concurrency,
+        },
+        task_id=job_id
     )
 
-    return result.all()
+    return {
+        "status": "accepted",
+        "message": "Site crawl submitted successfully",
+        "job_id": job_id,
+        "task_id": job_id
+    }
+
+# ---------- Task Status / Live Progress ----------
+
+def _task_state(task_id: str) -> dict:
+    result = AsyncResult(task_id, app=celery_app)
+
+    state = {"state": result.state}
+
+    if result.ready():
+        state["result"] = result.result if result.successful() else str(result.result)
+
+    return state
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: str):
+
+    # The Celery result lookup is a blocking Redis call
+    state, events = await asyncio.gather(
+        asyncio.to_thread(_task_state, task_id),
+        task_events(task_id)
+    )
+
+    return {
+        "task_id": task_id,
+        "stage": events[-1]["stage"] if events else None,
+        "events": events,
+        **state,
+    }
+
+
+@app.get("/tasks/{task_id}/events")
+async def get_task_events(task_id: str):
+
+    # Server-Sent Events: past stages are replayed, then followed live
+    return StreamingResponse(
+        stream_task_events(task_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+# ---------- Get All Crawls ----------
+
+def _audits_etag(version: int, query: str) -> str:
+    fingerprint = f"{version}|{query}"
+    return f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+
+
+def _audits_page_query(names: list, after_id: int | None, since: datetime | None, limit: int):
+    # Keyset pagination: newest first, continuing below the last id seen
+    query = select(*(AUDIT_LIST_FIELDS[name] for name in names))
+
+    if after_id is not None:
+        query = query.where(CrawlResult.id < after_id)
+
+    if since is not None:
+        query = query.where(CrawlResult.created_at > since)
+
+    return query.order_by(CrawlResult.id.desc()).limit(limit)
+
+
+@app.get(
+    "/audits",
+    response_model=List[AuditListItem],
+    response_model_exclude_unset=True
+)
+async def get_audits(
+    request: Request,
+    response: Response,
+    after_id: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    since: datetime | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+
+    # ---------- Projection ----------
+
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in AUDIT_LIST_FIELDS]
+
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+
+        names = ["id"] + [name for name in names if name != "id"]
+    else:
+        names = list(AUDIT_LIST_FIELDS)
+
+    # ---------- Cheap Change Detection ----------
+
+    # A Redis counter bumped on every crawl write / delete: no table scan per poll
+    version = await audit_version()
+    etag = _audits_etag(version, request.url.query) if version is not None else None
+
+    if etag is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # ---------- Keyset Page ----------
+
+    result = await db.execute(_audits_page_query(names, after_id, since, limit))
+
+    rows = [dict(row._mapping) for row in result.all()]
+
+    if etag is not None:
+        response.headers["ETag"] = etag
+
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+
+    return rows
 
 # ---------- Get Single Crawl ----------
 
@@ -128,6 +483,139 @@ async def get_audit(id: int, db: AsyncSession = Depends(get_db)):
 
     return audit
 
+# ---------- Get Crawl Screenshot ----------
+
+@app.get("/audit/{id}/screenshot")
+async def get_audit_screenshot(
+    id: int,
+    request: Request,
+    thumbnail: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+
+    column = CrawlResult.thumbnail_sha256 if thumbnail else CrawlResult.screenshot_sha256
+
+    result = await db.execute(select(column).where(CrawlResult.id == id))
+    digest = result.scalar_one_or_none()
+
+    if not digest:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+
+    blob = await get_blob_info(db, digest)
+
+    if not blob:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+
+    etag = f'"{digest}"'
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), blob.size)
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers={"Content-Range": f"bytes */{blob.size}"}
+        )
+
+    if byte_range is None:
+        start, end, status_code = 0, blob.size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        stream_blob(digest, start, end),
+        status_code=status_code,
+        media_type=blob.content_type,
+        headers=headers
+    )
+
+# ---------- Get Crawl HTML ----------
+
+@app.get("/audit/{id}/html")
+async def get_audit_html(id: int, db: AsyncSession = Depends(get_db)):
+
+    result = await db.execute(
+        select(
+            CrawlResult.html_zstd.is_(None).label("legacy"),
+            CrawlResult.html_content.is_(None).label("missing_legacy")
+        ).where(CrawlResult.id == id)
+    )
+
+    row = result.first()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Audit not found")
+
+    if row.legacy and row.missing_legacy:
+        raise HTTPException(status_code=404, detail="HTML not found")
+
+    return StreamingResponse(
+        stream_html(id),
+        media_type="text/html; charset=utf-8"
+    )
+
+# ---------- Similar Pages ----------
+
+@app.get("/audit/{id}/similar", response_model=List[SimilarAudit])
+async def get_similar_audits(
+    id: int,
+    k: int = Query(10, ge=1, le=100),
+    min_score: float = Query(0.0, ge=-1.0, le=1.0),
+    db: AsyncSession = Depends(get_db)
+):
+
+    matches = await page_index.similar(db, id, k)
+
+    if matches is None:
+        result = await db.execute(select(CrawlResult.id).where(CrawlResult.id == id))
+
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Audit not found")
+
+        embed_crawl_pages.delay([id])
+
+        raise HTTPException(
+            status_code=404,
+            detail="Embedding not available yet; it has been queued"
+        )
+
+    scores = {crawl_id: score for crawl_id, score in matches if score >= min_score}
+
+    if not scores:
+        return []
+
+    result = await db.execute(
+        select(CrawlResult.id, CrawlResult.url, CrawlResult.title)
+        .where(CrawlResult.id.in_(scores))
+    )
+
+    # Rows deleted since they were indexed simply drop out here
+    rows = {row.id: row for row in result.all()}
+
+    return [
+        {
+            "id": crawl_id,
+            "url": rows[crawl_id].url,
+            "title": rows[crawl_id].title,
+            "score": round(score, 4),
+            "near_duplicate": score >= NEAR_DUPLICATE_SCORE,
+        }
+        for crawl_id, score in scores.items()
+        if crawl_id in rows
+    ]
+
 # ---------- Delete Crawl ----------
 
 @app.delete("/audit/{id}")
@@ -139,8 +627,19 @@ async def delete_audit(id: int, db: AsyncSession = Depends(get_db)):
     if not audit:
         raise HTTPException(status_code=404, detail="Audit not found")
 
+    blob_digests = {audit.screenshot_sha256, audit.thumbnail_sha256} - {None}
+
     await db.delete(audit)
+    await db.flush()
+
+    # Drop blobs no other crawl still points at (without loading their bytes)
+    if blob_digests:
+        await db.execute(orphan_blob_delete_statement(blob_digests))
+
     await db.commit()
+    await bump_audit_version()
+
+    await page_index.remove(id)
 
     return {"status": "Deleted", "id": id}
 
@@ -149,11 +648,51 @@ async def delete_audit(id: int, db: AsyncSession = Depends(get_db)):
 @app.post("/process-text")
 async def process_text(request: TextProcessRequest):
 
-    task = process_text_pipeline.delay(request.text)
+    texts = request.texts or ([request.text] if request.text else [])
+
+    if not texts:
+        raise HTTPException(status_code=400, detail="Provide text or texts")
+
+    task = process_text_pipeline.delay(
+        documents=[{"text": text, "crawl_id": None} for text in texts]
+    )
 
     return {
         "status": "accepted",
         "message": "AI pipeline task started",
+        "document_count": len(texts),
+        "task_id": task.id
+    }
+
+# ---------- Run AI On Many Crawled Pages ----------
+
+@app.post("/audit-ai/batch")
+async def process_audit_ai_batch(
+    request: AuditAIBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+
+    ids = list(dict.fromkeys(request.ids))
+
+    result = await db.execute(select(CrawlResult.id).where(CrawlResult.id.in_(ids)))
+    found = set(result.scalars().all())
+
+    missing = [crawl_id for crawl_id in ids if crawl_id not in found]
+
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Audits not found: {missing}"
+        )
+
+    task = process_text_pipeline.delay(
+        documents=[{"text": None, "crawl_id": crawl_id} for crawl_id in ids]
+    )
+
+    return {
+        "status": "accepted",
+        "message": "AI extraction started for crawl records",
+        "crawl_ids": ids,
         "task_id": task.id
     }
 
@@ -162,14 +701,13 @@ async def process_text(request: TextProcessRequest):
 @app.post("/audit-ai/{id}")
 async def process_audit_ai(id: int, db: AsyncSession = Depends(get_db)):
 
-    result = await db.execute(select(CrawlResult).where(CrawlResult.id == id))
-    crawl = result.scalars().first()
+    result = await db.execute(select(CrawlResult.id).where(CrawlResult.id == id))
 
-    if not crawl:
+    if result.first() is None:
         raise HTTPException(status_code=404, detail="Audit not found")
 
-    # Send cleaned HTML/text into AI pipeline
-    task = process_text_pipeline.delay(crawl.html_content)
+    # The worker loads and cleans the stored HTML itself
+    task = process_text_pipeline.delay(crawl_id=id)
 
     return {
         "status": "accepted",
@@ -186,6 +724,7 @@ async def get_metadata(db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(
             WebsiteMetadata.id,
+            WebsiteMetadata.crawl_id,
             WebsiteMetadata.page_title,
             WebsiteMetadata.company_name,
             WebsiteMetadata.email,
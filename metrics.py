@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+import redis
+
+# ---------- METRICS CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Each process buffers locally and a background thread pushes the deltas to
+# Redis this often (recording never does I/O); /metrics renders the Redis totals, i.e. the sum over every API/worker process
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+KEY_PREFIX = "metrics:"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# ---------- Metric Types ----------
+
+_registry = {}
+_lock = threading.Lock()
+
+
+def _label_key(labels: dict) -> str:
+    return json.dumps(labels, sort_keys=True, separators=(",", ":"))
+
+
+class Counter:
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._pending = {}
+        _registry[name] = self
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+
+        field = _label_key(labels)
+
+        with _lock:
+            self._pending[field] = self._pending.get(field, 0) + amount
+
+        _ensure_flusher()
+
+    def _drain(self) -> dict:
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class Histogram:
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._pending = {}
+        _registry[name] = self
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+
+        labels_field = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        le = str(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+
+        with _lock:
+            for field, amount in (
+                (f"{labels_field}|bucket|{le}", 1),
+                (f"{labels_field}|sum", value),
+                (f"{labels_field}|count", 1),
+            ):
+                self._pending[field] = self._pending.get(field, 0) + amount
+
+        _ensure_flusher()
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def stopwatch(self, **labels) -> "Stopwatch":
+        return Stopwatch(self, labels)
+
+    def _drain(self) -> dict:
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class Stopwatch:
+    """
+    Sequential stage timings: each lap() records the time since the previous one
+    """
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage=stage, **self.labels)
+        self._last = now
+
+    def total(self, stage: str = "total"):
+        self.histogram.observe(time.perf_counter() - self.started, stage=stage, **self.labels)
+
+# ---------- Flushing (Every Process) ----------
+
+_client = None
+_client_pid = None
+_flusher_pid = None
+
+
+def _redis():
+    global _client, _client_pid
+
+    if _client_pid != os.getpid():
+        _client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _client
+
+
+def flush():
+    """
+    Push buffered deltas to Redis; dropped (not retried) if Redis is down
+    """
+
+    with _lock:
+        drained = {name: metric._drain() for name, metric in _registry.items()}
+
+    drained = {name: values for name, values in drained.items() if values}
+
+    if not drained:
+        return
+
+    try:
+        pipe = _redis().pipeline(transaction=False)
+
+        for name, values in drained.items():
+            for field, amount in values.items():
+                pipe.hincrbyfloat(KEY_PREFIX + name, field, amount)
+
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"Metrics flush failed: {e}")
+
+
+def _after_fork_in_child():
+    global _lock
+
+    # The parent flushes its own buffers, and a fork mid-drain must not
+    # leave the child with a lock nobody will release
+    _lock = threading.Lock()
+
+    for metric in _registry.values():
+        metric._pending = {}
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def _ensure_flusher():
+    """
+    One daemon flusher per process, started on first use (threads don't
+    survive fork, so forked workers start their own)
+    """
+
+    global _flusher_pid
+
+    if _flusher_pid == os.getpid():
+        return
+
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+        # The first process registers it; forked children inherit the hook
+        if _flusher_pid is None:
+            atexit.register(flush)
+
+        _flusher_pid = os.getpid()
+
+# ---------- Prometheus Exposition (API) ----------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+
+    parts = [
+        f'{key}="{_escape(value)}"'
+        for key, value in sorted(labels.items())
+    ]
+    return "{" + ",".join(parts) + "}"
+
+
+def render_metrics() -> str:
+    """
+    Prometheus text format (0.0.4) over the cluster-wide totals
+    """
+
+    flush()
+
+    pipe = _redis().pipeline(transaction=False)
+
+    for name in _registry:
+        pipe.hgetall(KEY_PREFIX + name)
+
+    lines = []
+
+    for (name, metric), raw in zip(_registry.items(), pipe.execute()):
+        values = {k.decode(): float(v) for k, v in raw.items()}
+
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type}")
+
+        if metric.type == "counter":
+            for field, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(json.loads(field))} {value}")
+            continue
+
+        series = {}
+
+        for field, value in values.items():
+            labels_field, kind, *rest = field.split("|")
+            entry = series.setdefault(labels_field, {"buckets": {}, "sum": 0.0, "count": 0.0})
+
+            if kind == "bucket":
+                entry["buckets"][rest[0]] = value
+            else:
+                entry[kind] = value
+
+        for labels_field, entry in sorted(series.items()):
+            labels = json.loads(labels_field)
+            cumulative = 0.0
+
+            for le in [str(b) for b in metric.buckets] + ["+Inf"]:
+                cumulative += entry["buckets"].get(le, 0.0)
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+
+            lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+
+    return "\n".join(lines) + "\n"
+
+# ---------- Metrics ----------
+
+CRAWL_STAGE_SECONDS = Histogram(
+    "crawler_stage_seconds",
+    "Time spent in each stage of run_crawler_task"
+)
+CRAWL_PAGES = Counter(
+    "crawler_pages_total",
+    "Crawled pages by outcome"
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "Cloud LLM chat calls, including retries"
+)
+LLM_REQUESTS = Counter(
+    "llm_requests_total",
+    "Cloud LLM chat calls by model and outcome"
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "Retried cloud LLM attempts by reason"
+)
+EMBEDDING_SECONDS = Histogram(
+    "embedding_seconds",
+    "Local embedding encode calls"
+)
+EMBEDDED_TEXTS = Counter(
+    "embedding_texts_total",
+    "Texts encoded by the local embedding model"
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "text_pipeline_stage_seconds",
+    "Time spent in each stage of run_text_pipeline"
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "FastAPI request latency by route"
+)
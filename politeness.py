@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import uuid
+import logging
+from urllib.parse import urlsplit
+import redis
+import redis.asyncio as aioredis
+
+# ---------- POLITENESS CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Per host, across every worker: pages in flight and seconds between starts
+DOMAIN_MAX_CONCURRENCY = int(os.getenv("DOMAIN_MAX_CONCURRENCY", "2"))
+DOMAIN_MIN_INTERVAL = float(os.getenv("DOMAIN_MIN_INTERVAL", "1.0"))
+
+# Optional overrides: {"example.com": {"concurrency": 4, "interval": 0.25}}
+DOMAIN_POLICIES = json.loads(os.getenv("DOMAIN_POLICIES", "{}"))
+
+# A lease outlives a crashed worker by at most this long
+LEASE_TTL = int(os.getenv("DOMAIN_LEASE_TTL", "120"))
+
+# Retry hint when a host is at its concurrency limit
+BUSY_RETRY_DELAY = 2.0
+
+# Atomically: drop expired leases, enforce concurrency, then the start interval.
+# Returns 0 when the lease is granted, else milliseconds to wait.
+_ACQUIRE_SCRIPT = """
+local leases, next_start = KEYS[1], KEYS[2]
+local now, ttl, limit, interval = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local busy_wait, token = tonumber(ARGV[5]), ARGV[6]
+
+redis.call('zremrangebyscore', leases, '-inf', now)
+
+if redis.call('zcard', leases) >= limit then
+    return busy_wait
+end
+
+local earliest = tonumber(redis.call('get', next_start) or '0')
+if earliest > now then
+    return earliest - now
+end
+
+redis.call('zadd', leases, now + ttl, token)
+redis.call('pexpire', leases, ttl)
+redis.call('set', next_start, now + interval, 'px', math.max(interval, 1))
+return 0
+"""
+
+# ---------- Keys / Policy ----------
+
+def domain_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def domain_policy(domain: str) -> tuple[int, float]:
+    policy = DOMAIN_POLICIES.get(domain, {})
+
+    return (
+        max(1, int(policy.get("concurrency", DOMAIN_MAX_CONCURRENCY))),
+        max(0.0, float(policy.get("interval", DOMAIN_MIN_INTERVAL)))
+    )
+
+
+def _keys(domain: str) -> list:
+    return [f"polite:leases:{domain}", f"polite:next:{domain}"]
+
+
+def _args(domain: str, token: str) -> list:
+    limit, interval = domain_policy(domain)
+
+    return [
+        int(time.time() * 1000),
+        LEASE_TTL * 1000,
+        limit,
+        int(interval * 1000),
+        int(BUSY_RETRY_DELAY * 1000),
+        token,
+    ]
+
+# ---------- Clients (Per Process) ----------
+
+_sync_client = None
+_async_client = None
+_client_pid = None
+
+
+def _clients():
+    global _sync_client, _async_client, _client_pid
+
+    if _client_pid != os.getpid():
+        _sync_client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _async_client = aioredis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _sync_client, _async_client
+
+# ---------- Leases ----------
+
+def try_acquire(url: str) -> tuple[str | None, float]:
+    """
+    (lease token, 0) when this host may be crawled now,
+    else (None, seconds until it is worth asking again)
+    """
+
+    domain = domain_of(url)
+    token = uuid.uuid4().hex
+
+    try:
+        wait_ms = _clients()[0].eval(_ACQUIRE_SCRIPT, 2, *_keys(domain), *_args(domain, token))
+    except Exception as e:
+        # Fail open: politeness must never stop crawling altogether
+        logging.warning(f"Politeness check unavailable: {e}")
+        return token, 0.0
+
+    return (token, 0.0) if wait_ms == 0 else (None, wait_ms / 1000)
+
+
+async def try_acquire_async(url: str) -> tuple[str | None, float]:
+
+    domain = domain_of(url)
+    token = uuid.uuid4().hex
+
+    try:
+        wait_ms = await _clients()[1].eval(_ACQUIRE_SCRIPT, 2, *_keys(domain), *_args(domain, token))
+    except Exception as e:
+        logging.warning(f"Politeness check unavailable: {e}")
+        return token, 0.0
+
+    return (token, 0.0) if wait_ms == 0 else (None, wait_ms / 1000)
+
+
+def release(url: str, token: str):
+    try:
+        _clients()[0].zrem(_keys(domain_of(url))[0], token)
+    except Exception as e:
+        logging.warning(f"Could not release domain lease: {e}")
+
+
+async def release_async(url: str, token: str):
+    try:
+        await _clients()[1].zrem(_keys(domain_of(url))[0], token)
+    except Exception as e:
+        logging.warning(f"Could not release domain lease: {e}")
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import redis
+import redis.asyncio as aioredis
+
+# ---------- PROGRESS CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Events are also kept in a short list so late subscribers can replay them
+EVENT_LOG_TTL = int(os.getenv("TASK_EVENT_TTL", "3600"))
+# Only the latest events are kept (batch and site crawls emit many)
+EVENT_LOG_MAX = int(os.getenv("TASK_EVENT_LOG_MAX", "1000"))
+STREAM_TIMEOUT = float(os.getenv("TASK_STREAM_TIMEOUT", "600"))
+HEARTBEAT_INTERVAL = 15.0
+PUBLISH_TIMEOUT = 0.5
+
+TERMINAL_STAGES = {"completed", "failed"}
+
+
+def _channel(task_id: str) -> str:
+    return f"task-events:{task_id}"
+
+
+def _log_key(task_id: str) -> str:
+    return f"task-events-log:{task_id}"
+
+
+def _event(task_id: str, stage: str, data: dict) -> str:
+    # Envelope keys go last: a payload field must never replace the event id
+    return json.dumps({
+        **data,
+        "id": uuid.uuid4().hex,
+        "task_id": task_id,
+        "stage": stage,
+        "ts": time.time(),
+    }, default=str)
+
+# ---------- Clients (Per Process) ----------
+
+_sync_client = None
+_async_client = None
+_client_pid = None
+
+
+def _clients():
+    global _sync_client, _async_client, _client_pid
+
+    if _client_pid != os.getpid():
+        _sync_client = redis.Redis.from_url(
+            REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        # No read timeout here: SSE subscribers block on pub/sub reads
+        _async_client = aioredis.Redis.from_url(
+            REDIS_URL, socket_connect_timeout=0.5
+        )
+        _client_pid = os.getpid()
+
+    return _sync_client, _async_client
+
+# ---------- Publishing (Workers) ----------
+
+def publish_event(task_id: str | None, stage: str, **data):
+    """
+    Log and broadcast one stage event; never fails the caller
+    """
+
+    if not task_id:
+        return
+
+    payload = _event(task_id, stage, data)
+
+    try:
+        pipe = _clients()[0].pipeline(transaction=False)
+        pipe.rpush(_log_key(task_id), payload)
+        pipe.ltrim(_log_key(task_id), -EVENT_LOG_MAX, -1)
+        pipe.expire(_log_key(task_id), EVENT_LOG_TTL)
+        pipe.publish(_channel(task_id), payload)
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"Progress event dropped ({stage}): {e}")
+
+
+async def publish_event_async(task_id: str | None, stage: str, **data):
+
+    if not task_id:
+        return
+
+    payload = _event(task_id, stage, data)
+
+    try:
+        pipe = _clients()[1].pipeline(transaction=False)
+        pipe.rpush(_log_key(task_id), payload)
+        pipe.ltrim(_log_key(task_id), -EVENT_LOG_MAX, -1)
+        pipe.expire(_log_key(task_id), EVENT_LOG_TTL)
+        pipe.publish(_channel(task_id), payload)
+        await asyncio.wait_for(pipe.execute(), timeout=PUBLISH_TIMEOUT)
+    except Exception as e:
+        logging.warning(f"Progress event dropped ({stage}): {e}")
+
+# ---------- Reading (API) ----------
+
+async def task_events(task_id: str) -> list:
+    raw = await _clients()[1].lrange(_log_key(task_id), 0, -1)
+    return [json.loads(item) for item in raw]
+
+
+async def stream_task_events(task_id: str):
+    """
+    Server-Sent Events: replay what already happened, then follow live
+    until a terminal stage or STREAM_TIMEOUT
+    """
+
+    client = _clients()[1]
+    pubsub = client.pubsub()
+
+    # Subscribe before replaying so nothing falls in between
+    await pubsub.subscribe(_channel(task_id))
+
+    try:
+        seen = set()
+
+        for event in await task_events(task_id):
+            seen.add(event["id"])
+            yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+            if event["stage"] in TERMINAL_STAGES:
+                return
+
+        deadline = time.monotonic() + STREAM_TIMEOUT
+
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=HEARTBEAT_INTERVAL
+            )
+
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            event = json.loads(message["data"])
+
+            if event["id"] in seen:
+                continue
+
+            seen.add(event["id"])
+            yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+            if event["stage"] in TERMINAL_STAGES:
+                return
+
+    finally:
+        await pubsub.unsubscribe(_channel(task_id))
+        await pubsub.aclose()
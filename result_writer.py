@@ -0,0 +1,201 @@
+import os
+import asyncio
+import logging
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from database import AsyncSessionLocal, CrawlResult, ScreenshotBlob
+from metrics import CRAWL_STAGE_SECONDS
+from audit_version import bump_audit_version
+
+WRITE_BATCH_SIZE = int(os.getenv("CRAWLER_WRITE_BATCH_SIZE", "50"))
+
+# ---------- Statements ----------
+
+def blob_insert_statement(blobs: dict):
+    """
+    blobs: sha256 → (data, content_type); existing hashes keep their bytes
+    but get a fresh created_at, so the orphan GC grace window also covers
+    an old blob that a new crawl is about to point at again
+    """
+
+    stmt = insert(ScreenshotBlob).values([
+        {
+            "sha256": digest,
+            "content_type": content_type,
+            "size": len(data),
+            "data": data,
+        }
+        for digest, (data, content_type) in sorted(blobs.items())
+    ])
+
+    return stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"created_at": func.now()}
+    )
+
+
+def crawl_upsert_statement(rows: list):
+    """
+    INSERT ... ON CONFLICT (url) DO UPDATE for a list of crawl row dicts
+    RETURNING tells inserted (xmax = 0) from updated rows
+    """
+
+    stmt = insert(CrawlResult).values(rows)
+
+    updated_columns = {
+        key: stmt.excluded[key]
+        for key in rows[0]
+        if key not in ("id", "url")
+    }
+
+    return stmt.on_conflict_do_update(
+        index_elements=["url"],
+        set_=updated_columns
+    ).returning(
+        CrawlResult.id,
+        CrawlResult.url,
+        literal_column("xmax = 0").label("inserted")
+    )
+
+
+def _outcomes(result) -> list:
+    return [
+        {
+            "url": row.url,
+            "id": row.id,
+            "action": "inserted" if row.inserted else "updated"
+        }
+        for row in result
+    ]
+
+# ---------- Write (asyncpg) ----------
+
+async def write_crawl_results(rows: list, blobs: dict | None = None) -> list:
+    """
+    Upsert crawl rows (and their blobs) in one transaction
+    Falls back to row-by-row savepoints so one bad row can't sink the batch
+    """
+
+    if not rows:
+        return []
+
+    blobs = blobs or {}
+
+    # Same lock order in every batch (and blobs by digest), so concurrent
+    # batches can't deadlock on each other's rows
+    rows = sorted(rows, key=lambda row: row["url"])
+
+    with CRAWL_STAGE_SECONDS.time(stage="db_write"):
+        outcomes = await _write_crawl_results(rows, blobs)
+
+    if any(outcome["action"] != "failed" for outcome in outcomes):
+        await bump_audit_version()
+
+    return outcomes
+
+
+async def _write_crawl_results(rows: list, blobs: dict) -> list:
+
+    async with AsyncSessionLocal() as session:
+        try:
+            if blobs:
+                await session.execute(blob_insert_statement(blobs))
+
+            result = await session.execute(crawl_upsert_statement(rows))
+            outcomes = _outcomes(result)
+            await session.commit()
+            return outcomes
+
+        except Exception as e:
+            await session.rollback()
+            logging.error(f"Batch upsert of {len(rows)} row(s) failed: {e}")
+
+            if len(rows) == 1:
+                return [{"url": rows[0]["url"], "action": "failed", "error": str(e)}]
+
+        outcomes = []
+
+        for row in rows:
+            row_blobs = {
+                digest: blobs[digest]
+                for digest in (row.get("screenshot_sha256"), row.get("thumbnail_sha256"))
+                if digest in blobs
+            }
+
+            try:
+                async with session.begin_nested():
+                    if row_blobs:
+                        await session.execute(blob_insert_statement(row_blobs))
+
+                    result = await session.execute(crawl_upsert_statement([row]))
+                    outcomes.extend(_outcomes(result))
+
+            except Exception as e:
+                outcomes.append({"url": row["url"], "action": "failed", "error": str(e)})
+
+        await session.commit()
+        return outcomes
+
+# ---------- Buffered Writer ----------
+
+class CrawlResultWriter:
+    """
+    Buffers crawl rows from many pages and flushes them in batches
+    Flushes run as background tasks so page renders never wait on the DB
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, on_flush=None):
+        self.batch_size = max(1, batch_size)
+        self.on_flush = on_flush
+        self._rows = {}
+        self._blobs = {}
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._rows)
+
+    async def add(self, row: dict, blobs: dict | None = None):
+        # Later results for the same URL replace earlier ones (an upsert
+        # statement may not touch the same row twice)
+        self._rows[row["url"]] = row
+        self._blobs.update(blobs or {})
+
+        if len(self._rows) >= self.batch_size:
+            self._start_flush()
+
+    def _start_flush(self):
+        rows, blobs = list(self._rows.values()), self._blobs
+        self._rows, self._blobs = {}, {}
+
+        task = asyncio.create_task(self._flush(rows, blobs))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _flush(self, rows: list, blobs: dict) -> list:
+        try:
+            outcomes = await write_crawl_results(rows, blobs)
+        except Exception as e:
+            logging.error(f"Crawl result flush failed: {e}")
+            outcomes = [
+                {"url": row["url"], "action": "failed", "error": str(e)}
+                for row in rows
+            ]
+
+        logging.info(f"Flushed {len(rows)} crawl result(s)")
+
+        if self.on_flush is not None:
+            self.on_flush(outcomes)
+
+        return outcomes
+
+    async def close(self):
+        """
+        Flush what is buffered and wait for in-flight writes
+        """
+
+        if self._rows:
+            self._start_flush()
+
+        if self._pending:
+            await asyncio.gather(*self._pending)
@@ -0,0 +1,341 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select
+
+from database import CrawlResult
+from text_pipeline import EMBEDDING_MODEL
+from vector_store import from_bytes
+
+# ---------- INDEX CONFIG ----------
+
+# Up to this many vectors a full matmul is fast enough (and exact)
+EXACT_SEARCH_LIMIT = int(os.getenv("SIMILARITY_EXACT_LIMIT", "200000"))
+REFRESH_INTERVAL = float(os.getenv("SIMILARITY_REFRESH_INTERVAL", "5"))
+NEAR_DUPLICATE_SCORE = float(os.getenv("SIMILARITY_DUPLICATE_SCORE", "0.95"))
+
+# SimHash (random hyperplane LSH): 64 bits split into 8 bands of 8 bits
+LSH_BITS = 64
+LSH_BANDS = 8
+LSH_SEED = 13
+
+LOAD_CHUNK_SIZE = 5000
+
+# Re-read a little behind the watermark so rows committed out of
+# timestamp order are not missed (upserts make re-reads harmless)
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# ---------- Vector Index ----------
+
+class VectorIndex:
+    """
+    In-memory index over normalized page embeddings
+    Exact top-k below EXACT_SEARCH_LIMIT, SimHash-banded candidates above
+    """
+
+    def __init__(self, exact_limit: int = EXACT_SEARCH_LIMIT):
+        self.exact_limit = exact_limit
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = None
+        self.signatures = np.empty(0, dtype=np.uint64)
+        self.size = 0
+
+        self._positions = {}
+        # band → key → positions; kept exact, so buckets never hold stale rows
+        self._bands = [{} for _ in range(LSH_BANDS)]
+        self._planes = None
+
+    def __len__(self):
+        return self.size
+
+    # ---------- LSH ----------
+
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        if self._planes is None:
+            rng = np.random.default_rng(LSH_SEED)
+            self._planes = rng.standard_normal(
+                (vectors.shape[1], LSH_BITS)
+            ).astype(np.float32)
+
+        bits = (vectors @ self._planes) > 0
+        weights = np.left_shift(np.uint64(1), np.arange(LSH_BITS, dtype=np.uint64))
+        return np.bitwise_or.reduce(bits.astype(np.uint64) * weights, axis=1)
+
+    @staticmethod
+    def _band_keys(signature) -> list:
+        width = LSH_BITS // LSH_BANDS
+        mask = (1 << width) - 1
+        return [(int(signature) >> (band * width)) & mask for band in range(LSH_BANDS)]
+
+    def _bucket_add(self, position: int, signature):
+        for band, key in enumerate(self._band_keys(signature)):
+            self._bands[band].setdefault(key, set()).add(position)
+
+    def _bucket_discard(self, position: int, signature):
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._bands[band].get(key)
+
+            if bucket is not None:
+                bucket.discard(position)
+
+                if not bucket:
+                    del self._bands[band][key]
+
+    # ---------- Storage ----------
+
+    def _grow(self, needed: int, dim: int):
+        capacity = 0 if self.matrix is None else self.matrix.shape[0]
+
+        if needed <= capacity:
+            return
+
+        capacity = max(needed, capacity * 2, 1024)
+
+        matrix = np.zeros((capacity, dim), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        signatures = np.zeros(capacity, dtype=np.uint64)
+
+        if self.matrix is not None:
+            matrix[:self.size] = self.matrix[:self.size]
+            ids[:self.size] = self.ids[:self.size]
+            signatures[:self.size] = self.signatures[:self.size]
+
+        self.matrix, self.ids, self.signatures = matrix, ids, signatures
+
+    def upsert(self, ids: list, vectors: np.ndarray):
+        """
+        Add new vectors or replace the stored vector of an existing id
+        """
+
+        if not ids:
+            return
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        signatures = self._signatures(vectors)
+
+        self._grow(self.size + len(ids), vectors.shape[1])
+
+        for crawl_id, vector, signature in zip(ids, vectors, signatures):
+            position = self._positions.get(crawl_id)
+
+            if position is None:
+                position = self.size
+                self.size += 1
+                self._positions[crawl_id] = position
+            else:
+                # A re-embedded page leaves the buckets of its old signature
+                self._bucket_discard(position, self.signatures[position])
+
+            self.ids[position] = crawl_id
+            self.matrix[position] = vector
+            self.signatures[position] = signature
+
+            self._bucket_add(position, signature)
+
+    def remove(self, crawl_id: int) -> bool:
+        """
+        Drop a vector; the last row moves into its slot to keep storage dense
+        """
+
+        position = self._positions.pop(crawl_id, None)
+
+        if position is None:
+            return False
+
+        last = self.size - 1
+
+        self._bucket_discard(position, self.signatures[position])
+
+        if position != last:
+            moved_id = int(self.ids[last])
+
+            self._bucket_discard(last, self.signatures[last])
+
+            self.ids[position] = moved_id
+            self.matrix[position] = self.matrix[last]
+            self.signatures[position] = self.signatures[last]
+            self._positions[moved_id] = position
+
+            self._bucket_add(position, self.signatures[position])
+
+        self.size = last
+        return True
+
+    def vector(self, crawl_id: int):
+        position = self._positions.get(crawl_id)
+        return None if position is None else self.matrix[position]
+
+    # ---------- Search ----------
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        signature = self._signatures(vector[None, :])[0]
+        found = []
+
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._bands[band].get(key)
+
+            if bucket:
+                found.append(np.fromiter(bucket, dtype=np.int64, count=len(bucket)))
+
+        if not found:
+            return np.empty(0, dtype=np.int64)
+
+        return np.unique(np.concatenate(found))
+
+    def search(self, vector: np.ndarray, k: int, exclude_id: int | None = None):
+        """
+        Top-k (crawl id, cosine score) pairs, best first
+        """
+
+        if self.size == 0:
+            return []
+
+        vector = np.asarray(vector, dtype=np.float32)
+        wanted = k + (1 if exclude_id is not None else 0)
+
+        if self.size <= self.exact_limit:
+            positions = np.arange(self.size)
+        else:
+            positions = self._candidates(vector)
+
+            if len(positions) < wanted:
+                positions = np.arange(self.size)
+
+        scores = self.matrix[positions] @ vector
+
+        if len(scores) > wanted:
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(len(scores))
+
+        top = top[np.argsort(-scores[top])]
+
+        results = [
+            (int(self.ids[positions[i]]), float(scores[i]))
+            for i in top
+            if int(self.ids[positions[i]]) != exclude_id
+        ]
+
+        return results[:k]
+
+# ---------- Incremental Refresh (API Process) ----------
+
+class PageIndex:
+    """
+    Process-wide VectorIndex over crawl_results, refreshed incrementally
+    """
+
+    def __init__(self):
+        self.index = VectorIndex()
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+        # Index work runs in worker threads (off the event loop); this keeps
+        # a search from reading half of an update
+        self._index_lock = threading.Lock()
+
+    def _apply(self, rows: list) -> tuple[int, int]:
+        """
+        Upsert current vectors, evict cleared / other-model ones: (added, removed)
+        """
+
+        current = [
+            row for row in rows
+            if row.embedding is not None and row.embedding_model == EMBEDDING_MODEL
+        ]
+        vectors = np.stack([from_bytes(row.embedding) for row in current]) if current else None
+
+        with self._index_lock:
+            removed = sum(
+                self.index.remove(row.id)
+                for row in rows
+                if row.embedding is None or row.embedding_model != EMBEDDING_MODEL
+            )
+
+            if current:
+                self.index.upsert([row.id for row in current], vectors)
+
+        return len(current), removed
+
+    async def refresh(self, db, force: bool = False):
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_INTERVAL:
+            return
+
+        async with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < REFRESH_INTERVAL:
+                return
+
+            query = select(
+                CrawlResult.id,
+                CrawlResult.embedding,
+                CrawlResult.embedding_model,
+                CrawlResult.embedding_updated_at
+            )
+
+            # After the first load, also read cleared / other-model rows so
+            # their stale vectors are evicted
+            if self._watermark is None:
+                query = query.where(
+                    CrawlResult.embedding_model == EMBEDDING_MODEL,
+                    CrawlResult.embedding.is_not(None)
+                )
+            else:
+                query = query.where(
+                    CrawlResult.embedding_updated_at > self._watermark - REFRESH_OVERLAP
+                )
+
+            result = await db.stream(
+                query.order_by(CrawlResult.embedding_updated_at).execution_options(
+                    yield_per=LOAD_CHUNK_SIZE
+                )
+            )
+
+            loaded = removed = 0
+
+            async for rows in result.partitions():
+                added, evicted = await asyncio.to_thread(self._apply, rows)
+                loaded += added
+                removed += evicted
+
+                # NULL timestamps (sorted last) must not reset the watermark
+                stamps = [row.embedding_updated_at for row in rows if row.embedding_updated_at]
+
+                if stamps:
+                    self._watermark = max(stamps + ([self._watermark] if self._watermark else []))
+
+            self._refreshed_at = time.monotonic()
+
+            if loaded or removed:
+                logging.info(
+                    f"Similarity index: +{loaded} / -{removed} vector(s), {len(self.index)} total"
+                )
+
+    def _remove(self, crawl_id: int) -> bool:
+        with self._index_lock:
+            return self.index.remove(crawl_id)
+
+    async def remove(self, crawl_id: int) -> bool:
+        return await asyncio.to_thread(self._remove, crawl_id)
+
+    def _similar(self, crawl_id: int, k: int):
+        with self._index_lock:
+            vector = self.index.vector(crawl_id)
+
+            if vector is None:
+                return None
+
+            return self.index.search(vector, k, exclude_id=crawl_id)
+
+    async def similar(self, db, crawl_id: int, k: int):
+        await self.refresh(db)
+
+        # Matrix scoring is CPU work; keep it off the event loop
+        return await asyncio.to_thread(self._similar, crawl_id, k)
+
+
+page_index = PageIndex()
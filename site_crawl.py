@@ -0,0 +1,384 @@
+import os
+import io
+import gzip
+import math
+import hashlib
+import logging
+from urllib.parse import urlsplit, urljoin
+from urllib.robotparser import RobotFileParser
+import xml.etree.ElementTree as ET
+import httpx
+import redis
+
+from crawl_dedup import normalize_url
+
+# ---------- SITE CRAWL CONFIG ----------
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+SITE_BATCH_SIZE = int(os.getenv("SITE_CRAWL_BATCH_SIZE", "50"))
+SITE_JOB_TTL = int(os.getenv("SITE_CRAWL_JOB_TTL", str(24 * 3600)))
+
+MAX_SITE_PAGES = 1_000_000
+MAX_LINKS_PER_PAGE = 500
+MAX_SITEMAP_FILES = 20
+FETCH_TIMEOUT = 15.0
+
+USER_AGENT = "ArcneticSpider"
+
+# Seen-set sizing: many more links are seen than pages crawled
+BLOOM_URLS_PER_PAGE = 20
+BLOOM_MIN_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 0.001
+
+SKIP_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico",
+    ".zip", ".gz", ".tar", ".rar", ".7z", ".exe", ".dmg", ".mp3", ".mp4",
+    ".avi", ".mov", ".webm", ".woff", ".woff2", ".ttf", ".css", ".js",
+    ".xml", ".json", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+)
+
+# ---------- Bloom Filter (Redis Bitmap) ----------
+
+# ARGV: k, then k bit positions per URL; returns 1 per URL not seen before
+_BLOOM_ADD_SCRIPT = """
+local k = tonumber(ARGV[1])
+local added = {}
+for i = 0, (#ARGV - 1) / k - 1 do
+    local new = 0
+    for j = 1, k do
+        if redis.call('setbit', KEYS[1], ARGV[1 + i * k + j], 1) == 0 then
+            new = 1
+        end
+    end
+    added[#added + 1] = new
+end
+return added
+"""
+
+
+class RedisBloomFilter:
+    """
+    Fixed-size seen-set on a Redis bitmap: memory is set by capacity,
+    not by how many URLs the site turns out to have
+    """
+
+    def __init__(self, client, key: str, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.client = client
+        self.key = key
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+
+    def _positions(self, item: str) -> list:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        # Kirsch–Mitzenmacher double hashing
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add_many(self, items: list) -> list:
+        """
+        Adds items; returns those that were (probably) not seen before
+        """
+
+        if not items:
+            return []
+
+        args = [self.hashes]
+
+        for item in items:
+            args.extend(self._positions(item))
+
+        added = self.client.eval(_BLOOM_ADD_SCRIPT, 1, self.key, *args)
+        return [item for item, new in zip(items, added) if new]
+
+# ---------- robots.txt / sitemap.xml ----------
+
+async def fetch_robots(client: httpx.AsyncClient, origin: str) -> str:
+    try:
+        response = await client.get(f"{origin}/robots.txt")
+    except httpx.HTTPError as e:
+        logging.warning(f"robots.txt unavailable for {origin}: {e}")
+        return ""
+
+    return response.text if response.status_code == 200 else ""
+
+
+def robots_parser(robots_txt: str) -> RobotFileParser:
+    parser = RobotFileParser()
+    parser.parse(robots_txt.splitlines())
+    return parser
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(data: bytes, limit: int) -> tuple[list, list]:
+    """
+    (page URLs, child sitemap URLs), streamed with iterparse
+    """
+
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+
+    pages, sitemaps = [], []
+    is_index = None
+
+    for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        if event == "start":
+            if is_index is None:
+                is_index = _local_name(elem.tag) == "sitemapindex"
+            continue
+
+        if _local_name(elem.tag) == "loc" and elem.text:
+            (sitemaps if is_index else pages).append(elem.text.strip())
+
+            if len(pages) >= limit:
+                break
+
+        # Keep memory flat on 50k-URL sitemaps
+        if _local_name(elem.tag) in ("url", "sitemap"):
+            elem.clear()
+
+    return pages, sitemaps
+
+
+async def fetch_sitemap_urls(
+    client: httpx.AsyncClient,
+    sitemap_urls: list,
+    limit: int
+) -> list:
+    """
+    Page URLs from sitemaps (following sitemap indexes), at most `limit`
+    """
+
+    queue, seen, pages = list(sitemap_urls), set(), []
+
+    while queue and len(seen) < MAX_SITEMAP_FILES and len(pages) < limit:
+        sitemap_url = queue.pop(0)
+
+        if sitemap_url in seen:
+            continue
+
+        seen.add(sitemap_url)
+
+        try:
+            response = await client.get(sitemap_url)
+
+            if response.status_code != 200:
+                continue
+
+            found, children = parse_sitemap(response.content, limit - len(pages))
+
+        except (httpx.HTTPError, ET.ParseError, OSError) as e:
+            logging.warning(f"Sitemap {sitemap_url} skipped: {e}")
+            continue
+
+        pages.extend(found)
+        queue.extend(children)
+
+    return pages[:limit]
+
+
+async def discover_seeds(start_url: str, use_sitemap: bool, limit: int) -> tuple[str, list]:
+    """
+    (robots.txt text, sitemap page URLs) for the start URL's origin
+    """
+
+    parts = urlsplit(start_url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+
+    async with httpx.AsyncClient(
+        timeout=FETCH_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT}
+    ) as client:
+        robots_txt = await fetch_robots(client, origin)
+
+        if not use_sitemap:
+            return robots_txt, []
+
+        declared = robots_parser(robots_txt).site_maps() or []
+        sitemaps = declared or [f"{origin}/sitemap.xml"]
+
+        return robots_txt, await fetch_sitemap_urls(client, sitemaps, limit)
+
+# ---------- Link Filtering ----------
+
+def _site_host(host: str) -> str:
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def same_site_links(
+    links: list,
+    site: str,
+    robots: RobotFileParser,
+    limit: int | None = MAX_LINKS_PER_PAGE
+) -> list:
+    """
+    Normalized, crawlable same-site URLs (order kept, duplicates dropped);
+    limit caps page links, sitemap seeds pass their own (None = no cap)
+    """
+
+    kept = []
+
+    for link in links[:limit]:
+        parts = urlsplit(link)
+
+        if parts.scheme not in ("http", "https") or _site_host(parts.hostname) != site:
+            continue
+
+        if parts.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+
+        url = normalize_url(link)
+
+        if robots.can_fetch(USER_AGENT, url):
+            kept.append(url)
+
+    return list(dict.fromkeys(kept))
+
+# ---------- Frontier (Redis) ----------
+
+_client = None
+_client_pid = None
+
+
+def _redis():
+    global _client, _client_pid
+
+    if _client_pid != os.getpid():
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=5, socket_connect_timeout=0.5)
+        _client_pid = os.getpid()
+
+    return _client
+
+
+class SiteJobExpired(Exception):
+    """
+    The job's state is gone from Redis (SITE_JOB_TTL passed without progress)
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Site crawl job {job_id} expired")
+
+
+class SiteFrontier:
+    """
+    Shared state of one site crawl job, kept in Redis so any worker can
+    continue it: config, counters, FIFO frontier and the Bloom seen-set
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.client = _redis()
+        self.meta_key = f"site:{job_id}:meta"
+        self.queue_key = f"site:{job_id}:frontier"
+        self.seen_key = f"site:{job_id}:seen"
+        self._bloom = None
+
+    # ---------- Job State ----------
+
+    def create(self, start_url: str, max_pages: int, max_depth: int, robots_txt: str):
+        self.client.hset(self.meta_key, mapping={
+            "start_url": start_url,
+            "site": _site_host(urlsplit(start_url).hostname),
+            "max_pages": min(max_pages, MAX_SITE_PAGES),
+            "max_depth": max_depth,
+            "robots": robots_txt,
+            "admitted": 0,
+            "crawled": 0,
+            "failed": 0,
+        })
+        self.client.expire(self.meta_key, SITE_JOB_TTL)
+
+    def meta(self) -> dict:
+        raw = self.client.hgetall(self.meta_key)
+
+        if not raw:
+            raise SiteJobExpired(self.job_id)
+
+        meta = {k.decode(): v.decode() for k, v in raw.items()}
+
+        for key in ("max_pages", "max_depth", "admitted", "crawled", "failed"):
+            meta[key] = int(meta[key])
+
+        return meta
+
+    def count(self, **deltas):
+        pipe = self.client.pipeline(transaction=False)
+
+        for key, delta in deltas.items():
+            pipe.hincrby(self.meta_key, key, delta)
+
+        self._touch(pipe)
+        pipe.execute()
+
+    def _touch(self, pipe):
+        # Config, counters, frontier and seen-set live and expire together
+        for key in (self.meta_key, self.queue_key, self.seen_key):
+            pipe.expire(key, SITE_JOB_TTL)
+
+    @property
+    def bloom(self) -> RedisBloomFilter:
+        if self._bloom is None:
+            max_pages = self.client.hget(self.meta_key, "max_pages")
+
+            if max_pages is None:
+                raise SiteJobExpired(self.job_id)
+
+            max_pages = int(max_pages)
+            capacity = max(BLOOM_MIN_CAPACITY, max_pages * BLOOM_URLS_PER_PAGE)
+            self._bloom = RedisBloomFilter(self.client, self.seen_key, capacity)
+
+        return self._bloom
+
+    # ---------- Queue ----------
+
+    def admit(self, urls: list, depth: int) -> int:
+        """
+        Queue unseen URLs at `depth` while the page budget allows
+        """
+
+        meta = self.meta()
+
+        if depth > meta["max_depth"]:
+            return 0
+
+        room = meta["max_pages"] - meta["admitted"]
+
+        if room <= 0:
+            return 0
+
+        fresh = self.bloom.add_many(urls)[:room]
+
+        if fresh:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.rpush(self.queue_key, *(f"{depth}\t{url}" for url in fresh))
+            pipe.hincrby(self.meta_key, "admitted", len(fresh))
+            self._touch(pipe)
+            pipe.execute()
+
+        return len(fresh)
+
+    def next_batch(self, size: int = SITE_BATCH_SIZE) -> list:
+        """
+        [(depth, url), ...] popped from the front of the frontier
+        """
+
+        items = self.client.lpop(self.queue_key, size) or []
+
+        return [
+            (int(depth), url)
+            for depth, url in (item.decode().split("\t", 1) for item in items)
+        ]
+
+    def pending(self) -> int:
+        return self.client.llen(self.queue_key)
+
+    def robots(self) -> RobotFileParser:
+        robots_txt = self.client.hget(self.meta_key, "robots") or b""
+        return robots_parser(robots_txt.decode())
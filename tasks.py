@@ -1,6 +1,54 @@
+import os
+import random
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import partial
 from celery import Celery
-from crawler_engine import run_crawler_task
-import asyncio
+from celery.signals import (
+    celeryd_after_setup, worker_process_init, worker_process_shutdown
+)
+from crawler_engine import run_crawler_task, run_batch_crawl
+from browser_pool import shutdown_browser_pool
+from event_loop import run_async
+from database import SyncSessionLocal
+from html_store import train_dictionary
+from html_text import shutdown_pool as shutdown_extract_pool
+from blob_store import orphan_blob_delete_statement
+from text_pipeline import run_text_pipeline
+from vector_store import ensure_page_embeddings
+from ai_agents.agent_local import warm_up as warm_up_embedding_model
+from ai_agents.llm_client import get_llm_client
+from progress import publish_event, publish_event_async
+from crawl_dedup import refresh_crawl, release_crawl
+from crawl_profiles import profile_key
+from politeness import try_acquire, release
+from crawl_failures import (
+    CRAWL_MAX_RETRIES, CrawlFailed, backoff_delay, failed_result,
+    circuit_open, circuit_open_result
+)
+from site_crawl import SiteFrontier, SiteJobExpired, discover_seeds, same_site_links
+from metrics import flush as flush_metrics, CRAWL_PAGES
+
+# Keep page embeddings (and the similarity index) current as crawls land
+EMBED_ON_CRAWL = os.getenv("EMBED_ON_CRAWL", "1") == "1"
+
+# Load models/clients when a worker child starts instead of on its first task
+WARM_UP_MODELS = os.getenv("WARM_UP_MODELS", "1") == "1"
+
+# Dashboard audits never queue behind bulk work
+INTERACTIVE_QUEUE = "interactive"
+BULK_QUEUE = "bulk"
+
+# Only workers consuming these queues run embedding / LLM tasks
+WARM_UP_QUEUES = {BULK_QUEUE}
+
+# Spread re-deliveries of deferred crawls for the same host
+DEFER_JITTER = 1.0
+
+# Screenshot blobs left behind by recrawls are collected this often (celery beat)
+BLOB_GC_INTERVAL = int(os.getenv("BLOB_GC_INTERVAL", str(6 * 3600)))
+BLOB_GC_GRACE = int(os.getenv("BLOB_GC_GRACE", "3600"))
 
 celery_app = Celery(
     "spider_tasks",
@@ -8,8 +56,370 @@ celery_app = Celery(
     backend="redis://redis:6379/0"
 )
 
+celery_app.conf.update(
+    task_default_queue=BULK_QUEUE,
+    task_routes={
+        "tasks.execute_crawler": {"queue": INTERACTIVE_QUEUE},
+    },
+    # One task at a time per child, so a deferred host never hoards prefetched work
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "collect-orphan-blobs": {
+            "task": "tasks.collect_orphan_blobs",
+            "schedule": BLOB_GC_INTERVAL,
+        },
+    },
+)
+
+
+def schedule_crawl(url, force=False, profile=None, task_id=None, interactive=True):
+    """
+    Enqueue one crawl on the interactive or the bulk queue
+    """
+
+    return execute_crawler.apply_async(
+        (url, force, profile),
+        task_id=task_id,
+        queue=INTERACTIVE_QUEUE if interactive else BULK_QUEUE
+    )
+
+
+@celery_app.task(bind=True, max_retries=None)
+def execute_crawler(self, url, force=False, profile=None, attempt=0):
+    """
+    attempt: failed runs so far; politeness deferrals don't count,
+    which is why this is not self.request.retries
+    """
+
+    task_id = self.request.id
+
+    # Host known to be down: fail fast instead of waiting out its timeouts
+    open_for = circuit_open(url)
+
+    if open_for:
+        CRAWL_PAGES.inc(status="circuit_open")
+        result = circuit_open_result(url, open_for)
+    else:
+        result = _crawl_with_lease(self, url, force, profile, attempt)
+
+    # Later submissions of this URL start a new crawl again
+    release_crawl(url, task_id, variant=profile_key(profile), force=force)
+
+    if result["status"] == "failed":
+        publish_event(task_id, "failed", **result)
+        raise CrawlFailed(f"{result['failure']}: {result['error']}")
+
+    if EMBED_ON_CRAWL and result.get("crawl_id"):
+        embed_crawl_pages.delay([result["crawl_id"]])
+
+    publish_event(task_id, "completed", **result)
+
+    return result
+
+
+def _crawl_with_lease(task, url, force, profile, attempt):
+    """
+    One crawl attempt under a politeness lease; transient failures are
+    re-queued with backoff (self.retry) instead of sleeping in the worker
+    """
+
+    task_id = task.request.id
+
+    # Host at its concurrency/rate limit: hand the slot back and come back later
+    lease, wait = try_acquire(url)
+
+    if lease is None:
+        countdown = wait + random.uniform(0, DEFER_JITTER)
+
+        publish_event(task_id, "deferred", url=url, retry_in=round(wait, 2))
+        refresh_crawl(url, task_id, countdown, variant=profile_key(profile), force=force)
+        raise task.retry(countdown=countdown)
+
+    publish_event(task_id, "started", url=url, attempt=attempt)
+
+    try:
+        result = run_async(run_crawler_task(
+            url,
+            force,
+            progress=partial(publish_event_async, task_id),
+            profile=profile
+        ))
+    except Exception as e:
+        # Browser launch / pool errors escape run_crawler_task
+        result = failed_result(url, e)
+    finally:
+        release(url, lease)
+
+    if result["status"] == "failed" and result["retryable"] and attempt < CRAWL_MAX_RETRIES:
+        delay = backoff_delay(attempt)
+
+        publish_event(
+            task_id, "retrying", url=url, failure=result["failure"],
+            error=result["error"], attempt=attempt + 1, retry_in=round(delay, 2)
+        )
+
+        # Same task id, so the in-flight marker keeps coalescing duplicates
+        refresh_crawl(url, task_id, delay, variant=profile_key(profile), force=force)
+        raise task.retry(
+            args=(url, force, profile),
+            kwargs={"attempt": attempt + 1},
+            countdown=delay
+        )
+
+    return result
+
+
+@celery_app.task(bind=True)
+def execute_batch_crawler(self, urls, concurrency=None, force=False, profile=None):
+
+    task_id = self.request.id
+    publish_event(task_id, "started", total=len(urls))
+
+    batch = run_async(run_batch_crawl(
+        urls,
+        concurrency,
+        force,
+        progress=partial(publish_event_async, task_id),
+        profile=profile
+    ))
+
+    crawl_ids = [r["crawl_id"] for r in batch["results"] if r.get("crawl_id")]
+
+    if EMBED_ON_CRAWL and crawl_ids:
+        embed_crawl_pages.delay(crawl_ids)
+
+    publish_event(
+        task_id,
+        "completed",
+        total=batch["total"],
+        completed=batch["completed"],
+        not_modified=batch["not_modified"],
+        failed=batch["failed"]
+    )
+
+    return batch
+
+
+@celery_app.task(bind=True)
+def execute_site_crawl(
+    self,
+    job_id,
+    start_url=None,
+    max_pages=500,
+    max_depth=3,
+    use_sitemap=True,
+    force=False,
+    profile=None,
+    concurrency=None
+):
+    """
+    One frontier batch per run; the task re-queues itself until the
+    frontier is empty, so a large site never pins a worker
+    """
+
+    frontier = SiteFrontier(job_id)
+
+    # First run: seed from the start URL, robots.txt and sitemaps
+    if start_url is not None:
+        robots_txt, sitemap_urls = run_async(
+            discover_seeds(start_url, use_sitemap, max_pages)
+        )
+
+        frontier.create(start_url, max_pages, max_depth, robots_txt)
+
+        site, robots = frontier.meta()["site"], frontier.robots()
+
+        # The start URL obeys robots.txt like every discovered link
+        start_allowed = frontier.admit(same_site_links([start_url], site, robots), depth=0) > 0
+
+        if not start_allowed:
+            logging.info(f"Start URL {start_url} disallowed by robots.txt")
+
+        # discover_seeds already stopped at max_pages sitemap URLs
+        seeded = frontier.admit(
+            same_site_links(sitemap_urls, site, robots, limit=None),
+            depth=1
+        )
+
+        publish_event(
+            job_id, "started", url=start_url,
+            start_allowed=start_allowed, sitemap_urls=seeded
+        )
+
+    try:
+        meta = frontier.meta()
+    except SiteJobExpired as e:
+        # A continuation that outlived the job's state has nothing to resume
+        logging.error(str(e))
+        publish_event(job_id, "failed", error=str(e))
+        raise
+
+    batch = frontier.next_batch()
+
+    if batch:
+        depths = {url: depth for depth, url in batch}
+        robots = frontier.robots()
+
+        crawl = run_async(run_batch_crawl(
+            list(depths),
+            concurrency,
+            force,
+            progress=partial(publish_event_async, job_id),
+            profile=profile,
+            discover_links=True
+        ))
+
+        discovered = 0
+
+        for result in crawl["results"]:
+            links = result.pop("links", None)
+
+            if links:
+                discovered += frontier.admit(
+                    same_site_links(links, meta["site"], robots),
+                    depths[result["url"]] + 1
+                )
+
+        frontier.count(
+            crawled=crawl["completed"] + crawl["not_modified"],
+            failed=crawl["failed"]
+        )
+
+        crawl_ids = [r["crawl_id"] for r in crawl["results"] if r.get("crawl_id")]
+
+        if EMBED_ON_CRAWL and crawl_ids:
+            embed_crawl_pages.delay(crawl_ids)
+
+        publish_event(
+            job_id,
+            "batch",
+            crawled=len(batch),
+            discovered=discovered,
+            pending=frontier.pending()
+        )
+
+    meta = frontier.meta()
+    summary = {
+        "job_id": job_id,
+        "start_url": meta["start_url"],
+        "admitted": meta["admitted"],
+        "crawled": meta["crawled"],
+        "failed": meta["failed"],
+    }
+
+    if frontier.pending():
+        execute_site_crawl.apply_async(
+            (job_id,),
+            {"force": force, "profile": profile, "concurrency": concurrency},
+            queue=BULK_QUEUE
+        )
+
+        return {"status": "continuing", **summary}
+
+    publish_event(job_id, "completed", **summary)
+
+    return {"status": "completed", **summary}
+
+
+@celery_app.task
+def train_html_dictionary(domain=None, samples=500):
+
+    with SyncSessionLocal() as session:
+        return train_dictionary(session, domain, samples)
+
+
+@celery_app.task
+def collect_orphan_blobs(grace_seconds=BLOB_GC_GRACE):
+    """
+    Delete screenshot blobs no crawl row points at any more
+    (a recrawl with a new screenshot leaves the old one behind)
+    """
+
+    # Skip fresh blobs: their row may still be mid-transaction
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+
+    with SyncSessionLocal() as session:
+        deleted = session.execute(orphan_blob_delete_statement(older_than=cutoff)).rowcount
+        session.commit()
+
+    logging.info(f"Collected {deleted} orphaned screenshot blob(s)")
+
+    return {"deleted": deleted}
+
+
+@celery_app.task(bind=True)
+def process_text_pipeline(self, text=None, crawl_id=None, documents=None):
+
+    task_id = self.request.id
+
+    # Single text or a micro-batch of {"text", "crawl_id"} documents
+    if documents is None:
+        documents = [{"text": text, "crawl_id": crawl_id}]
+
+    publish_event(task_id, "started", documents=len(documents))
+
+    try:
+        results = run_text_pipeline(documents, progress=partial(publish_event, task_id))
+    except Exception as e:
+        publish_event(task_id, "failed", error=str(e))
+        raise
+
+    completed = sum(1 for r in results if r["status"] == "completed")
+
+    publish_event(
+        task_id,
+        "completed" if completed else "failed",
+        completed=completed,
+        failed=len(results) - completed
+    )
+
+    return results
+
 
 @celery_app.task
-def execute_crawler(url):
+def embed_crawl_pages(crawl_ids):
+
+    with SyncSessionLocal() as session:
+        vectors = ensure_page_embeddings(session, crawl_ids)
+
+    return {"status": "completed", "embedded": len(vectors)}
+
+
+# Queues this worker consumes (-Q); set in the parent, inherited by the children
+_worker_queues = set()
+
+
+@celeryd_after_setup.connect
+def remember_worker_queues(sender, instance, **kwargs):
+    global _worker_queues
+
+    _worker_queues = set(instance.app.amqp.queues.consume_from)
+
+
+def _warm_up():
+
+    try:
+        warm_up_embedding_model()
+        get_llm_client()
+    except Exception as e:
+        # The first task retries the load and reports the real error
+        logging.warning(f"Model warm-up failed: {e}")
+
+
+@worker_process_init.connect
+def warm_up_models(**kwargs):
+
+    if not WARM_UP_MODELS or not _worker_queues & WARM_UP_QUEUES:
+        return
+
+    # Loading torch can outlast worker_proc_alive_timeout, so never block
+    # the child's startup on it (get_model serializes with a first task)
+    threading.Thread(target=_warm_up, name="model-warm-up", daemon=True).start()
+
+
+@worker_process_shutdown.connect
+def close_browser_pool(**kwargs):
 
-    return asyncio.run(run_crawler_task(url))
+    shutdown_browser_pool()
+    shutdown_extract_pool()
+    flush_metrics()
@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+import main
+
+
+def _sql(query) -> str:
+    return str(query.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True}
+    ))
+
+# ---------- Keyset Query ----------
+
+def test_first_page_is_newest_first():
+    sql = _sql(main._audits_page_query(["id", "url"], None, None, 10))
+
+    assert "WHERE" not in sql
+    assert "ORDER BY crawl_results.id DESC" in sql
+    assert "LIMIT 10" in sql
+
+
+def test_next_page_continues_below_cursor():
+    sql = _sql(main._audits_page_query(["id", "url"], 100, None, 10))
+
+    assert "crawl_results.id < 100" in sql
+    assert "ORDER BY crawl_results.id DESC" in sql
+
+
+def test_projection_selects_only_requested_columns():
+    sql = _sql(main._audits_page_query(["id", "title"], None, None, 5))
+    columns = sql.split("FROM")[0]
+
+    assert "crawl_results.title" in columns
+    assert "crawl_results.url" not in columns
+
+# ---------- ETag ----------
+
+def test_etag_is_weak_and_stable():
+    etag = main._audits_etag(7, "limit=10")
+
+    assert etag.startswith('W/"')
+    assert etag == main._audits_etag(7, "limit=10")
+
+
+def test_etag_changes_with_version_and_query():
+    etag = main._audits_etag(7, "limit=10")
+
+    assert etag != main._audits_etag(8, "limit=10")
+    assert etag != main._audits_etag(7, "limit=20")
+
+# ---------- Endpoint ----------
+
+class _FakeSession:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        return SimpleNamespace(all=lambda: [SimpleNamespace(_mapping=row) for row in self.rows])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = _FakeSession([
+        {"id": 12, "url": "https://a.example/"},
+        {"id": 11, "url": "https://b.example/"},
+    ])
+
+    async def get_db():
+        yield session
+
+    async def version():
+        return 7
+
+    monkeypatch.setattr(main, "audit_version", version)
+    main.app.dependency_overrides[main.get_db] = get_db
+
+    yield TestClient(main.app), session
+
+    main.app.dependency_overrides.clear()
+
+
+def test_full_page_returns_cursor_and_etag(client):
+    http, _ = client
+
+    response = http.get("/audits", params={"limit": 2, "fields": "url"})
+
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [12, 11]
+    assert response.headers["X-Next-After-Id"] == "11"
+    assert response.headers["ETag"] == main._audits_etag(7, "limit=2&fields=url")
+
+
+def test_matching_etag_is_304_without_a_query(client):
+    http, session = client
+    etag = http.get("/audits").headers["ETag"]
+    queries = session.queries
+
+    response = http.get("/audits", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert session.queries == queries
+
+
+def test_no_etag_when_version_unavailable(client, monkeypatch):
+    http, _ = client
+
+    async def unavailable():
+        return None
+
+    monkeypatch.setattr(main, "audit_version", unavailable)
+
+    response = http.get("/audits")
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_failed_enqueue_releases_the_claim(client, monkeypatch):
+    http, _ = client
+    released = []
+
+    async def claim(url, variant="", force=False):
+        return "task-1", True
+
+    def schedule(*args, **kwargs):
+        raise ConnectionError("broker down")
+
+    def release(url, task_id, variant="", force=False):
+        released.append((url, task_id, variant, force))
+
+    monkeypatch.setattr(main, "claim_crawl", claim)
+    monkeypatch.setattr(main, "schedule_crawl", schedule)
+    monkeypatch.setattr(main, "release_crawl", release)
+
+    response = http.post("/audit", json={"url": "https://a.example/", "force": True})
+
+    variant = main.profile_key(main.AuditRequest(url="https://a.example/").crawl_profile())
+
+    assert response.status_code == 503
+    assert released == [("https://a.example/", "task-1", variant, True)]
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.dialects import postgresql
+
+from blob_store import orphan_blob_delete_statement
+from result_writer import blob_insert_statement
+
+
+def _sql(stmt) -> str:
+    return " ".join(str(stmt.compile(dialect=postgresql.dialect())).split())
+
+
+def test_re_referenced_blob_gets_a_fresh_created_at():
+    sql = _sql(blob_insert_statement({"ab" * 32: (b"png", "image/png")}))
+
+    # An existing (possibly orphaned, old) blob is touched, not skipped, so
+    # GC's created_at cutoff can't delete it before the new crawl row commits
+    assert "ON CONFLICT (sha256) DO UPDATE SET created_at = now()" in sql
+    assert "data =" not in sql.split("DO UPDATE")[1]
+
+
+def test_gc_only_deletes_unreferenced_blobs_past_the_grace_window():
+    cutoff = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    sql = _sql(orphan_blob_delete_statement(older_than=cutoff))
+
+    assert "NOT (EXISTS (SELECT * FROM crawl_results WHERE crawl_results.screenshot_sha256 = screenshot_blobs.sha256))" in sql
+    assert "NOT (EXISTS (SELECT * FROM crawl_results WHERE crawl_results.thumbnail_sha256 = screenshot_blobs.sha256))" in sql
+    assert "screenshot_blobs.created_at <" in sql
+
+
+def test_delete_audit_gc_is_limited_to_its_digests():
+    sql = _sql(orphan_blob_delete_statement(digests={"ab" * 32}))
+
+    assert "screenshot_blobs.sha256 IN" in sql
+    assert "created_at" not in sql
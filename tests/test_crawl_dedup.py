@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+import crawl_dedup
+from crawl_dedup import normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM", "https://example.com/"),
+    ("https://example.com:443/a?b=1#frag", "https://example.com/a?b=1"),
+    ("http://example.com:80/", "http://example.com/"),
+    ("http://example.com:8080/x", "http://example.com:8080/x"),
+    ("  https://user:pw@Example.com/p  ", "https://user:pw@example.com/p"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_is_idempotent():
+    url = normalize_url("HTTPS://Example.com:443?q=1#x")
+    assert normalize_url(url) == url
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    from fakeredis import aioredis as fake_aioredis
+
+    server = fakeredis.FakeServer()
+    sync = fakeredis.FakeRedis(server=server)
+
+    # A fresh async client per call: each asyncio.run() is a new event loop
+    monkeypatch.setattr(
+        crawl_dedup, "_clients", lambda: (sync, fake_aioredis.FakeRedis(server=server))
+    )
+    return sync
+
+
+def _claim(url, **kwargs):
+    return asyncio.run(crawl_dedup.claim_crawl(url, **kwargs))
+
+
+def test_duplicates_coalesce_until_released(fake_redis):
+    task_id, claimed = _claim("https://example.com/")
+    assert claimed
+
+    assert _claim("https://example.com/") == (task_id, False)
+
+    crawl_dedup.release_crawl("https://example.com/", task_id)
+
+    assert _claim("https://example.com/")[1]
+
+
+def test_force_does_not_join_a_conditional_crawl(fake_redis):
+    conditional, _ = _claim("https://example.com/")
+    forced, claimed = _claim("https://example.com/", force=True)
+
+    assert claimed and forced != conditional
+    assert _claim("https://example.com/", force=True) == (forced, False)
+
+
+def test_refresh_extends_only_the_holders_marker(fake_redis):
+    key = crawl_dedup._inflight_key("https://example.com/")
+
+    task_id, _ = _claim("https://example.com/")
+
+    crawl_dedup.refresh_crawl("https://example.com/", task_id, countdown=600)
+    assert fake_redis.ttl(key) > crawl_dedup.INFLIGHT_TTL + 500
+
+    # Someone else's marker is left alone
+    crawl_dedup.refresh_crawl("https://example.com/", "other-task", countdown=3600)
+    assert fake_redis.get(key).decode() == task_id
+    assert fake_redis.ttl(key) < crawl_dedup.INFLIGHT_TTL + 3600
+
+
+def test_refresh_retakes_a_lapsed_marker(fake_redis):
+    key = crawl_dedup._inflight_key("https://example.com/")
+
+    crawl_dedup.refresh_crawl("https://example.com/", "task-1", countdown=10)
+
+    assert fake_redis.get(key).decode() == "task-1"
+    assert _claim("https://example.com/") == ("task-1", False)
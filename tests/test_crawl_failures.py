@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+import crawl_failures
+from crawl_failures import (
+    BROWSER_CRASH, CONNECTION, DNS, HTTP_4XX, HTTP_5XX, OTHER, TIMEOUT, TLS,
+    HTTPStatusError, backoff_delay, classify_failure, failed_result, is_retryable,
+)
+
+URL = "https://example.com/page"
+
+# ---------- Classification ----------
+
+class TimeoutError(Exception):
+    """
+    Stands in for playwright's TimeoutError (not the builtin)
+    """
+
+
+@pytest.mark.parametrize("error, failure", [
+    (HTTPStatusError(503, URL), HTTP_5XX),
+    (HTTPStatusError(404, URL), HTTP_4XX),
+    (Exception("page.goto: net::ERR_NAME_NOT_RESOLVED at https://x"), DNS),
+    (Exception("net::ERR_CERT_DATE_INVALID"), TLS),
+    (Exception("net::ERR_SSL_PROTOCOL_ERROR"), TLS),
+    (Exception("net::ERR_CONNECTION_TIMED_OUT"), TIMEOUT),
+    (Exception("net::ERR_CONNECTION_REFUSED"), CONNECTION),
+    (TimeoutError("Timeout 30000ms exceeded"), TIMEOUT),
+    (asyncio.TimeoutError(), TIMEOUT),
+    (Exception("Target closed"), BROWSER_CRASH),
+    (Exception("Page crashed"), BROWSER_CRASH),
+    (ValueError("something else"), OTHER),
+])
+def test_classify_failure(error, failure):
+    assert classify_failure(error) == failure
+
+
+@pytest.mark.parametrize("failure, status, retryable", [
+    (TIMEOUT, None, True),
+    (CONNECTION, None, True),
+    (HTTP_5XX, 502, True),
+    (BROWSER_CRASH, None, True),
+    (DNS, None, False),
+    (TLS, None, False),
+    (HTTP_4XX, 404, False),
+    (HTTP_4XX, 429, True),
+    (HTTP_4XX, 408, True),
+])
+def test_is_retryable(failure, status, retryable):
+    assert is_retryable(failure, status) is retryable
+
+
+def test_failed_result_carries_class_and_status():
+    result = failed_result(URL, HTTPStatusError(429, URL))
+
+    assert result["status"] == "failed"
+    assert result["failure"] == HTTP_4XX
+    assert result["retryable"] is True
+    assert result["http_status"] == 429
+    assert "http_status" not in failed_result(URL, Exception("net::ERR_NAME_NOT_RESOLVED"))
+
+# ---------- Backoff ----------
+
+def test_backoff_is_full_jitter_and_capped(monkeypatch):
+    monkeypatch.setattr(crawl_failures, "RETRY_BASE_DELAY", 5.0)
+    monkeypatch.setattr(crawl_failures, "RETRY_MAX_DELAY", 60.0)
+    monkeypatch.setattr(crawl_failures.random, "uniform", lambda low, high: (low, high))
+
+    assert [backoff_delay(attempt) for attempt in range(6)] == [
+        (0, 5.0), (0, 10.0), (0, 20.0), (0, 40.0), (0, 60.0), (0, 60.0)
+    ]
+
+
+def test_backoff_stays_in_range():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt) <= crawl_failures.RETRY_MAX_DELAY
+
+# ---------- Circuit Breaker ----------
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    from fakeredis import aioredis as fake_aioredis
+
+    server = fakeredis.FakeServer()
+    sync = fakeredis.FakeRedis(server=server)
+
+    # A fresh async client per call: each asyncio.run() is a new event loop
+    monkeypatch.setattr(
+        crawl_failures, "_clients", lambda: (sync, fake_aioredis.FakeRedis(server=server))
+    )
+    monkeypatch.setattr(crawl_failures, "BREAKER_THRESHOLD", 3)
+
+    return sync
+
+
+def _fail(failure: str, times: int = 1):
+    async def run():
+        for _ in range(times):
+            await crawl_failures.record_failure_async(URL, failure)
+
+    asyncio.run(run())
+
+
+def test_circuit_opens_at_threshold(fake_redis):
+    _fail(TIMEOUT, 2)
+    assert crawl_failures.circuit_open(URL) == 0.0
+
+    _fail(CONNECTION)
+    open_for = crawl_failures.circuit_open(URL)
+
+    assert 0 < open_for <= crawl_failures.BREAKER_COOLDOWN
+    assert asyncio.run(crawl_failures.circuit_open_async("https://EXAMPLE.com/other")) > 0
+
+
+def test_page_level_failures_are_not_counted(fake_redis):
+    _fail(HTTP_4XX, 5)
+    _fail(BROWSER_CRASH, 5)
+
+    assert crawl_failures.circuit_open(URL) == 0.0
+
+
+def test_first_failure_after_cooldown_reopens(fake_redis):
+    failures_key, open_key = crawl_failures._keys(URL)
+
+    _fail(HTTP_5XX, 3)
+
+    # Cooldown over: the open flag expires, the counter sits one short
+    fake_redis.delete(open_key)
+    assert crawl_failures.circuit_open(URL) == 0.0
+    assert int(fake_redis.get(failures_key)) == 2
+
+    _fail(TIMEOUT)
+    assert crawl_failures.circuit_open(URL) > 0
+
+
+def test_success_resets_the_host(fake_redis):
+    _fail(TIMEOUT, 2)
+    asyncio.run(crawl_failures.record_success_async(URL))
+    _fail(TIMEOUT, 2)
+
+    assert crawl_failures.circuit_open(URL) == 0.0
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+pytest.importorskip("playwright")
+
+import crawler_engine
+
+
+class _NullWriter:
+
+    def __init__(self, on_flush=None):
+        pass
+
+    async def close(self):
+        pass
+
+# ---------- Batch Politeness ----------
+
+def test_lease_is_taken_inside_the_crawl_slot(monkeypatch):
+    active = 0
+    leased_while_active = []
+    released = []
+
+    async def no_circuit(url):
+        return 0
+
+    async def acquire(url):
+        leased_while_active.append(active)
+        return f"token:{url}", 0
+
+    async def release(url, token):
+        released.append(token)
+
+    async def crawl(url, *args):
+        nonlocal active
+        active += 1
+        await asyncio.sleep(0)
+        active -= 1
+        return {"status": "completed", "url": url}
+
+    monkeypatch.setattr(crawler_engine, "CrawlResultWriter", _NullWriter)
+    monkeypatch.setattr(crawler_engine, "circuit_open_async", no_circuit)
+    monkeypatch.setattr(crawler_engine, "try_acquire_async", acquire)
+    monkeypatch.setattr(crawler_engine, "release_async", release)
+    monkeypatch.setattr(crawler_engine, "run_crawler_task", crawl)
+
+    urls = [f"https://{host}.example/" for host in "abcd"]
+    summary = asyncio.run(crawler_engine.run_batch_crawl(urls, concurrency=1))
+
+    assert summary["completed"] == 4
+    # With one slot, no URL may hold a lease while another is crawling
+    assert leased_while_active == [0, 0, 0, 0]
+    assert sorted(released) == sorted(f"token:{url}" for url in urls)
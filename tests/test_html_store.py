@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("zstandard")
+
+import html_store
+from html_store import compress_html, stream_html
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def first(self):
+        return self.value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class _Session:
+    """
+    Serves one stored frame; the first query must come after the snapshot is taken
+    """
+
+    def __init__(self, frame: bytes, chunk_size: int):
+        self.frame = frame
+        self.chunk_size = chunk_size
+        self.isolation = None
+        self.offset = 0
+        self.queries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def connection(self, execution_options=None):
+        assert self.queries == 0, "snapshot must be taken before the first read"
+        self.isolation = (execution_options or {}).get("isolation_level")
+
+    async def execute(self, stmt):
+        self.queries += 1
+
+        if self.queries == 1:
+            return _Result(SimpleNamespace(html_dict_id=None, legacy=False))
+
+        chunk = self.frame[self.offset:self.offset + self.chunk_size]
+        self.offset += len(chunk)
+        return _Result(chunk or None)
+
+
+async def _read(crawl_id: int) -> bytes:
+    return b"".join([chunk async for chunk in stream_html(crawl_id)])
+
+
+def test_stream_reads_every_chunk_from_one_snapshot(monkeypatch):
+    html = "<html><body>" + "<p>stable page</p>" * 2000 + "</body></html>"
+    session = _Session(compress_html(html), chunk_size=16)
+
+    monkeypatch.setattr(html_store, "AsyncSessionLocal", lambda: session)
+
+    assert asyncio.run(_read(1)).decode("utf-8") == html
+    assert session.isolation == "REPEATABLE READ"
+    assert session.queries > 3
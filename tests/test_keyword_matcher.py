@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from ai_agents.keyword_matcher import KeywordMatcher, normalize_term
+
+KEYWORDS = {
+    "seo": 1.0,
+    "crawling": 1.0,
+    "search engine": 0.6,
+    "search engine optimization": 1.0,
+    "engine optimization": 0.2,
+    "robots txt": 0.5,
+    "sitemap": 0.5,
+}
+
+VOCABULARY = [
+    "seo", "SEO", "seos", "xseo", "crawling", "Crawling!", "search", "engine",
+    "optimization", "search-engine", "robots.txt", "robots", "txt", "sitemap_",
+    "sitemap", "the", "of", ",", ".", "-", "_",
+]
+
+
+def reference_score(weights: dict, text: str, max_hits: int = 3) -> float:
+    """
+    Naive oracle: compare every term against the word sequence at every word
+    """
+
+    words = normalize_term(text).split()
+    score = 0.0
+
+    for term, weight in weights.items():
+        term_words = normalize_term(term).split()
+        width = len(term_words)
+        hits = sum(words[i:i + width] == term_words for i in range(len(words)))
+        score += weight * min(hits, max_hits)
+
+    return score
+
+
+def test_scores_match_the_naive_scan():
+    matcher = KeywordMatcher(KEYWORDS)
+    rng = random.Random(7)
+
+    for _ in range(2000):
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(0, 25)))
+        assert matcher.score(text) == pytest.approx(reference_score(KEYWORDS, text)), text
+
+
+def test_overlapping_phrases_all_count():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    scan = matcher.scan("Search engine optimization")
+
+    assert scan.hits == {"search engine": 1, "search engine optimization": 1, "engine optimization": 1}
+    assert scan.score == pytest.approx(1.8)
+
+
+def test_whole_words_only():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    assert matcher.score("seosomething xseo seos") == 0.0
+    assert matcher.score("(SEO)") == 1.0
+    assert matcher.score("robots.txt") == 0.5
+
+
+def test_hits_per_term_are_capped():
+    assert KeywordMatcher({"seo": 1.0}, max_hits_per_term=3).score("seo " * 10) == 3.0
+
+
+def test_terms_normalizing_alike_count_once():
+    matcher = KeywordMatcher({"robots.txt": 0.5, "robots txt": 0.5, "Robots_TXT": 0.4})
+
+    assert matcher.score("robots.txt") == 0.5
+
+
+def test_chunks_and_empty_dictionary():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    assert matcher.score(["search en", "gine"]) == matcher.score("search engine")
+    assert KeywordMatcher({}).score("seo") == 0.0
+
+
+def test_keywords_straddling_chunk_boundaries():
+    matcher = KeywordMatcher(KEYWORDS)
+    rng = random.Random(11)
+
+    for _ in range(500):
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(0, 40)))
+        cuts = sorted(rng.sample(range(len(text) + 1), k=min(len(text) + 1, rng.randint(1, 12))))
+        chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+        assert matcher.scan(chunks).hits == matcher.scan(text).hits, chunks
+
+    # Neither the phrase across the cut nor "seo" cut off from "seos" is
+    # counted twice or half
+    long_text = "filler " * 50
+    scan = matcher.scan([long_text + "search engine opti", "mization seo", "s " + long_text])
+
+    assert scan.hits == {"search engine": 1, "search engine optimization": 1, "engine optimization": 1}
@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from ai_agents.agent_cloud import METADATA_FIELDS, normalize_metadata
+
+
+def test_non_object_answers_are_rejected():
+    assert normalize_metadata([{"page_title": "A"}]) is None
+    assert normalize_metadata("page title") is None
+    assert normalize_metadata(None) is None
+
+
+def test_fields_are_coerced_to_strings():
+    metadata = normalize_metadata({
+        "page_title": "  Acme  ",
+        "phone": 441234567,
+        "email": ["a@acme.example", "b@acme.example"],
+        "domain": None,
+        "extra": "dropped",
+    })
+
+    assert list(metadata) == METADATA_FIELDS
+    assert metadata["page_title"] == "Acme"
+    assert metadata["phone"] == "441234567"
+    assert metadata["email"] == ""
+    assert metadata["domain"] == ""
+    assert all(isinstance(value, str) for value in metadata.values())
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    pytest.importorskip("fakeredis")
+
+    from fakeredis import aioredis as fake_aioredis
+    from ai_agents import agent_cloud
+    from ai_agents.llm_cache import LLMResultCache
+
+    client = fake_aioredis.FakeRedis()
+    calls = []
+
+    for name in ("get", "mget", "set", "pipeline"):
+        method = getattr(client, name)
+
+        def spy(*args, _name=name, _method=method, **kwargs):
+            calls.append(_name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(client, name, spy)
+
+    cache = LLMResultCache(namespace="metadata-test", redis_url="redis://unused")
+    monkeypatch.setattr(cache, "_async_redis_client", lambda: client)
+    monkeypatch.setattr(agent_cloud, "metadata_cache", cache)
+
+    return cache, calls
+
+
+def _stub_llm(monkeypatch, prompts: list):
+    from ai_agents import agent_cloud
+
+    class _Client:
+        async def chat(self, **kwargs):
+            prompts.append(kwargs)
+            return '{"page_title": "Acme"}'
+
+    monkeypatch.setattr(agent_cloud, "get_llm_client", lambda: _Client())
+
+
+def test_batch_uses_one_mget_and_one_pipeline(monkeypatch, redis_cache):
+    from ai_agents import agent_cloud
+
+    cache, calls = redis_cache
+    prompts = []
+    _stub_llm(monkeypatch, prompts)
+
+    results = agent_cloud.extract_website_metadata_batch(["one", "two"], docs_per_prompt=1)
+
+    assert [result["page_title"] for result in results] == ["Acme", "Acme"]
+    assert len(prompts) == 2
+    # Misses are looked up once (MGET) and never again per document
+    assert calls == ["mget", "pipeline"]
+
+
+def test_batch_is_served_from_the_shared_tier(monkeypatch, redis_cache):
+    from ai_agents import agent_cloud
+
+    cache, calls = redis_cache
+    prompts = []
+    _stub_llm(monkeypatch, prompts)
+
+    agent_cloud.extract_website_metadata_batch(["one", "two"], docs_per_prompt=1)
+
+    # Another process: empty local tier, same Redis
+    cache._local.clear()
+    prompts.clear()
+    calls.clear()
+
+    results = agent_cloud.extract_website_metadata_batch(["two", "one"], docs_per_prompt=1)
+
+    assert [result["page_title"] for result in results] == ["Acme", "Acme"]
+    assert prompts == []
+    assert calls == ["mget"]
+    assert cache.counters["redis_hits"] == 2
@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("redis")
+
+import metrics
+
+
+class _Pipeline:
+    def __init__(self, sink: list):
+        self.sink = sink
+
+    def hincrbyfloat(self, key, field, amount):
+        self.sink.append((key, field, amount))
+
+    def execute(self):
+        pass
+
+
+class _Redis:
+    def __init__(self):
+        self.writes = []
+        self.pipelines = 0
+
+    def pipeline(self, transaction=False):
+        self.pipelines += 1
+        return _Pipeline(self.writes)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = _Redis()
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "_redis", lambda: client)
+    # Pretend this process's flusher is running; tests flush by hand
+    monkeypatch.setattr(metrics, "_flusher_pid", metrics.os.getpid())
+
+    metrics.flush()
+    client.writes.clear()
+    client.pipelines = 0
+
+    return client
+
+
+def test_recording_never_touches_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL", 0)
+
+    for _ in range(100):
+        metrics.CRAWL_PAGES.inc(status="completed")
+        metrics.CRAWL_STAGE_SECONDS.observe(0.02, stage="navigate")
+
+    assert fake_redis.pipelines == 0
+
+
+def test_flush_pushes_buffered_deltas_once(fake_redis):
+    metrics.CRAWL_PAGES.inc(status="completed")
+    metrics.CRAWL_PAGES.inc(2, status="completed")
+    metrics.CRAWL_STAGE_SECONDS.observe(0.02, stage="navigate")
+
+    metrics.flush()
+
+    writes = {(key, field): amount for key, field, amount in fake_redis.writes}
+
+    assert writes[("metrics:crawler_pages_total", '{"status":"completed"}')] == 3
+    assert writes[("metrics:crawler_stage_seconds", '{"stage":"navigate"}|bucket|0.025')] == 1
+    assert writes[("metrics:crawler_stage_seconds", '{"stage":"navigate"}|count')] == 1
+
+    metrics.flush()
+    assert fake_redis.pipelines == 1
+
+
+def test_forked_child_starts_with_empty_buffers(fake_redis):
+    metrics.CRAWL_PAGES.inc(status="failed")
+
+    metrics._after_fork_in_child()
+    metrics.flush()
+
+    assert fake_redis.writes == []
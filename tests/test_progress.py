@@ -0,0 +1,80 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+
+from fakeredis import aioredis as fake_aioredis
+
+import progress
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    server = fakeredis.FakeServer()
+    clients = (
+        fakeredis.FakeRedis(server=server),
+        fake_aioredis.FakeRedis(server=server),
+    )
+
+    monkeypatch.setattr(progress, "_clients", lambda: clients)
+    monkeypatch.setattr(progress, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(progress, "STREAM_TIMEOUT", 5.0)
+
+    return clients
+
+
+def _events(chunks: list) -> list:
+    return [
+        json.loads(chunk.split("data: ", 1)[1])
+        for chunk in chunks
+        if chunk.startswith("event: ")
+    ]
+
+
+async def _collect(task_id: str) -> list:
+    return [chunk async for chunk in progress.stream_task_events(task_id)]
+
+
+def test_payload_fields_never_replace_the_event_envelope():
+    event = json.loads(progress._event("task-1", "stored", {"id": 5, "stage": "x", "crawl_id": 5}))
+
+    assert event["id"] != 5
+    assert event["stage"] == "stored"
+    assert event["task_id"] == "task-1"
+    assert event["crawl_id"] == 5
+
+
+def test_single_url_stream_ends_on_completed(fake_clients):
+
+    async def run():
+        collector = asyncio.create_task(_collect("task-1"))
+
+        # Let the stream subscribe and replay the (empty) log first
+        await asyncio.sleep(0.1)
+
+        url = "https://example.com/"
+        await progress.publish_event_async("task-1", "navigating", url=url)
+        await progress.publish_event_async("task-1", "stored", url=url, crawl_id=5, action="inserted")
+        await progress.publish_event_async(
+            "task-1", "completed", status="completed", url=url, crawl_id=5, action="inserted"
+        )
+
+        return await asyncio.wait_for(collector, timeout=5)
+
+    events = _events(asyncio.run(run()))
+
+    assert [event["stage"] for event in events] == ["navigating", "stored", "completed"]
+    assert len({event["id"] for event in events}) == 3
+    assert events[-1]["crawl_id"] == 5
+
+
+def test_late_subscriber_replays_up_to_completed(fake_clients):
+    progress.publish_event("task-2", "navigating", url="https://example.com/")
+    progress.publish_event("task-2", "completed", status="completed", crawl_id=7)
+
+    events = _events(asyncio.run(_collect("task-2")))
+
+    assert [event["stage"] for event in events] == ["navigating", "completed"]
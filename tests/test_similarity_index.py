@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from similarity_index import LSH_BANDS, PageIndex, VectorIndex
+from text_pipeline import EMBEDDING_MODEL
+from vector_store import to_bytes
+
+
+def _unit(rows: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("exact_limit", [1000, 0])
+def test_removed_ids_are_never_returned(exact_limit):
+    vectors = _unit(50)
+    index = VectorIndex(exact_limit=exact_limit)
+    index.upsert(list(range(50)), vectors)
+
+    assert index.remove(7)
+    assert index.remove(49)
+    assert not index.remove(7)
+
+    assert len(index) == 48
+    assert index.vector(7) is None
+
+    found = {crawl_id for crawl_id, _ in index.search(vectors[7], k=48)}
+    assert 7 not in found and 49 not in found
+
+
+def test_moved_row_keeps_its_vector():
+    vectors = _unit(10)
+    index = VectorIndex()
+    index.upsert(list(range(10)), vectors)
+
+    index.remove(2)
+
+    # The last row was moved into the freed slot
+    assert np.allclose(index.vector(9), vectors[9])
+    assert index.search(vectors[9], k=1) == [(9, pytest.approx(1.0, abs=1e-5))]
+
+
+def test_reinserted_id_after_remove():
+    vectors = _unit(4)
+    index = VectorIndex()
+    index.upsert([1, 2, 3], vectors[:3])
+
+    index.remove(2)
+    index.upsert([2], vectors[3:])
+
+    assert len(index) == 3
+    assert np.allclose(index.vector(2), vectors[3])
+
+
+def _bucket_entries(index: VectorIndex) -> int:
+    return sum(len(bucket) for band in index._bands for bucket in band.values())
+
+
+def test_band_buckets_track_only_current_rows():
+    index = VectorIndex(exact_limit=0)
+    index.upsert(list(range(20)), _unit(20, seed=1))
+
+    # Re-embedding every page must not grow the buckets
+    for seed in range(2, 6):
+        index.upsert(list(range(20)), _unit(20, seed=seed))
+
+    assert _bucket_entries(index) == 20 * LSH_BANDS
+
+    for crawl_id in (0, 7, 19):
+        index.remove(crawl_id)
+
+    assert _bucket_entries(index) == 17 * LSH_BANDS
+    assert all(
+        position < len(index)
+        for band in index._bands for bucket in band.values() for position in bucket
+    )
+
+# ---------- PageIndex refresh ----------
+
+class _Stream:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    async def partitions(self):
+        yield self.rows
+
+
+class _DB:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    async def stream(self, query):
+        return _Stream(self.rows)
+
+
+def _row(crawl_id, vector, updated_at, model=EMBEDDING_MODEL):
+    return SimpleNamespace(
+        id=crawl_id,
+        embedding=None if vector is None else to_bytes(vector),
+        embedding_model=model,
+        embedding_updated_at=updated_at,
+    )
+
+
+def test_refresh_ignores_null_timestamps_for_the_watermark():
+    vectors = _unit(3)
+    stamp = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    index = PageIndex()
+
+    rows = [
+        _row(1, vectors[0], stamp),
+        _row(2, vectors[1], stamp + timedelta(seconds=5)),
+        _row(3, vectors[2], None),
+    ]
+    asyncio.run(index.refresh(_DB(rows), force=True))
+
+    assert len(index.index) == 3
+    assert index._watermark == stamp + timedelta(seconds=5)
+
+
+def test_refresh_evicts_cleared_vectors_and_similar_runs():
+    vectors = _unit(3)
+    stamp = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    index = PageIndex()
+
+    asyncio.run(index.refresh(_DB([_row(i, vectors[i], stamp) for i in range(3)]), force=True))
+    asyncio.run(index.refresh(_DB([_row(1, None, stamp + timedelta(seconds=1))]), force=True))
+
+    assert len(index.index) == 2
+    assert asyncio.run(index.similar(_DB([]), 1, k=5)) is None
+    assert [crawl_id for crawl_id, _ in asyncio.run(index.similar(_DB([]), 0, k=5))] == [2]
@@ -0,0 +1,270 @@
+import gzip
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("redis")
+
+import site_crawl
+from site_crawl import (
+    MAX_LINKS_PER_PAGE, SITE_JOB_TTL, RedisBloomFilter, SiteFrontier, SiteJobExpired,
+    parse_sitemap, robots_parser, same_site_links,
+)
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc> https://example.com/a </loc></url>
+  <url><loc>https://example.com/b</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc>https://example.com/c</loc></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>
+  <sitemap><loc>https://example.com/sitemap-2.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+ROBOTS = """
+User-agent: *
+Disallow: /private/
+
+Sitemap: https://example.com/sitemap_index.xml
+"""
+
+# ---------- Sitemaps ----------
+
+def test_parse_urlset():
+    assert parse_sitemap(URLSET, limit=10) == (
+        ["https://example.com/a", "https://example.com/b", "https://example.com/c"], []
+    )
+
+
+def test_parse_urlset_stops_at_limit():
+    pages, _ = parse_sitemap(URLSET, limit=2)
+    assert pages == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_parse_sitemap_index():
+    assert parse_sitemap(SITEMAP_INDEX, limit=10) == (
+        [], ["https://example.com/sitemap-1.xml", "https://example.com/sitemap-2.xml.gz"]
+    )
+
+
+def test_parse_gzipped_sitemap():
+    assert parse_sitemap(gzip.compress(URLSET), limit=10)[0][0] == "https://example.com/a"
+
+# ---------- robots.txt / link filtering ----------
+
+def test_robots_rules_and_declared_sitemaps():
+    robots = robots_parser(ROBOTS)
+
+    assert robots.site_maps() == ["https://example.com/sitemap_index.xml"]
+    assert not robots.can_fetch(site_crawl.USER_AGENT, "https://example.com/private/x")
+    assert robots.can_fetch(site_crawl.USER_AGENT, "https://example.com/public")
+
+
+def test_same_site_links_filters_and_normalizes():
+    links = [
+        "https://WWW.example.com/a#top",
+        "https://example.com/a",
+        "https://example.com/private/secret",
+        "https://other.com/",
+        "mailto:hi@example.com",
+        "https://example.com/file.pdf",
+    ]
+
+    assert same_site_links(links, "example.com", robots_parser(ROBOTS)) == [
+        "https://www.example.com/a",
+        "https://example.com/a",
+    ]
+
+
+def test_start_url_is_checked_against_robots():
+    robots = robots_parser(ROBOTS)
+
+    assert same_site_links(["https://example.com/private/"], "example.com", robots) == []
+
+
+def test_link_cap_applies_to_page_links_only():
+    links = [f"https://example.com/p{i}" for i in range(MAX_LINKS_PER_PAGE * 2)]
+    robots = robots_parser("")
+
+    assert len(same_site_links(links, "example.com", robots)) == MAX_LINKS_PER_PAGE
+    assert len(same_site_links(links, "example.com", robots, limit=None)) == len(links)
+
+# ---------- Bloom filter / admit budget ----------
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(site_crawl, "_redis", lambda: client)
+    return client
+
+
+def test_bloom_reports_only_unseen_items(fake_redis):
+    bloom = RedisBloomFilter(fake_redis, "bloom", capacity=1000)
+
+    assert bloom.add_many(["a", "b", "a"]) == ["a", "b"]
+    assert bloom.add_many(["b", "c"]) == ["c"]
+    assert bloom.add_many([]) == []
+
+
+def test_admit_respects_page_budget_and_depth(fake_redis):
+    frontier = SiteFrontier("job-1")
+    frontier.create("https://example.com/", max_pages=3, max_depth=1, robots_txt="")
+
+    assert frontier.admit(["https://example.com/"], depth=0) == 1
+    assert frontier.admit(["https://example.com/"], depth=1) == 0
+    assert frontier.admit(["https://example.com/a", "https://example.com/b", "https://example.com/c"], depth=1) == 2
+    assert frontier.admit(["https://example.com/d"], depth=1) == 0
+    assert frontier.admit(["https://example.com/e"], depth=2) == 0
+
+    assert frontier.meta()["admitted"] == 3
+    assert frontier.next_batch() == [
+        (0, "https://example.com/"),
+        (1, "https://example.com/a"),
+        (1, "https://example.com/b"),
+    ]
+    assert frontier.pending() == 0
+
+def test_progress_keeps_the_whole_job_alive(fake_redis):
+    frontier = SiteFrontier("job-3")
+    frontier.create("https://example.com/", max_pages=10, max_depth=1, robots_txt="")
+    fake_redis.expire(frontier.meta_key, 5)
+
+    frontier.admit(["https://example.com/"], depth=0)
+
+    assert fake_redis.ttl(frontier.meta_key) > SITE_JOB_TTL - 5
+    assert fake_redis.ttl(frontier.queue_key) > SITE_JOB_TTL - 5
+
+    fake_redis.expire(frontier.meta_key, 5)
+    frontier.count(crawled=1)
+
+    assert fake_redis.ttl(frontier.meta_key) > SITE_JOB_TTL - 5
+
+
+def test_expired_job_state_raises(fake_redis):
+    with pytest.raises(SiteJobExpired, match="job-4 expired"):
+        SiteFrontier("job-4").meta()
+
+# ---------- Site crawl task ----------
+
+class _FakePage:
+
+    async def title(self):
+        return "Home"
+
+    async def content(self):
+        return "<html><a href='/a'></a><a href='/b'></a></html>"
+
+    async def eval_on_selector_all(self, selector, script):
+        return ["https://example.com/a", "https://example.com/b"]
+
+
+class _FakeWriter:
+
+    def __init__(self, on_flush=None):
+        pass
+
+    async def add(self, row, blobs):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def site_task(fake_redis, monkeypatch):
+    pytest.importorskip("celery")
+    pytest.importorskip("playwright")
+
+    import tasks
+    import crawler_engine
+
+    requeued = []
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def unchanged_validators(url):
+        return SimpleNamespace(etag='"v1"', last_modified=None, content_hash=None)
+
+    async def unchanged(page, url, stored):
+        return {"etag": stored.etag, "last_modified": None}
+
+    async def lease(url):
+        return "token", 0
+
+    async def no_circuit(url):
+        return 0
+
+    async def no_dictionary(url):
+        return None, None
+
+    async def no_seeds(start_url, use_sitemap, max_pages):
+        return "", []
+
+    @asynccontextmanager
+    async def page(device):
+        yield _FakePage()
+
+    monkeypatch.setattr(crawler_engine, "get_browser_pool", lambda: SimpleNamespace(page=page))
+    monkeypatch.setattr(crawler_engine, "CrawlResultWriter", _FakeWriter)
+    monkeypatch.setattr(crawler_engine, "load_validators", unchanged_validators)
+    monkeypatch.setattr(crawler_engine, "check_unchanged", unchanged)
+    monkeypatch.setattr(crawler_engine, "mark_checked", noop)
+    monkeypatch.setattr(crawler_engine, "apply_blocking", noop)
+    monkeypatch.setattr(crawler_engine, "retry_goto", noop)
+    monkeypatch.setattr(crawler_engine, "dictionary_for_url", no_dictionary)
+    monkeypatch.setattr(crawler_engine, "try_acquire_async", lease)
+    monkeypatch.setattr(crawler_engine, "release_async", noop)
+    monkeypatch.setattr(crawler_engine, "circuit_open_async", no_circuit)
+    monkeypatch.setattr(crawler_engine, "record_success_async", noop)
+    monkeypatch.setattr(tasks, "run_async", asyncio.run)
+    monkeypatch.setattr(tasks, "discover_seeds", no_seeds)
+    monkeypatch.setattr(tasks, "publish_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tasks, "publish_event_async", noop)
+    monkeypatch.setattr(tasks, "EMBED_ON_CRAWL", False)
+    monkeypatch.setattr(
+        tasks.execute_site_crawl, "apply_async",
+        lambda args, kwargs, **options: requeued.append(args)
+    )
+
+    return tasks, requeued
+
+
+def test_unchanged_seed_still_expands(site_task):
+    from crawl_profiles import resolve_profile
+
+    tasks, requeued = site_task
+    profile = resolve_profile(screenshot="none")
+
+    summary = tasks.execute_site_crawl(
+        "job-2", start_url="https://example.com/", max_pages=10, max_depth=2,
+        use_sitemap=False, profile=profile
+    )
+
+    # The seed's links are admitted even though its content did not change
+    assert summary["status"] == "continuing"
+    assert summary["admitted"] == 3
+    assert SiteFrontier("job-2").pending() == 2
+    assert requeued == [("job-2",)]
+
+
+def test_expired_job_is_published_as_failed(site_task, monkeypatch):
+    tasks, requeued = site_task
+    events = []
+
+    monkeypatch.setattr(tasks, "publish_event", lambda job_id, stage, **data: events.append((stage, data)))
+
+    with pytest.raises(SiteJobExpired):
+        tasks.execute_site_crawl("job-5")
+
+    assert events == [("failed", {"error": "Site crawl job job-5 expired"})]
+    assert requeued == []
@@ -0,0 +1,181 @@
+import os
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import insert, select, update
+
+from database import SyncSessionLocal, CrawlResult, WebsiteMetadata
+from html_store import load_html_batch
+from html_text import EXTRACTOR_VERSION, extract_page_text, extract_page_texts
+from ai_agents.agent_cloud import extract_website_metadata_batch, normalize_metadata
+from ai_agents.agent_local import MODEL_NAME, generate_embeddings, part_a_text
+from metrics import PIPELINE_STAGE_SECONDS
+
+# ---------- PIPELINE CONFIG ----------
+
+# Documents per LLM prompt / per embedding call / per DB insert
+LLM_BATCH_SIZE = int(os.getenv("PIPELINE_LLM_BATCH_SIZE", "4"))
+EMBED_BATCH_SIZE = int(os.getenv("PIPELINE_EMBED_BATCH_SIZE", "64"))
+
+EMBEDDING_MODEL = MODEL_NAME
+
+# ---------- Preprocessing (HTML → Text, Cached Per Crawl Row) ----------
+
+def load_page_texts(session, crawl_ids: list) -> dict:
+    """
+    crawl id → LLM-ready text, parsing only rows without a current cache
+    """
+
+    result = session.execute(
+        select(CrawlResult.id, CrawlResult.text_content).where(
+            CrawlResult.id.in_(crawl_ids),
+            CrawlResult.text_version == EXTRACTOR_VERSION
+        )
+    )
+
+    texts = dict(result.all())
+    misses = [crawl_id for crawl_id in crawl_ids if crawl_id not in texts]
+
+    if not misses:
+        return texts
+
+    pages = load_html_batch(session, misses)
+    ids = list(pages)
+
+    if not ids:
+        return texts
+
+    extracted = extract_page_texts([pages[crawl_id] or "" for crawl_id in ids])
+
+    session.execute(update(CrawlResult), [
+        {"id": crawl_id, "text_content": text, "text_version": EXTRACTOR_VERSION}
+        for crawl_id, text in zip(ids, extracted)
+    ])
+
+    session.commit()
+
+    logging.info(f"Extracted text for {len(ids)} page(s), {len(texts)} cached")
+
+    texts.update(zip(ids, extracted))
+    return texts
+
+# ---------- Pipeline ----------
+
+def run_text_pipeline(documents: list, progress=None) -> list:
+    """
+    documents: [{"text": str | None, "crawl_id": int | None}, ...]
+    Strip → extract metadata (cloud) → embed (local) → store, all batched
+    progress: optional callable(stage, **data) for live stage events
+    """
+
+    def report(stage, **data):
+        if progress is not None:
+            progress(stage, **data)
+
+    watch = PIPELINE_STAGE_SECONDS.stopwatch()
+
+    # Crawled pages are loaded here rather than shipped through the broker
+    crawl_ids = [
+        doc["crawl_id"] for doc in documents
+        if doc.get("text") is None and doc.get("crawl_id") is not None
+    ]
+
+    if crawl_ids:
+        with SyncSessionLocal() as session:
+            page_texts = load_page_texts(session, crawl_ids)
+    else:
+        page_texts = {}
+
+    texts = [
+        extract_page_text(doc["text"]) if doc.get("text") is not None
+        else page_texts.get(doc.get("crawl_id"), "")
+        for doc in documents
+    ]
+
+    # ---------- Step 1: Cloud Extraction (N docs per call, concurrent) ----------
+
+    watch.lap("preprocess")
+    report("extracting", documents=len(documents))
+
+    extracted = [None] * len(documents)
+    pending = [i for i, text in enumerate(texts) if text]
+
+    # All prompts go out concurrently through the shared async LLM client
+    batch_metadata = extract_website_metadata_batch(
+        [texts[i] for i in pending],
+        docs_per_prompt=LLM_BATCH_SIZE
+    )
+
+    # A malformed answer (or old cache entry) fails only its own document
+    for i, metadata in zip(pending, batch_metadata):
+        extracted[i] = normalize_metadata(metadata)
+
+    ready = [i for i, metadata in enumerate(extracted) if metadata is not None]
+
+    watch.lap("llm_extract")
+    report("extracted", documents=len(ready))
+
+    # ---------- Step 2: Local Embedding (one batched encode) ----------
+
+    matrix = generate_embeddings(
+        [part_a_text(extracted[i]) for i in ready],
+        batch_size=max(1, EMBED_BATCH_SIZE)
+    )
+
+    embeddings = {i: vector.tobytes() for i, vector in zip(ready, matrix)}
+
+    watch.lap("embed")
+    report("embedded", documents=len(embeddings))
+
+    # ---------- Step 3: Store (one multi-row INSERT) ----------
+
+    results = [
+        {"status": "failed", "crawl_id": doc.get("crawl_id"), "error": "Extraction failed"}
+        for doc in documents
+    ]
+
+    if not ready:
+        return results
+
+    now = datetime.now(timezone.utc)
+
+    rows = [
+        {
+            "crawl_id": documents[i].get("crawl_id"),
+            "page_title": extracted[i].get("page_title") or None,
+            "meta_description": extracted[i].get("meta_description") or None,
+            "company_name": extracted[i].get("company_name") or None,
+            "email": extracted[i].get("email") or None,
+            "phone": extracted[i].get("phone") or None,
+            "domain": extracted[i].get("domain") or None,
+            "embedding": embeddings.get(i),
+            "embedding_model": EMBEDDING_MODEL,
+            "created_at": now,
+        }
+        for i in ready
+    ]
+
+    with SyncSessionLocal() as session:
+        inserted = session.execute(
+            insert(WebsiteMetadata).returning(
+                WebsiteMetadata.id,
+                sort_by_parameter_order=True
+            ),
+            rows
+        ).scalars().all()
+
+        session.commit()
+
+    logging.info(f"Stored metadata for {len(rows)}/{len(documents)} document(s)")
+    watch.lap("store")
+    watch.total()
+    report("stored", documents=len(rows))
+
+    for i, metadata_id in zip(ready, inserted):
+        results[i] = {
+            "status": "completed",
+            "crawl_id": documents[i].get("crawl_id"),
+            "metadata_id": metadata_id,
+            "metadata": extracted[i],
+        }
+
+    return results
@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import select, update
+
+from database import CrawlResult
+from text_pipeline import EMBEDDING_MODEL, load_page_texts
+from ai_agents.agent_local import generate_embeddings
+
+# ---------- EMBEDDING STORE ----------
+
+# Vectors live next to their rows as raw float32 bytes; the model name is
+# stored with them so a model change triggers re-embedding, not reuse.
+
+EMBED_BATCH_SIZE = 64
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def stack(blobs: list) -> np.ndarray:
+    """
+    Many stored vectors → one contiguous (n, dim) float32 matrix
+    """
+
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+
+    return np.ascontiguousarray(
+        np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), -1)
+    )
+
+# ---------- Crawl Page Embeddings ----------
+
+def ensure_page_embeddings(session, crawl_ids: list) -> dict:
+    """
+    crawl id → embedding, reusing stored vectors and encoding only the rest
+    """
+
+    result = session.execute(
+        select(CrawlResult.id, CrawlResult.embedding).where(
+            CrawlResult.id.in_(crawl_ids),
+            CrawlResult.embedding_model == EMBEDDING_MODEL,
+            CrawlResult.embedding.is_not(None)
+        )
+    )
+
+    vectors = {crawl_id: from_bytes(blob) for crawl_id, blob in result}
+    missing = [crawl_id for crawl_id in crawl_ids if crawl_id not in vectors]
+
+    if not missing:
+        return vectors
+
+    texts = load_page_texts(session, missing)
+    ids = [crawl_id for crawl_id in missing if texts.get(crawl_id)]
+
+    if not ids:
+        return vectors
+
+    matrix = generate_embeddings([texts[crawl_id] for crawl_id in ids], EMBED_BATCH_SIZE)
+
+    now = datetime.now(timezone.utc)
+
+    session.execute(update(CrawlResult), [
+        {
+            "id": crawl_id,
+            "embedding": to_bytes(vector),
+            "embedding_model": EMBEDDING_MODEL,
+            "embedding_updated_at": now,
+        }
+        for crawl_id, vector in zip(ids, matrix)
+    ])
+
+    session.commit()
+
+    logging.info(f"Embedded {len(ids)} page(s), reused {len(vectors)}")
+
+    vectors.update(zip(ids, matrix))
+    return vectors